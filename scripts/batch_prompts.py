@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Bulk prompt processing
+Runs every prompt in a JSONL file through the configured provider and writes the results to JSONL;
+re-running with the same output resumes where the previous run stopped
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from pdd_llm import BatchRunner, MockLLMServer, UniversalLLMClient, lazy_import, load_config
+
+
+class BatchCLI:
+    def __init__(self, args):
+        self.args = args
+
+    def load_config(self):
+        """config.json if present, with the batch section overridden from the command line"""
+        config = load_config(self.args.config, editable=True)
+        batch = dict(config.get("batch", {}))
+        for key in ("mode", "concurrency", "chunk_size", "poll_interval_seconds", "retry_errors"):
+            value = getattr(self.args, key)
+            if value is not None:
+                batch[key] = value
+        config["batch"] = batch
+        return config
+
+    def configure_environment(self, base_url=None):
+        """Provider settings come from the environment (.env), as for the chat app"""
+        dotenv = lazy_import("dotenv")
+        if dotenv is not None:
+            dotenv.load_dotenv()
+        overrides = {"LLM_PROVIDER": self.args.provider, "MODEL": self.args.model,
+                     "BASE_URL": base_url or self.args.base_url}
+        os.environ.update({name: value for name, value in overrides.items() if value})
+        if base_url:
+            os.environ.setdefault("API_KEY", "mock-key")
+
+    async def run(self):
+        server = None
+        base_url = None
+        if self.args.mock:
+            server = await MockLLMServer({"port": 0, "batch_seconds": self.args.mock_batch_seconds}).start()
+            base_url = server.base_url_for(self.args.provider or os.getenv("LLM_PROVIDER", "openai"))
+            print(f"🧪 Mock provider on {server.base_url}")
+        self.configure_environment(base_url)
+
+        config = self.load_config()
+        client = UniversalLLMClient(config)
+        runner = BatchRunner(client, config["batch"])
+        print(f"🚀 {self.args.input} -> {self.args.output} with {client.provider} ({client.model})")
+        try:
+            report = await runner.run(Path(self.args.input), Path(self.args.output))
+        finally:
+            await client.aclose()
+            if server is not None:
+                await server.stop()
+        self.print_report(report)
+        return report
+
+    def print_report(self, report):
+        print("\n" + "=" * 50)
+        print(f"📊 Batch Report ({report['mode']})")
+        print("=" * 50)
+        print(f"Succeeded:    {report['succeeded']}")
+        print(f"Failed:       {report['failed']}")
+        print(f"Skipped:      {report['skipped']} (already in the output)")
+        print(f"Elapsed:      {report['elapsed_seconds']}s")
+        print(f"Throughput:   {report['prompts_per_second']} prompts/s, "
+              f"{report['output_tokens_per_second']} output tokens/s")
+        if "latency_ms" in report:
+            print("Latency:      " + ", ".join(f"{name} {value} ms" for name, value in report["latency_ms"].items()))
+        if report["failed"]:
+            print("💡 Re-run with --retry-errors to retry the failed prompts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through the configured LLM provider")
+    parser.add_argument("input", help="JSONL with {\"id\", \"prompt\", \"system\"} or {\"id\", \"messages\"} per line")
+    parser.add_argument("output", help="Results JSONL; an existing file is resumed")
+    parser.add_argument("--mode", choices=["auto", "online", "provider"],
+                        help="provider: use the OpenAI/Anthropic batch API; auto: when available")
+    parser.add_argument("--concurrency", type=int, help="Concurrent requests in online mode")
+    parser.add_argument("--chunk-size", type=int, help="Prompts per provider batch job")
+    parser.add_argument("--poll-interval", dest="poll_interval_seconds", type=float,
+                        help="Seconds between batch job status checks")
+    parser.add_argument("--retry-errors", action="store_true", default=None,
+                        help="Run prompts whose earlier result was an error again")
+    parser.add_argument("--provider", help="Overrides LLM_PROVIDER")
+    parser.add_argument("--model", help="Overrides MODEL")
+    parser.add_argument("--base-url", help="Overrides BASE_URL")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--mock", action="store_true", help="Run against an in-process mock provider")
+    parser.add_argument("--mock-batch-seconds", type=float, default=2.0)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    asyncio.run(BatchCLI(args).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,17 @@ Universal Configuration Manager for PDD Development
 Supports multiple LLM providers and OAuth configurations
 """
 
+import copy
 import os
-import json
 from pathlib import Path
 from typing import Dict, Any
 
+from pdd_chat import write_entrypoint
+from pdd_llm import ConfigConflict, apply_edits, checkout_config, default_config, save_config, write_text
+
+# Merges attempted when config.json keeps changing under us before giving up
+MAX_SAVE_ATTEMPTS = 5
+
 class ConfigManager:
     def __init__(self):
         self.config_file = Path("config.json")
@@ -16,87 +22,39 @@ class ConfigManager:
         self.config = self.load_config()
 
     def load_config(self) -> Dict[str, Any]:
-        """Load existing configuration or create default"""
-        if self.config_file.exists():
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
-        return self.get_default_config()
+        """Load existing configuration (older layouts migrated) or create default"""
+        config, self.revision = checkout_config(str(self.config_file))
+        # As read, to tell our edits from other tools' on save
+        self.base_config = copy.deepcopy(config)
+        return config
 
     def get_default_config(self) -> Dict[str, Any]:
         """Default configuration template"""
-        return {
-            "llm_provider": "openai",
-            "providers": {
-                "openai": {
-                    "api_key": "",
-                    "model": "gpt-4",
-                    "base_url": "https://api.openai.com/v1"
-                },
-                "deepseek": {
-                    "api_key": "",
-                    "model": "deepseek-chat",
-                    "base_url": "https://api.deepseek.com/v1"
-                },
-                "anthropic": {
-                    "api_key": "",
-                    "model": "claude-3-sonnet-20240229",
-                    "base_url": "https://api.anthropic.com/v1"
-                },
-                "local": {
-                    "api_key": "local",
-                    "model": "llama2",
-                    "base_url": "http://localhost:11434/v1"
-                },
-                "azure": {
-                    "api_key": "",
-                    "model": "gpt-4",
-                    "base_url": "https://your-resource.openai.azure.com/",
-                    "api_version": "2024-02-15-preview"
-                },
-                "gemini": {
-                    "api_key": "",
-                    "model": "gemini-2.0-flash-exp",
-                    "base_url": "https://generativelanguage.googleapis.com/v1beta"
-                }
-            },
-            "oauth_clients": {
-                "xero": {
-                    "client_id": "",
-                    "client_secret": "",
-                    "redirect_uri": "http://localhost:8001/callback",
-                    "scopes": "accounting.transactions,accounting.contacts,accounting.settings"
-                },
-                "github": {
-                    "client_id": "",
-                    "client_secret": "",
-                    "redirect_uri": "http://localhost:8001/callback",
-                    "scopes": "repo,user"
-                },
-                "google": {
-                    "client_id": "",
-                    "client_secret": "",
-                    "redirect_uri": "http://localhost:8001/callback",
-                    "scopes": "openid,email,profile"
-                },
-                "microsoft": {
-                    "client_id": "",
-                    "client_secret": "",
-                    "redirect_uri": "http://localhost:8001/callback",
-                    "scopes": "User.Read"
-                }
-            },
-            "session": {
-                "auto_prompt_recording": True,
-                "auto_start_watcher": True,
-                "port": 8001,
-                "debug": False
-            }
-        }
-
-    def save_config(self):
-        """Save configuration to file"""
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        return default_config()
+
+    def save_config(self) -> bool:
+        """Save configuration to file, keeping changes other tools made since it was loaded"""
+        path = str(self.config_file)
+        try:
+            self.revision = save_config(self.config, path, self.revision)
+        except ConfigConflict:
+            # e.g. the GitHub integrator stored a token during interactive setup: replay only our edits
+            print("⚠️  config.json was changed by another tool meanwhile; merging your changes into it")
+            for _ in range(MAX_SAVE_ATTEMPTS):
+                current, revision = checkout_config(path)
+                apply_edits(current, self.base_config, self.config)
+                try:
+                    self.revision = save_config(current, path, revision)
+                    break
+                except ConfigConflict:
+                    continue
+            else:
+                print(f"❌ config.json kept changing during {MAX_SAVE_ATTEMPTS} merge attempts; "
+                      "your changes were not saved. Stop the other tool and run this again.")
+                return False
+            self.config = current
+        self.base_config = copy.deepcopy(self.config)
+        return True
 
     def setup_interactive(self):
         """Interactive configuration setup"""
@@ -217,6 +175,7 @@ OPENAI_MODEL={provider_config['model'] if provider == 'openai' else 'gpt-4'}
 PORT={self.config['session']['port']}
 DEBUG={str(self.config['session']['debug']).lower()}
 AUTO_PROMPT_RECORDING={str(self.config['session']['auto_prompt_recording']).lower()}
+STREAMING={str(self.config['session'].get('streaming', True)).lower()}
 
 """
 
@@ -232,8 +191,7 @@ AUTO_PROMPT_RECORDING={str(self.config['session']['auto_prompt_recording']).lowe
                     env_content += f"{client_name.upper()}_SCOPES={client_config['scopes']}\n"
                 env_content += "\n"
 
-        with open(self.env_file, 'w') as f:
-            f.write(env_content)
+        write_text(self.env_file, env_content)
 
         print(f"✅ Created .env file with {provider.title()} configuration")
 
@@ -307,7 +265,8 @@ AUTO_PROMPT_RECORDING={str(self.config['session']['auto_prompt_recording']).lowe
                     return False
 
         # Save configuration and create files
-        self.save_config()
+        if not self.save_config():
+            return False
         self.create_env_file()
         self.create_requirements()
 
@@ -328,210 +287,12 @@ AUTO_PROMPT_RECORDING={str(self.config['session']['auto_prompt_recording']).lowe
         return True
 
     def update_chainlit_app(self):
-        """Update chainlit app to support multiple LLM providers"""
-        app_content = '''#!/usr/bin/env python3
-"""
-Universal Chainlit App with Multi-LLM Support
-Supports: OpenAI, DeepSeek, Anthropic, Local LLMs, Azure OpenAI
-"""
-
-import os
-import asyncio
-import chainlit as cl
-from typing import Optional, Dict, Any
-import json
-from pathlib import Path
-
-# Import LLM clients
-try:
-    from openai import AsyncOpenAI
-except ImportError:
-    AsyncOpenAI = None
-
-try:
-    import anthropic
-except ImportError:
-    anthropic = None
-
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-
-# Load configuration
-config_file = Path("config.json")
-if config_file.exists():
-    with open(config_file, 'r') as f:
-        app_config = json.load(f)
-else:
-    app_config = {"llm_provider": "openai"}
-
-class UniversalLLMClient:
-    def __init__(self):
-        self.provider = os.getenv("LLM_PROVIDER", app_config.get("llm_provider", "openai"))
-        self.api_key = os.getenv("API_KEY")
-        self.model = os.getenv("MODEL")
-        self.base_url = os.getenv("BASE_URL")
-        self.client = self.setup_client()
-
-    def setup_client(self):
-        """Setup client based on provider"""
-        if self.provider == "openai":
-            return AsyncOpenAI(
-                api_key=self.api_key,
-                base_url=None  # Use default OpenAI URL
-            )
-        elif self.provider == "deepseek":
-            return AsyncOpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
-        elif self.provider == "azure":
-            return AsyncOpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url,
-                api_version=os.getenv("API_VERSION", "2024-02-15-preview")
-            )
-        elif self.provider == "anthropic":
-            if anthropic:
-                return anthropic.AsyncAnthropic(api_key=self.api_key)
-            else:
-                raise ImportError("anthropic package not installed. Run: pip install anthropic")
-        elif self.provider == "local":
-            return AsyncOpenAI(
-                api_key="local",
-                base_url=self.base_url
-            )
-        elif self.provider == "gemini":
-            if genai:
-                genai.configure(api_key=self.api_key)
-                return genai  # Return the configured module
-            else:
-                raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
+        """Point chainlit_app.py at the chat app package, which reads config.json and .env at runtime"""
+        if write_entrypoint():
+            print("✅ Updated chainlit_app.py for multi-LLM support")
         else:
-            raise ValueError(f"Unsupported provider: {self.provider}")
-
-    async def chat_completion(self, messages: list) -> str:
-        """Universal chat completion"""
-        try:
-            if self.provider == "anthropic":
-                # Anthropic format
-                response = await self.client.messages.create(
-                    model=self.model,
-                    max_tokens=2000,
-                    messages=messages
-                )
-                return response.content[0].text
-            elif self.provider == "gemini":
-                # Gemini format
-                model = self.client.GenerativeModel(self.model)
-                # Convert messages to Gemini format - combine into single prompt
-                prompt_parts = []
-                for msg in messages:
-                    if msg['role'] == 'system':
-                        prompt_parts.append(f"Instructions: {msg['content']}")
-                    elif msg['role'] == 'user':
-                        prompt_parts.append(f"User: {msg['content']}")
-                    elif msg['role'] == 'assistant':
-                        prompt_parts.append(f"Assistant: {msg['content']}")
-                
-                prompt = "\n\n".join(prompt_parts)
-                
-                # Generate response (Gemini doesn't have native async, so we'll wrap it)
-                import asyncio
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(None, model.generate_content, prompt)
-                return response.text
-            else:
-                # OpenAI-compatible format
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    max_tokens=2000,
-                    temperature=0.7
-                )
-                return response.choices[0].message.content
-        except Exception as e:
-            return f"Error: {str(e)}"
-
-# Initialize LLM client
-llm_client = UniversalLLMClient()
-
-@cl.on_chat_start
-async def start():
-    """Initialize chat session"""
-    provider = llm_client.provider.title()
-    model = llm_client.model
-    
-    # OAuth client info
-    oauth_info = ""
-    config_file = Path("config.json")
-    if config_file.exists():
-        with open(config_file, 'r') as f:
-            config = json.load(f)
-            oauth_clients = [name for name, client in config.get('oauth_clients', {}).items() 
-                           if client.get('client_id')]
-            if oauth_clients:
-                oauth_info = f"\\n🔐 **OAuth Clients:** {', '.join(oauth_clients).title()}"
-    
-    welcome_msg = f"""# Welcome to PDD Universal AI Agent!
-
-🤖 **AI Provider:** {provider}
-📱 **Model:** {model}
-📝 **Auto-recording:** {"Enabled" if os.getenv("AUTO_PROMPT_RECORDING", "true").lower() == "true" else "Disabled"}{oauth_info}
-
-I'm ready to help you with your development tasks using Prompt-Driven Development methodology!
-
-**Available Commands:**
-- Ask me anything about your project
-- Request code implementation  
-- Get architectural guidance
-- Debug issues
-- Integrate with external services (Xero, GitHub, etc.)
-
-Your prompts are automatically recorded as PHRs for documentation.
-"""
-    
-    await cl.Message(
-        content=welcome_msg,
-        author="System"
-    ).send()
-
-@cl.on_message
-async def main(message: cl.Message):
-    """Handle user messages"""
-    try:
-        # Prepare messages for LLM
-        messages = [
-            {"role": "system", "content": "You are a helpful AI assistant specialized in Prompt-Driven Development. Help users with coding, architecture, and development tasks. You can also help with API integrations including OAuth flows for services like Xero, GitHub, Google, etc."},
-            {"role": "user", "content": message.content}
-        ]
-
-        # Get response from LLM
-        response = await llm_client.chat_completion(messages)
-
-        # Send response
-        await cl.Message(
-            content=response,
-            author="Assistant"
-        ).send()
-
-    except Exception as e:
-        error_msg = f"Sorry, I encountered an error: {str(e)}"
-        await cl.Message(
-            content=error_msg,
-            author="System"
-        ).send()
-
-if __name__ == "__main__":
-    # This should not be called directly
-    pass
-'''
-
-        with open("chainlit_app.py", 'w') as f:
-            f.write(app_content)
-
-        print("✅ Updated chainlit_app.py for multi-LLM support")
+            # Not rewritten, so a running chainlit -w keeps its sessions
+            print("✅ chainlit_app.py is up to date")
 
 if __name__ == "__main__":
     manager = ConfigManager()
@@ -4,21 +4,49 @@ PDD Development Session Manager
 Starts and manages both Chainlit app and automatic prompt watcher
 """
 
+import asyncio
+import json
+import logging
 import subprocess
 import sys
 import time
 import signal
 import os
+import urllib.error
+import urllib.request
 from pathlib import Path
 import threading
 import psutil
 
+from pdd_llm import WorkerPool, WorkerPoolError, load_config, resolve_worker_count
+
+CHAINLIT_PORT = 8001
+
 class DevSessionManager:
     def __init__(self):
         self.chainlit_process = None
         self.watcher_process = None
+        self.worker_pool = None
+        self.pool_thread = None
         self.running = False
+
+    def load_worker_settings(self):
+        """workers section of config.json"""
+        try:
+            return load_config("config.json")["workers"]
+        except (OSError, ValueError):
+            return {}
         
+    def process_log_path(self, name):
+        """Log file for a child process, next to the worker logs"""
+        return Path(self.load_worker_settings().get("log_dir", ".cache/workers")) / f"{name}.log"
+
+    def open_process_log(self, name):
+        """Append handle for a child's stdout and stderr; the child keeps its own copy"""
+        path = self.process_log_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, "ab")
+
     def check_requirements(self):
         """Check if environment is properly set up"""
         print("🔍 Checking development environment...")
@@ -60,12 +88,13 @@ class DevSessionManager:
         """Start the automatic prompt watcher"""
         print("🤖 Starting automatic prompt watcher...")
         try:
-            self.watcher_process = subprocess.Popen(
-                [sys.executable, "scripts/prompt_watcher.py"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            # Output goes to a log file: an unread pipe fills up and blocks the process
+            with self.open_process_log("watcher") as log:
+                self.watcher_process = subprocess.Popen(
+                    [sys.executable, "scripts/prompt_watcher.py"],
+                    stdout=log,
+                    stderr=subprocess.STDOUT
+                )
             
             # Give it a moment to start
             time.sleep(1)
@@ -83,21 +112,88 @@ class DevSessionManager:
             
     def start_chainlit(self):
         """Start the Chainlit application"""
+        settings = self.load_worker_settings()
+        if resolve_worker_count(settings) > 1:
+            return self.start_worker_pool(settings)
+
         print("🌐 Starting Chainlit application...")
         try:
-            self.chainlit_process = subprocess.Popen(
-                [sys.executable, "-m", "chainlit", "run", "chainlit_app.py", "-w", "--port", "8001"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            with self.open_process_log("chainlit") as log:
+                self.chainlit_process = subprocess.Popen(
+                    [sys.executable, "-m", "chainlit", "run", "chainlit_app.py", "-w", "--port", str(CHAINLIT_PORT)],
+                    stdout=log,
+                    stderr=subprocess.STDOUT
+                )
             
-            print("✅ Chainlit starting on http://localhost:8001")
+            print("⏳ Chainlit starting, warming up provider connections...")
+            timeout = float(settings.get("startup_timeout_seconds", 60.0))
+            if self.wait_until_ready(settings.get("health_path", "/healthz"), timeout):
+                print(f"✅ Chainlit ready on http://localhost:{CHAINLIT_PORT}")
+            elif self.chainlit_process.poll() is not None:
+                print(f"❌ Chainlit exited during startup; see {self.process_log_path('chainlit')}")
+                return False
+            else:
+                print(f"⚠️  Chainlit not ready after {timeout:.0f}s, continuing anyway")
             return True
             
         except Exception as e:
             print(f"❌ Error starting Chainlit: {e}")
             return False
+
+    def wait_until_ready(self, health_path, timeout):
+        """Poll the app's health route until it has warmed up"""
+        url = f"http://127.0.0.1:{CHAINLIT_PORT}{health_path}"
+        deadline = time.time() + timeout
+        while time.time() < deadline and self.chainlit_process.poll() is None:
+            try:
+                with urllib.request.urlopen(url, timeout=2):
+                    return True
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    # chainlit_app.py predates the health route
+                    return True
+            except OSError:
+                pass
+            time.sleep(0.5)
+        return False
+
+    def start_worker_pool(self, settings):
+        """Start one Chainlit worker per configured core behind the sticky balancer"""
+        logging.basicConfig(level=logging.INFO, format="   %(message)s")
+        command = [sys.executable, "-m", "chainlit", "run", "chainlit_app.py", "--headless",
+                   "--host", "127.0.0.1", "--port", "{port}"]
+        self.worker_pool = WorkerPool(command, settings, port=CHAINLIT_PORT)
+        count = len(self.worker_pool.workers)
+        print(f"🌐 Starting {count} Chainlit workers...")
+
+        self.pool_thread = threading.Thread(target=self.run_worker_pool, name="worker-pool", daemon=True)
+        self.pool_thread.start()
+        # Readiness is reported once the workers answer their health checks
+        try:
+            self.worker_pool.wait_started()
+        except WorkerPoolError as e:
+            print(f"❌ {e}")
+            return False
+        ready = self.worker_pool.ready_count()
+        if not ready:
+            print(f"❌ No Chainlit worker became ready; see {self.worker_pool.settings['log_dir']}/")
+            return False
+        print(f"✅ {ready}/{count} workers ready on http://localhost:{CHAINLIT_PORT}")
+        return True
+
+    def run_worker_pool(self):
+        """Body of the pool thread; startup failures are reported by start_worker_pool()"""
+        try:
+            asyncio.run(self.worker_pool.serve())
+        except Exception as e:
+            if self.worker_pool.error is None:
+                print(f"❌ Chainlit worker pool stopped: {e}")
+
+    def rolling_restart(self):
+        """Restart the workers one at a time without dropping in-flight replies"""
+        if self.worker_pool is not None:
+            print("🔄 Rolling restart of Chainlit workers...")
+            self.worker_pool.request_rolling_restart()
             
     def monitor_processes(self):
         """Monitor both processes and restart if needed"""
@@ -146,14 +242,18 @@ class DevSessionManager:
                     self.chainlit_process.kill()
                 except:
                     pass
+
+        if self.worker_pool:
+            self.worker_pool.request_stop()
+            if self.pool_thread is not None and self.pool_thread is not threading.current_thread():
+                self.pool_thread.join(timeout=15)
+            print("✅ Chainlit workers stopped")
                     
     def show_status(self):
         """Show current session status"""
         # Load configuration to show current settings
         try:
-            import json
-            with open("config.json", "r") as f:
-                config = json.load(f)
+            config = load_config("config.json")
             provider = config["llm_provider"].title()
             model = config["providers"][config["llm_provider"]]["model"]
             oauth_clients = [name for name, client in config["oauth_clients"].items() if client.get("client_id")]
@@ -167,7 +267,10 @@ class DevSessionManager:
         print("="*60)
         print(f"🤖 AI Provider:    {provider}")
         print(f"📱 Model:          {model}")
-        print(f"🌐 Chainlit App:   http://localhost:8001")
+        print(f"🌐 Chainlit App:   http://localhost:{CHAINLIT_PORT}")
+        if self.worker_pool:
+            print(f"⚙️  Workers:        {len(self.worker_pool.workers)} "
+                  f"(ports {self.worker_pool.workers[0].port}-{self.worker_pool.workers[-1].port})")
         print(f"📝 PHR Location:   docs/prompts/")
         print(f"🔐 OAuth Clients:  {', '.join(oauth_clients).title() if oauth_clients else 'None configured'}")
         print("="*60)
@@ -175,6 +278,8 @@ class DevSessionManager:
         print("   • Copy AI prompts (Ctrl+C) for auto-recording")
         print("   • Check docs/prompts/ for your PHR files")
         print("   • Update PHRs with outcomes after development")
+        if self.worker_pool:
+            print("   • Run 'python scripts/dev_session.py restart' for a rolling restart")
         print("   • Press Ctrl+C to stop session")
         print()
         
@@ -204,7 +309,10 @@ class DevSessionManager:
         
         # Wait for Chainlit process or Ctrl+C
         try:
-            self.chainlit_process.wait()
+            if self.worker_pool:
+                self.pool_thread.join()
+            else:
+                self.chainlit_process.wait()
         except KeyboardInterrupt:
             pass
         finally:
@@ -222,6 +330,8 @@ def main():
         sys.exit(0)
         
     signal.signal(signal.SIGINT, signal_handler)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda sig, frame: signal_handler.manager.rolling_restart())
     
     manager = DevSessionManager()
     signal_handler.manager = manager  # Store reference for signal handler
@@ -237,6 +347,17 @@ def main():
         else:
             print("📭 No auto-created PHRs yet")
         return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'restart':
+        # Rolling restart of a running multi-worker session
+        request = urllib.request.Request(f"http://127.0.0.1:{CHAINLIT_PORT}/_pdd/restart", method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                print(f"🔄 Rolling restart of {json.load(response)['restarting']} workers started")
+        except OSError as e:
+            print(f"❌ No multi-worker session on port {CHAINLIT_PORT}: {e}")
+            sys.exit(1)
+        return
         
     # Start the session
     success = manager.start()
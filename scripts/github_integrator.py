@@ -6,11 +6,12 @@ Automates repository creation, version control, and GitHub features
 
 import os
 import subprocess
-import json
 import requests
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+from pdd_llm import load_config, update_config
+
 class GitHubIntegrator:
     def __init__(self):
         self.config_file = Path("config.json")
@@ -21,29 +22,18 @@ class GitHubIntegrator:
     def load_config(self):
         """Load existing configuration"""
         if self.config_file.exists():
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-                self.git_config = config.get('git_integration', {})
-                oauth_clients = config.get('oauth_clients', {})
-                github_oauth = oauth_clients.get('github', {})
-                self.github_token = self.git_config.get('access_token') or github_oauth.get('access_token')
-                self.github_username = self.git_config.get('username')
+            config = load_config(str(self.config_file))
+            self.git_config = config.get('git_integration', {})
+            oauth_clients = config.get('oauth_clients', {})
+            github_oauth = oauth_clients.get('github', {})
+            self.github_token = self.git_config.get('access_token') or github_oauth.get('access_token')
+            self.github_username = self.git_config.get('username')
     
     def save_config(self, config_updates):
         """Save configuration updates"""
-        if self.config_file.exists():
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-        else:
-            config = {}
-            
-        if 'git_integration' not in config:
-            config['git_integration'] = {}
-            
-        config['git_integration'].update(config_updates)
-        
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Under the config.json lock, so a concurrent setup run does not lose the token
+        update_config(lambda config: config.setdefault('git_integration', {}).update(config_updates),
+                      str(self.config_file))
     
     def check_git_installation(self):
         """Check if Git is installed and configured"""
@@ -201,6 +191,7 @@ MANIFEST
 
 # Virtual environments
 .env
+.*.lock
 .venv
 env/
 venv/
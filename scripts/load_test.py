@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session load test for the chat path
+Drives the same client calls as the Chainlit on_message handler, against the offline mock provider by default
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+
+from pdd_llm import LoadGenerator, MockLLMServer, UniversalLLMClient, load_config
+
+SYSTEM_PROMPT = "You are a helpful AI assistant specialized in Prompt-Driven Development. Help users with coding, architecture, and development tasks. You can also help with API integrations including OAuth flows for services like Xero, GitHub, Google, etc."
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+
+    def load_config(self):
+        """config.json if present, with the response caches off unless --with-cache"""
+        config = load_config(self.args.config, editable=True)
+        if not self.args.with_cache:
+            config["cache"] = dict(config.get("cache", {}), enabled=False)
+            config["semantic_cache"] = dict(config.get("semantic_cache", {}), enabled=False)
+            config["singleflight"] = {"enabled": False}
+        return config
+
+    def load_prompt_mix(self):
+        """JSONL of {"prompt": ..., "weight": ...}; None for the built-in mix"""
+        if not self.args.prompts:
+            return None
+        mix = []
+        for line in Path(self.args.prompts).read_text().splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                mix.append((float(entry.get("weight", 1.0)), entry["prompt"]))
+        return mix
+
+    async def run(self):
+        server = None
+        base_url = self.args.base_url
+        if not base_url:
+            server = await MockLLMServer({
+                "port": 0,
+                "seed": self.args.seed,
+                "latency": {"distribution": "lognormal", "median_ms": self.args.mock_ttft_ms, "sigma": 0.5},
+                "tokens_per_second": self.args.mock_tokens_per_second,
+                "error_rate": self.args.mock_error_rate
+            }).start()
+            base_url = server.base_url_for(self.args.provider)
+            print(f"🧪 Mock provider on {server.base_url}")
+
+        os.environ.update({
+            "LLM_PROVIDER": self.args.provider,
+            "API_KEY": os.getenv("API_KEY") or "mock-key",
+            "MODEL": self.args.model,
+            "BASE_URL": base_url,
+            "STREAMING": "true" if not self.args.no_stream else "false"
+        })
+        client = UniversalLLMClient(self.load_config())
+        generator = LoadGenerator(
+            client,
+            {
+                "sessions": self.args.sessions,
+                "turns": self.args.turns,
+                "think_time_seconds": self.args.think_time,
+                "ramp_seconds": self.args.ramp,
+                "streaming": not self.args.no_stream,
+                "seed": self.args.seed
+            },
+            prompt_mix=self.load_prompt_mix(),
+            system_prompt=SYSTEM_PROMPT
+        )
+
+        print(f"🚀 {self.args.sessions} sessions x {self.args.turns} turns against {self.args.provider} ({base_url})")
+        try:
+            report = await generator.run()
+            report["scheduler"] = client.scheduler_stats()
+        finally:
+            await client.aclose()
+            if server is not None:
+                await server.stop()
+        if server is not None:
+            report["mock_server"] = server.stats()
+        self.print_report(report)
+        if self.args.json:
+            Path(self.args.json).write_text(json.dumps(report, indent=2))
+            print(f"💾 Report written to {self.args.json}")
+        return report
+
+    def print_report(self, report):
+        print("\n" + "=" * 50)
+        print("📊 Load Test Report")
+        print("=" * 50)
+        print(f"Turns:        {report['turns']} in {report['elapsed_seconds']}s")
+        print(f"Throughput:   {report['throughput_turns_per_second']} turns/s, "
+              f"{report['output_tokens_per_second']} output tokens/s")
+        print(f"TTFT:         {self.format_percentiles(report['ttft_ms'])}")
+        print(f"Latency:      {self.format_percentiles(report['latency_ms'])}")
+        print(f"Error rate:   {report['error_rate'] * 100:.2f}%")
+        lag = report["loop_lag_ms"]
+        print(f"Loop lag:     mean {lag['mean_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms")
+        for error, count in report["errors"].items():
+            print(f"   ❌ {count}x {error}")
+
+    @staticmethod
+    def format_percentiles(values):
+        return ", ".join(f"{name} {value} ms" for name, value in values.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the chat path")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between a session's turns")
+    parser.add_argument("--ramp", type=float, default=5.0, help="Seconds over which sessions start")
+    parser.add_argument("--no-stream", action="store_true", help="Use single completions instead of streaming")
+    parser.add_argument("--prompts", help="JSONL prompt mix: {\"prompt\": ..., \"weight\": ...} per line")
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--base-url", help="Target a running server instead of the in-process mock")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the response caches and single-flight on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mock-ttft-ms", type=float, default=300)
+    parser.add_argument("--mock-tokens-per-second", type=float, default=60)
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    asyncio.run(LoadTest(args).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Offline mock LLM provider server
+Point BASE_URL (or a provider's base_url in config.json) at it to benchmark without keys
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+
+from pdd_llm import MockLLMServer
+
+LATENCY_PRESETS = {
+    "fast": {"distribution": "fixed", "ms": 20},
+    "typical": {"distribution": "lognormal", "median_ms": 300, "sigma": 0.5},
+    "slow": {"distribution": "lognormal", "median_ms": 1500, "sigma": 0.8},
+    "jittery": {"distribution": "exponential", "mean_ms": 400}
+}
+
+
+class MockServerCLI:
+    def __init__(self, args):
+        self.args = args
+
+    def settings(self):
+        """Server settings from the command line, with --settings JSON applied last"""
+        settings = {
+            "host": self.args.host,
+            "port": self.args.port,
+            "seed": self.args.seed,
+            "latency": LATENCY_PRESETS[self.args.latency],
+            "tokens_per_second": self.args.tokens_per_second,
+            "response_tokens": self.args.response_tokens,
+            "error_rate": self.args.error_rate,
+            "error_status": self.args.error_status,
+            "rate_limit_rate": self.args.rate_limit_rate,
+            "requests_per_minute": self.args.rpm,
+            "hang_rate": self.args.hang_rate
+        }
+        if self.args.settings:
+            settings.update(json.loads(self.args.settings))
+        return settings
+
+    async def run(self):
+        server = await MockLLMServer(self.settings()).start()
+        print(f"🧪 Mock LLM server listening on {server.base_url}")
+        print(f"   OpenAI/DeepSeek/local BASE_URL: {server.base_url_for('openai')}")
+        print(f"   Anthropic/Gemini/Azure BASE_URL: {server.base_url}")
+        print(f"   Stats: GET {server.base_url}/mock/stats  |  Reconfigure: POST {server.base_url}/mock/config")
+        try:
+            await server.serve_forever()
+        finally:
+            print(f"📊 {json.dumps(server.stats())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI/Anthropic/Gemini-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--seed", type=int, help="Seed for reproducible latencies and faults")
+    parser.add_argument("--latency", choices=sorted(LATENCY_PRESETS), default="typical",
+                        help="Time-to-first-token distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--response-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rpm", type=int, help="Hard requests-per-minute limit, enforced with 429s and rate-limit headers")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that never answer")
+    parser.add_argument("--settings", help="JSON object overriding any server setting")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    try:
+        asyncio.run(MockServerCLI(args).run())
+    except KeyboardInterrupt:
+        print("\n🛑 Mock server stopped")
+
+
+if __name__ == "__main__":
+    main()
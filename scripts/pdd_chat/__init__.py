@@ -0,0 +1,26 @@
+"""
+PDD Chat App Package
+The Chainlit chat app, reading its provider configuration at runtime;
+chainlit_app.py at the project root only imports it
+"""
+
+from pathlib import Path
+
+ENTRYPOINT = '''#!/usr/bin/env python3
+"""
+PDD Universal Chainlit App
+Entry point for `chainlit run chainlit_app.py`; the app itself is scripts/pdd_chat/app.py
+and picks up config.json and .env changes without a restart
+"""
+
+from scripts.pdd_chat.app import *  # noqa: F401,F403  (registers the Chainlit handlers)
+'''
+
+
+def write_entrypoint(path: str = "chainlit_app.py") -> bool:
+    """Create or update chainlit_app.py; an up-to-date file is left alone so chainlit -w does not restart"""
+    target = Path(path)
+    if target.exists() and target.read_text(encoding="utf-8") == ENTRYPOINT:
+        return False
+    target.write_text(ENTRYPOINT, encoding="utf-8")
+    return True
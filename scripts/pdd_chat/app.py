@@ -0,0 +1,256 @@
+"""
+Universal Chainlit App with Multi-LLM Support
+Supports: OpenAI, DeepSeek, Anthropic, Gemini, Local LLMs, Azure OpenAI
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+_startup_began = time.perf_counter()
+
+# Provider SDKs are not imported here; the client loads the configured one on first use
+from scripts.pdd_llm import (
+    HEALTH, DeadlineExceeded, UniversalLLMClient, install_warmup, mount_health, mount_metrics, record_import,
+    start_metrics_server, startup_report, timed_import, worker_index
+)
+from scripts.pdd_chat.runtime import ChatRuntime
+record_import("scripts.pdd_llm", time.perf_counter() - _startup_began)
+
+with timed_import("chainlit"):
+    import chainlit as cl
+    from chainlit.server import app as chainlit_server
+
+# config.json and .env, re-read whenever either changes
+runtime = ChatRuntime()
+
+logging.basicConfig(level=runtime.log_level)
+
+# Health route polled by the dev session supervisor in multi-worker mode
+mount_health(chainlit_server, runtime.setting("workers", "health_path", "/healthz"))
+
+# Prometheus metrics on the Chainlit port, and on a sidecar port when configured
+metrics_settings = runtime.config.get("metrics", {})
+if metrics_settings.get("enabled", True):
+    mount_metrics(chainlit_server, metrics_settings.get("path", "/metrics"))
+    if metrics_settings.get("port"):
+        try:
+            # One sidecar port per worker: port, port + 1, ...
+            start_metrics_server(metrics_settings["port"] + worker_index(),
+                                 path=metrics_settings.get("path", "/metrics"))
+        except OSError as e:
+            logging.getLogger(__name__).warning("metrics sidecar not started: %s", e)
+
+# Import time per module, logged on every (re)load
+startup_report(time.perf_counter() - _startup_began)
+
+SYSTEM_PROMPT = "You are a helpful AI assistant specialized in Prompt-Driven Development. Help users with coding, architecture, and development tasks. You can also help with API integrations including OAuth flows for services like Xero, GitHub, Google, etc."
+
+# Connections, tokenizers and SDK clients are set up when the server starts; /healthz reports ready afterwards
+install_warmup(chainlit_server, runtime.client, SYSTEM_PROMPT, runtime.config.get("warmup"))
+
+HELP_TEXT = """🆘 **Help - PDD Universal Chat**
+
+**Commands**:
+- `/config` - Show the current configuration
+- `/help` - This help message
+
+**PDD Methodology**:
+- **Architect**: Design and planning
+- **Red**: Test-driven development
+- **Green**: Implementation
+- **Refactor**: Code improvement
+
+**PHR System**:
+Your prompts are automatically saved as Prompt History Records (PHRs) in numbered files.
+"""
+
+
+def current_client() -> UniversalLLMClient:
+    """The client for the next request, rebuilt first if config.json or .env changed"""
+    runtime.refresh()
+    return runtime.client
+
+
+@cl.on_chat_start
+async def start():
+    """Initialize chat session"""
+    llm_client = current_client()
+    # Per-session conversation memory, trimmed to the model's token budget
+    cl.user_session.set("memory", llm_client.new_memory(SYSTEM_PROMPT))
+
+    provider = llm_client.provider.title()
+    model = llm_client.model
+
+    # OAuth client info
+    oauth_info = ""
+    oauth_clients = [name for name, client in runtime.config.get('oauth_clients', {}).items()
+                     if client.get('client_id')]
+    if oauth_clients:
+        oauth_info = f"\n🔐 **OAuth Clients:** {', '.join(oauth_clients).title()}"
+
+    welcome_msg = f"""# Welcome to PDD Universal AI Agent!
+
+🤖 **AI Provider:** {provider}
+📱 **Model:** {model}
+📝 **Auto-recording:** {"Enabled" if os.getenv("AUTO_PROMPT_RECORDING", "true").lower() == "true" else "Disabled"}{oauth_info}
+
+I'm ready to help you with your development tasks using Prompt-Driven Development methodology!
+
+**Available Commands:**
+- Ask me anything about your project
+- Request code implementation
+- Get architectural guidance
+- Debug issues
+- Integrate with external services (Xero, GitHub, etc.)
+- `/config` and `/help`
+
+Your prompts are automatically recorded as PHRs for documentation.
+"""
+
+    await cl.Message(
+        content=welcome_msg,
+        author="System"
+    ).send()
+
+
+@cl.on_chat_end
+async def end():
+    """Stop background work for the session"""
+    # A closed tab or dropped connection should not keep a generation running
+    cancel_generation()
+    memory = cl.user_session.get("memory")
+    if memory is not None:
+        memory.close()
+
+
+def cancel_generation():
+    """Cancel the session's in-flight reply, which aborts the provider request and frees its slot"""
+    task = cl.user_session.get("generation")
+    if task is not None and not task.done():
+        task.cancel()
+
+
+@cl.on_stop
+async def on_stop():
+    """The user pressed stop"""
+    cancel_generation()
+
+
+async def handle_command(command: str):
+    """Handle chat commands"""
+    cmd = command.split()[0].lower()
+
+    if cmd == "/config":
+        llm_client = current_client()
+        config_info = f"""📋 **Current Configuration**
+
+**Provider**: {llm_client.provider}
+**Model**: {llm_client.model}
+**Streaming**: {llm_client.streaming}
+**Configured Providers**: {", ".join(runtime.config.get("providers", {})) or "None"}
+**Reloaded**: {runtime.reloads} time(s) since start
+"""
+        await cl.Message(content=config_info, author="System").send()
+
+    elif cmd == "/help":
+        await cl.Message(content=HELP_TEXT, author="System").send()
+
+    else:
+        await cl.Message(content=f"❌ Unknown command: {cmd}", author="System").send()
+
+
+async def stream_response(llm_client: UniversalLLMClient, messages: list, session_id: str) -> Optional[str]:
+    """Stream the reply token by token, falling back to a single completion
+
+    Returns the reply, or None when it was cut short; the warning shown
+    to the user then is not part of the conversation.
+    """
+    msg = cl.Message(content="", author="Assistant")
+    response = None
+    try:
+        async for token in llm_client.stream_chat_completion(messages, session_id=session_id):
+            await msg.stream_token(token)
+        response = msg.content
+    except DeadlineExceeded:
+        await msg.stream_token("\n\n⚠️ The reply took too long and was stopped.")
+    except Exception as e:
+        if not msg.content:
+            # Nothing reached the user yet, retry without streaming
+            msg.content = response = await llm_client.complete(messages, session_id=session_id)
+        else:
+            await msg.stream_token(f"\n\n⚠️ Stream interrupted: {str(e)}")
+    await msg.send()
+    return response
+
+
+@cl.on_message
+async def main(message: cl.Message):
+    """Handle user messages"""
+    if message.content.strip().startswith("/"):
+        await handle_command(message.content.strip())
+        return
+
+    cl.user_session.set("generation", asyncio.current_task())
+    # Counted so a rolling restart can wait for this reply before stopping the worker
+    HEALTH.request_started()
+    try:
+        # The whole turn uses one client, even if the configuration is reloaded meanwhile
+        with runtime.turn() as llm_client:
+            await reply(llm_client, message)
+    except Exception as e:
+        error_msg = f"Sorry, I encountered an error: {str(e)}"
+        await cl.Message(
+            content=error_msg,
+            author="System"
+        ).send()
+    finally:
+        HEALTH.request_finished()
+        cl.user_session.set("generation", None)
+
+
+async def reply(llm_client: UniversalLLMClient, message: cl.Message):
+    """Answer one user message with the turn's client"""
+    # Prepare messages for LLM
+    memory = cl.user_session.get("memory")
+    if memory is not None:
+        # Sessions opened before a reload summarize with the current client
+        memory.summarizer = llm_client.summarizer
+        memory.add("user", message.content)
+        messages = memory.messages()
+    else:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": message.content}
+        ]
+
+    # Sessions get fair turns at the shared provider concurrency
+    session_id = cl.user_session.get("id")
+    try:
+        if llm_client.streaming:
+            response = await stream_response(llm_client, messages, session_id)
+        else:
+            # Get response from LLM; a failure is reported by main
+            response = await llm_client.complete(messages, session_id=session_id)
+
+            # Send response
+            await cl.Message(
+                content=response,
+                author="Assistant"
+            ).send()
+    except BaseException:
+        # Stopped or failed: the next request should not carry an unanswered question
+        if memory is not None:
+            memory.pop()
+        raise
+
+    if memory is None:
+        return
+    if response:
+        memory.add("assistant", response)
+        # Fold older turns into the running summary off the request path
+        memory.summarize_in_background()
+    else:
+        memory.pop()
@@ -0,0 +1,106 @@
+"""
+Chat App Runtime Configuration
+config.json, .env and the LLM client built from them, rebuilt in place when either file changes
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from scripts.pdd_llm import SharedTransport, UniversalLLMClient, get_config_loader, lazy_import, warm_up
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRuntime:
+    """The current configuration and LLM client for the chat app
+
+    refresh() is cheap (two stat calls) and runs before every chat
+    turn; config.json goes through the shared config cache, so reading
+    a setting is a dict lookup. When config.json or .env changed, the
+    new client replaces the old one for the next request; replies
+    already running finish on the old client, which is closed (cache
+    database, connection pools) after its last one, and open sessions
+    keep their conversation memory. A file caught half-written is
+    retried on the next refresh.
+    """
+
+    def __init__(self, config_path: str = "config.json", env_path: str = ".env"):
+        self.config_loader = get_config_loader(config_path)
+        self.env_path = Path(env_path)
+        self.config: Dict[str, Any] = {}
+        self.client: Optional[UniversalLLMClient] = None
+        self.reloads = 0
+        # Turns in progress per client, so a replaced client is closed only once they finish
+        self._turns: Dict[UniversalLLMClient, int] = {}
+        self._env_mtime: Optional[int] = None
+        self.load()
+
+    def _read_env_mtime(self) -> Optional[int]:
+        try:
+            return self.env_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self):
+        """(Re)read both files and build a new client; raises ConfigError if config.json is invalid"""
+        env_mtime = self._read_env_mtime()
+        dotenv = lazy_import("dotenv")
+        if dotenv is not None and self.env_path.exists():
+            # Edited values win over the ones loaded at startup
+            dotenv.load_dotenv(self.env_path, override=True)
+        config = self.config_loader.load()
+        # Connection pools of its own, so they can be closed with the client after a reload
+        client = UniversalLLMClient(config, transport=SharedTransport(config["http"]))
+        self.config, self.client, self._env_mtime = config, client, env_mtime
+
+    def refresh(self) -> bool:
+        """Reload if config.json or .env changed since the last load; True when it did"""
+        if not self.config_loader.changed() and self._read_env_mtime() == self._env_mtime:
+            return False
+        previous = self.client
+        try:
+            self.load()
+        except (OSError, ValueError) as e:
+            logger.warning("chat app: keeping the previous configuration: %s", e)
+            return False
+        if previous is not None and previous not in self._turns:
+            self._close_later(previous)
+        self.reloads += 1
+        logger.info("chat app: configuration reloaded (%s, %s)", self.client.provider, self.client.model)
+        # The new adapters open their connections now rather than on the next user's request
+        asyncio.ensure_future(warm_up(self.client, self.config["warmup"]))
+        return True
+
+    @contextlib.contextmanager
+    def turn(self) -> Iterator[UniversalLLMClient]:
+        """The client for one chat turn, refreshed first; it stays open until the turn ends"""
+        self.refresh()
+        client = self.client
+        self._turns[client] = self._turns.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            self._turns[client] -= 1
+            if not self._turns[client]:
+                del self._turns[client]
+                if client is not self.client:
+                    self._close_later(client)
+
+    def _close_later(self, client: UniversalLLMClient):
+        async def close():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning("chat app: closing the previous client failed: %s", e)
+        asyncio.ensure_future(close())
+
+    def setting(self, section: str, key: str, default: Any = None) -> Any:
+        return self.config.get(section, {}).get(key, default)
+
+    @property
+    def log_level(self) -> str:
+        return os.getenv("LOG_LEVEL", self.setting("app_settings", "log_level", "INFO"))
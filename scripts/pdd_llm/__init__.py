@@ -0,0 +1,155 @@
+"""
+PDD LLM Client Package
+Provider adapters, shared HTTP transport and the universal chat client
+"""
+
+from .batch import BatchRunner, read_items
+from .breaker import CircuitBreaker, CircuitOpenError, circuit_states, configure_circuit_breakers
+from .cache import ResponseCache, make_cache_key
+from .client import UniversalLLMClient
+from .config import (
+    DEFAULT_CONFIG,
+    ConfigConflict,
+    ConfigError,
+    ConfigLoader,
+    apply_edits,
+    checkout_config,
+    default_config,
+    get_config_loader,
+    load_config,
+    migrate_config,
+    normalize_config,
+    save_config,
+    update_config,
+)
+from .providers import (
+    SUPPORTED_PROVIDERS,
+    ProviderAdapter,
+    OpenAICompatibleAdapter,
+    AnthropicAdapter,
+    GeminiAdapter,
+    create_adapter,
+    gemini_executor,
+)
+from .deadline import DeadlineExceeded, deadline_scope
+from .executor import BoundedExecutor
+from .filestore import FileLockTimeout, atomic_write, file_lock, update_text, write_text
+from .health import HEALTH, WorkerHealth, mount_health
+from .hedging import HedgePolicy
+from .loadgen import LoadGenerator, LoopLagMonitor
+from .mock_server import LatencyModel, MockLLMServer
+from .metrics import METRICS, LLMMetrics, mount_metrics, render_metrics, start_metrics_server
+from .memory import ConversationMemory, count_tokens, prompt_budget
+from .prompt_cache import PromptCacheStats, configure_prompt_cache
+from .ratelimit import (
+    ProviderRateLimiter,
+    RateLimitTimeout,
+    TokenBucket,
+    configure_rate_limits,
+    get_rate_limiter,
+)
+from .router import BackendStats, LLMRouter
+from .scheduler import RequestScheduler, configure_scheduler, get_scheduler
+from .semantic_cache import HashingEmbedder, OpenAIEmbedder, SemanticCache
+from .singleflight import SingleFlight
+from .startup import IMPORT_TIMES, lazy_import, record_import, startup_report, timed_import
+from .summarizer import ConversationSummarizer
+from .transport import SharedTransport, get_transport
+from .warmup import client_adapters, install_warmup, warm_up
+from .workers import (
+    StickyBalancer,
+    WorkerPool,
+    WorkerPoolError,
+    resolve_worker_count,
+    worker_count,
+    worker_index,
+)
+
+__all__ = [
+    "BatchRunner",
+    "read_items",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "circuit_states",
+    "configure_circuit_breakers",
+    "ResponseCache",
+    "make_cache_key",
+    "UniversalLLMClient",
+    "DEFAULT_CONFIG",
+    "ConfigConflict",
+    "ConfigError",
+    "ConfigLoader",
+    "apply_edits",
+    "checkout_config",
+    "default_config",
+    "get_config_loader",
+    "load_config",
+    "migrate_config",
+    "normalize_config",
+    "save_config",
+    "update_config",
+    "SUPPORTED_PROVIDERS",
+    "ProviderAdapter",
+    "OpenAICompatibleAdapter",
+    "AnthropicAdapter",
+    "GeminiAdapter",
+    "create_adapter",
+    "gemini_executor",
+    "DeadlineExceeded",
+    "deadline_scope",
+    "BoundedExecutor",
+    "FileLockTimeout",
+    "atomic_write",
+    "file_lock",
+    "update_text",
+    "write_text",
+    "PromptCacheStats",
+    "configure_prompt_cache",
+    "ProviderRateLimiter",
+    "RateLimitTimeout",
+    "TokenBucket",
+    "configure_rate_limits",
+    "get_rate_limiter",
+    "HEALTH",
+    "WorkerHealth",
+    "mount_health",
+    "HedgePolicy",
+    "LoadGenerator",
+    "LoopLagMonitor",
+    "LatencyModel",
+    "MockLLMServer",
+    "METRICS",
+    "LLMMetrics",
+    "mount_metrics",
+    "render_metrics",
+    "start_metrics_server",
+    "ConversationMemory",
+    "count_tokens",
+    "prompt_budget",
+    "BackendStats",
+    "LLMRouter",
+    "RequestScheduler",
+    "configure_scheduler",
+    "get_scheduler",
+    "HashingEmbedder",
+    "OpenAIEmbedder",
+    "SemanticCache",
+    "SingleFlight",
+    "IMPORT_TIMES",
+    "lazy_import",
+    "record_import",
+    "startup_report",
+    "timed_import",
+    "ConversationSummarizer",
+    "SharedTransport",
+    "get_transport",
+    "client_adapters",
+    "install_warmup",
+    "warm_up",
+    "StickyBalancer",
+    "WorkerPool",
+    "WorkerPoolError",
+    "resolve_worker_count",
+    "worker_count",
+    "worker_index",
+]
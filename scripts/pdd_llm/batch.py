@@ -0,0 +1,328 @@
+"""
+Bulk Prompt Processing
+Runs a JSONL file of prompts through UniversalLLMClient with bounded
+concurrency, or through the provider's batch API, with resumable output
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .client import UniversalLLMClient
+from .hedging import percentile
+from .providers import AnthropicAdapter, OpenAICompatibleAdapter, ProviderAdapter, anthropic_text
+from .router import LLMRouter
+from .scheduler import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SETTINGS = {
+    "mode": "auto",
+    "concurrency": 8,
+    "chunk_size": 1000,
+    "poll_interval_seconds": 30.0,
+    "completion_window": "24h",
+    "retry_errors": False
+}
+
+# Providers whose batch API is used in "auto" mode
+BATCH_API_PROVIDERS = ("openai", "anthropic")
+
+BatchItem = Tuple[str, List[Dict[str, str]]]
+BatchResult = Tuple[Optional[str], Optional[str]]
+
+
+def read_items(path: Path) -> Iterator[BatchItem]:
+    """(id, messages) per input line, read lazily
+
+    A line is {"id": ..., "prompt": ..., "system": ...} or
+    {"id": ..., "messages": [...]}; id defaults to the line number.
+    """
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            messages = entry.get("messages")
+            if messages is None:
+                messages = [{"role": "user", "content": entry["prompt"]}]
+                if entry.get("system"):
+                    messages.insert(0, {"role": "system", "content": entry["system"]})
+            yield str(entry.get("id", number)), messages
+
+
+def _chunks(items: Iterable[BatchItem], size: int) -> Iterator[List[BatchItem]]:
+    chunk: List[BatchItem] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class OpenAIBatchAPI:
+    """OpenAI Batch API: upload a JSONL file of requests, poll the job, download the output file"""
+
+    def __init__(self, adapter: OpenAICompatibleAdapter, completion_window: str = "24h"):
+        self.adapter = adapter
+        self.completion_window = completion_window
+
+    async def submit(self, items: List[BatchItem], max_tokens: int, temperature: float) -> str:
+        lines = [
+            json.dumps({
+                "custom_id": f"item-{index}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": self.adapter.model, "messages": messages,
+                         "max_tokens": max_tokens, "temperature": temperature}
+            })
+            for index, (_, messages) in enumerate(items)
+        ]
+        upload = await self.adapter.client.files.create(
+            file=("batch.jsonl", ("\n".join(lines) + "\n").encode()),
+            purpose="batch"
+        )
+        job = await self.adapter.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+        return job.id
+
+    async def poll(self, job_id: str) -> Optional[Dict[str, BatchResult]]:
+        """custom_id -> (response, error) once the job has ended, else None"""
+        job = await self.adapter.client.batches.retrieve(job_id)
+        if job.status in ("validating", "in_progress", "finalizing", "cancelling"):
+            return None
+        results: Dict[str, BatchResult] = {}
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            content = await self.adapter.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                body = response.get("body") or {}
+                if response.get("status_code") == 200:
+                    choices = body.get("choices") or [{}]
+                    results[entry["custom_id"]] = (choices[0].get("message") or {}).get("content"), None
+                else:
+                    error = entry.get("error") or body.get("error") or {}
+                    results[entry["custom_id"]] = None, error.get("message") or f"HTTP {response.get('status_code')}"
+        if job.status != "completed":
+            logger.warning("batch %s ended with status %s", job_id, job.status)
+        return results
+
+
+class AnthropicBatchAPI:
+    """Anthropic Message Batches API"""
+
+    def __init__(self, adapter: AnthropicAdapter):
+        self.adapter = adapter
+
+    async def submit(self, items: List[BatchItem], max_tokens: int, temperature: float) -> str:
+        requests = [
+            {
+                "custom_id": f"item-{index}",
+                "params": dict(self.adapter.request_params(messages), model=self.adapter.model,
+                               max_tokens=max_tokens, temperature=temperature)
+            }
+            for index, (_, messages) in enumerate(items)
+        ]
+        job = await self.adapter.client.messages.batches.create(requests=requests)
+        return job.id
+
+    async def poll(self, job_id: str) -> Optional[Dict[str, BatchResult]]:
+        job = await self.adapter.client.messages.batches.retrieve(job_id)
+        if job.processing_status != "ended":
+            return None
+        results: Dict[str, BatchResult] = {}
+        async for entry in await self.adapter.client.messages.batches.results(job_id):
+            result = entry.result
+            if result.type == "succeeded":
+                # An empty reply is reported as an error by write_result
+                results[entry.custom_id] = anthropic_text(result.message), None
+            else:
+                error = getattr(getattr(result, "error", None), "error", None)
+                results[entry.custom_id] = None, getattr(error, "message", None) or result.type
+        return results
+
+
+def batch_api_for(adapter: ProviderAdapter, settings: Dict[str, Any]):
+    """The provider batch API for an adapter, None when it has none"""
+    if adapter.provider not in BATCH_API_PROVIDERS:
+        return None
+    if isinstance(adapter, OpenAICompatibleAdapter):
+        return OpenAIBatchAPI(adapter, settings["completion_window"])
+    if isinstance(adapter, AnthropicAdapter):
+        return AnthropicBatchAPI(adapter)
+    return None
+
+
+class BatchRunner:
+    """Processes an input JSONL into an output JSONL, resuming where a previous run stopped
+
+    Each output line is {"id", "response", "error", ...}, appended as
+    results arrive, so ids already in the output are skipped on the next
+    run. A retried id appears again further down; its last line wins.
+    Submitted provider batch jobs are recorded in <output>.jobs.json and
+    polled again on resume instead of resubmitted.
+    """
+
+    def __init__(self, client: UniversalLLMClient, settings: Optional[Dict[str, Any]] = None):
+        self.client = client
+        self.settings = dict(DEFAULT_BATCH_SETTINGS)
+        self.settings.update(settings or {})
+        self.counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+        self.latencies: List[float] = []
+        self.output_chars = 0
+        self._output = None
+
+    @property
+    def adapter(self) -> ProviderAdapter:
+        client = self.client.client
+        return client.backends[0].adapter if isinstance(client, LLMRouter) else client
+
+    def batch_api(self):
+        """Provider batch API to use, or None to run the prompts online"""
+        mode = self.settings["mode"]
+        if mode == "online":
+            return None
+        api = batch_api_for(self.adapter, self.settings)
+        if api is None and mode == "provider":
+            raise ValueError(f"{self.client.provider} has no batch API; use mode online")
+        return api
+
+    @staticmethod
+    def checkpoint_path(output: Path) -> Path:
+        return output.with_name(output.name + ".jobs.json")
+
+    def load_done(self, output: Path) -> Set[str]:
+        """Ids already in the output, leaving out failed ones when retry_errors is set"""
+        done: Set[str] = set()
+        if output.exists():
+            with open(output, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record.get("error") is None or not self.settings["retry_errors"]:
+                        done.add(record["id"])
+        return done
+
+    def load_jobs(self, output: Path) -> List[Dict[str, Any]]:
+        path = self.checkpoint_path(output)
+        return json.loads(path.read_text())["jobs"] if path.exists() else []
+
+    def save_jobs(self, output: Path, jobs: List[Dict[str, Any]]):
+        path = self.checkpoint_path(output)
+        if not jobs:
+            path.unlink(missing_ok=True)
+            return
+        temp = path.with_name(path.name + ".tmp")
+        temp.write_text(json.dumps({"jobs": jobs}, indent=2))
+        os.replace(temp, path)
+
+    def write_result(self, item_id: str, response: Optional[str], error: Optional[str], **extra: Any):
+        if error is None and not response:
+            error = "empty response"
+        record = {"id": item_id, "response": response if error is None else None, "error": error}
+        record.update(extra)
+        self._output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._output.flush()
+        if error is None:
+            self.counts["succeeded"] += 1
+            self.output_chars += len(response)
+        else:
+            self.counts["failed"] += 1
+
+    async def run(self, input_path: Path, output_path: Path) -> Dict[str, Any]:
+        api = self.batch_api()
+        done = self.load_done(output_path)
+        jobs = self.load_jobs(output_path) if api is not None else []
+        if any(job["provider"] != self.client.provider for job in jobs):
+            raise ValueError(f"{self.checkpoint_path(output_path)} has jobs from another provider; "
+                             f"finish them with that provider or delete the file")
+        pending = {item_id for job in jobs for item_id in job["ids"]}
+
+        def remaining() -> Iterator[BatchItem]:
+            for item_id, messages in read_items(input_path):
+                if item_id in done:
+                    self.counts["skipped"] += 1
+                    continue
+                if item_id in pending:
+                    # Written when its submitted job is collected
+                    continue
+                done.add(item_id)
+                yield item_id, messages
+
+        started = time.perf_counter()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "a", encoding="utf-8") as self._output:
+            if api is None:
+                await self.run_online(remaining())
+            else:
+                await self.run_provider_batches(api, remaining(), jobs, output_path)
+        self._output = None
+        return self.report(time.perf_counter() - started, "online" if api is None else "provider")
+
+    async def run_online(self, items: Iterator[BatchItem]):
+        """concurrency workers pull from one shared iterator, so the input is never fully loaded"""
+        async def worker():
+            for item_id, messages in items:
+                started = time.perf_counter()
+                response, error = None, None
+                try:
+                    response = await self.client.complete(messages, session_id="batch", lane=BACKGROUND)
+                except Exception as e:
+                    # One failed prompt is recorded, not fatal to the run
+                    error = str(e) or type(e).__name__
+                latency = time.perf_counter() - started
+                self.latencies.append(latency)
+                self.write_result(item_id, response, error, latency_ms=round(latency * 1000, 1))
+
+        await asyncio.gather(*(worker() for _ in range(max(1, self.settings["concurrency"]))))
+
+    async def run_provider_batches(self, api, items: Iterator[BatchItem], jobs: List[Dict[str, Any]],
+                                   output_path: Path):
+        for chunk in _chunks(items, self.settings["chunk_size"]):
+            job_id = await api.submit(chunk, self.client.max_tokens, self.client.temperature)
+            jobs.append({"id": job_id, "provider": self.client.provider, "ids": [item_id for item_id, _ in chunk]})
+            self.save_jobs(output_path, jobs)
+            logger.info("batch: submitted %s with %d requests", job_id, len(chunk))
+
+        while jobs:
+            for job in list(jobs):
+                results = await api.poll(job["id"])
+                if results is None:
+                    continue
+                for index, item_id in enumerate(job["ids"]):
+                    response, error = results.get(f"item-{index}", (None, "missing from batch results"))
+                    self.write_result(item_id, response, error, batch_id=job["id"])
+                jobs.remove(job)
+                self.save_jobs(output_path, jobs)
+                logger.info("batch: %s finished", job["id"])
+            if jobs:
+                await asyncio.sleep(self.settings["poll_interval_seconds"])
+
+    def report(self, elapsed: float, mode: str) -> Dict[str, Any]:
+        processed = self.counts["succeeded"] + self.counts["failed"]
+        report: Dict[str, Any] = dict(self.counts)
+        report.update({
+            "mode": mode,
+            "elapsed_seconds": round(elapsed, 2),
+            "prompts_per_second": round(processed / elapsed, 2) if elapsed else 0.0,
+            "output_tokens_per_second": round(self.output_chars / 4 / elapsed, 1) if elapsed else 0.0
+        })
+        if self.latencies:
+            report["latency_ms"] = {f"p{pct}": round(percentile(self.latencies, pct) * 1000, 1)
+                                    for pct in (50, 95, 99)}
+        return report
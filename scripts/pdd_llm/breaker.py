@@ -0,0 +1,173 @@
+"""
+Per-Provider Circuit Breaker
+Fails fast while a provider is down instead of waiting out SDK timeouts,
+and lets a single cheap probe decide when it is back
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .deadline import DeadlineExceeded
+from .errors import error_status, is_connection_error, is_timeout
+from .ratelimit import RateLimitTimeout
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BREAKER_SETTINGS = {
+    "enabled": True,
+    "failure_threshold": 5,
+    "open_seconds": 30.0,
+    "max_open_seconds": 300.0,
+    "probe": True,
+    "probe_timeout_seconds": 10.0
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit is open; the call was rejected without being sent"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable (circuit open, retrying in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_outage(exc: BaseException) -> bool:
+    """Failures that say the provider is down: timeouts, network errors and 5xx
+
+    429s mean the provider is up and are left to the rate limiter; an
+    expired request deadline or a wait on our own limiter says nothing
+    about the provider at all.
+    """
+    if isinstance(exc, (DeadlineExceeded, RateLimitTimeout)):
+        return False
+    if is_timeout(exc) or is_connection_error(exc):
+        return True
+    status = error_status(exc)
+    return status is not None and status >= 500
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive outages -> half-open after open_seconds
+
+    In half-open exactly one call (the probe) is let through: success
+    closes the circuit, failure reopens it with a doubled open period,
+    capped at max_open_seconds.
+    """
+
+    def __init__(self, name: str, settings: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.settings = dict(DEFAULT_BREAKER_SETTINGS)
+        self.settings.update(settings or {})
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_seconds = self.settings["open_seconds"]
+        self._probing = False
+        self.counters = {"opened": 0, "rejected": 0, "probes": 0}
+
+    def retry_in(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.opened_at + self.open_seconds - now)
+
+    def available(self) -> bool:
+        """Whether a call now would be attempted rather than rejected"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.retry_in() == 0
+        return not self._probing
+
+    def allow(self) -> bool:
+        """Admit a call; True when it is the half-open probe. Raises CircuitOpenError otherwise"""
+        if not self.settings["enabled"] or self.state == CLOSED:
+            return False
+        now = time.monotonic()
+        if self.state == OPEN and self.retry_in(now) == 0:
+            self.state = HALF_OPEN
+            logger.info("circuit: %s half-open, probing", self.name)
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            self.counters["probes"] += 1
+            return True
+        self.counters["rejected"] += 1
+        raise CircuitOpenError(self.name, self.retry_in(now) if self.state == OPEN else self.open_seconds)
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != CLOSED:
+            logger.info("circuit: %s closed", self.name)
+            self.state = CLOSED
+            self.open_seconds = self.settings["open_seconds"]
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self._open(min(self.open_seconds * 2, self.settings["max_open_seconds"]))
+        elif self.state == CLOSED and self.failures >= self.settings["failure_threshold"]:
+            self._open(self.settings["open_seconds"])
+
+    def record(self, exc: BaseException):
+        """Outcome of a call that raised; errors that are not outages count as the provider answering"""
+        if not self.settings["enabled"]:
+            return
+        if isinstance(exc, DeadlineExceeded):
+            # The caller's time budget ran out; that says nothing about the provider
+            self.release()
+            return
+        if is_outage(exc):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def release(self):
+        """The call ended without an outcome (cancelled); let another call probe"""
+        self._probing = False
+
+    def _open(self, seconds: float):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.open_seconds = seconds
+        self._probing = False
+        self.counters["opened"] += 1
+        logger.warning("circuit: %s open for %.0fs after %d failures", self.name, seconds, self.failures)
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in_seconds": round(self.retry_in(), 1) if self.state == OPEN else 0.0
+        }
+        snapshot.update(self.counters)
+        return snapshot
+
+
+_breaker_settings: Dict[str, Any] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def configure_circuit_breakers(settings: Optional[Dict[str, Any]]):
+    """Settings from the circuit_breaker section of config.json, applied to every provider"""
+    _breaker_settings.update(settings or {})
+    for breaker in _breakers.values():
+        breaker.settings.update(settings or {})
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Process-wide breaker for a provider, shared by all its adapters"""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        breaker = CircuitBreaker(provider, _breaker_settings)
+        _breakers[provider] = breaker
+    return breaker
+
+
+def circuit_states() -> Dict[str, Dict[str, Any]]:
+    """Breaker state per provider, for logs and monitoring"""
+    return {provider: breaker.snapshot() for provider, breaker in _breakers.items()}
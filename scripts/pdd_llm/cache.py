@@ -0,0 +1,210 @@
+"""
+LLM Response Cache
+Exact-match cache with an in-memory LRU tier and a persistent SQLite tier
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": True,
+    "deterministic_only": True,
+    "ttl_seconds": 86400,
+    "max_entries": 1024,
+    "db_path": ".cache/llm_responses.db",
+    "max_db_entries": 50000
+}
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Strip incidental whitespace so equivalent prompts share a key"""
+    normalized = []
+    for msg in messages:
+        content = str(msg.get("content", "")).replace("\r\n", "\n").strip()
+        normalized.append({"role": msg.get("role", "user").strip().lower(), "content": content})
+    return normalized
+
+
+def make_cache_key(provider: str, model: str, messages: List[Dict[str, str]],
+                   params: Optional[Dict[str, Any]] = None) -> str:
+    """Stable digest of everything that determines a completion"""
+    payload = {
+        "provider": provider,
+        "model": model,
+        "messages": normalize_messages(messages),
+        "params": params or {}
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier exact-match cache: LRU dict in front of SQLite (WAL mode)
+
+    Entries expire after ttl_seconds. The memory tier evicts least
+    recently used entries past max_entries; the SQLite tier prunes the
+    least recently accessed rows past max_db_entries. Async callers use
+    aget()/aset(), which run the SQLite work on the cache's own thread.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 1024,
+                 db_path: Optional[str] = None, max_db_entries: int = 50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_db_entries = max_db_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0,
+                         "misses": 0, "expired": 0, "evictions": 0, "writes": 0}
+
+        self.db = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]] = None) -> "ResponseCache":
+        """Build a cache from the cache section of config.json"""
+        merged = dict(DEFAULT_CACHE_SETTINGS)
+        merged.update(settings or {})
+        return cls(
+            ttl_seconds=merged["ttl_seconds"],
+            max_entries=merged["max_entries"],
+            db_path=merged["db_path"],
+            max_db_entries=merged["max_db_entries"]
+        )
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.counters["hits"] += 1
+                    self.counters["memory_hits"] += 1
+                    return value
+                # The SQLite row has the same timestamp and is dropped below
+                del self._memory[key]
+
+            if self.db is not None:
+                row = self.db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if not self._expired(created_at, now):
+                        self.db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                        self._remember(key, value, created_at)
+                        self.counters["hits"] += 1
+                        self.counters["disk_hits"] += 1
+                        return value
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self.counters["expired"] += 1
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a completion in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self.counters["writes"] += 1
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self.PRUNE_EVERY:
+                    self._prune(now)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() without blocking the event loop on SQLite"""
+        if self._executor is None:
+            return self.get(key)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.get, key)
+
+    async def aset(self, key: str, value: str):
+        """set() without blocking the event loop on SQLite"""
+        if self._executor is None:
+            self.set(key, value)
+            return
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.set, key, value)
+
+    def _prune(self, now: float):
+        """Drop expired rows, then the least recently used past the size cap"""
+        self._writes_since_prune = 0
+        if self.ttl_seconds > 0:
+            self.db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        excess = count - self.max_db_entries
+        if excess > 0:
+            self.db.execute(
+                "DELETE FROM responses WHERE key IN"
+                " (SELECT key FROM responses ORDER BY last_access LIMIT ?)", (excess,)
+            )
+            self.counters["evictions"] += excess
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+            if self.db is not None:
+                stats["db_entries"] = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._memory.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM responses")
+
+    def close(self):
+        if self._executor is not None:
+            # Let queued writes finish first
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.db is not None:
+            self.db.close()
+            self.db = None
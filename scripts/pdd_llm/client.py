@@ -0,0 +1,339 @@
+"""
+Universal LLM Client
+Single entry point used by the Chainlit app for every configured provider
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .breaker import circuit_states, configure_circuit_breakers
+from .cache import DEFAULT_CACHE_SETTINGS, ResponseCache, make_cache_key
+from .deadline import deadline_after, deadline_scope, stream_with_deadline
+from .memory import DEFAULT_MEMORY_SETTINGS, ConversationMemory, prompt_budget
+from .metrics import METRICS
+from .prompt_cache import configure_prompt_cache
+from .ratelimit import configure_rate_limits, estimate_tokens
+from .providers import OpenAICompatibleAdapter, ProviderAdapter, create_adapter
+from .router import LLMRouter
+from .scheduler import INTERACTIVE, configure_scheduler
+from .semantic_cache import DEFAULT_SEMANTIC_SETTINGS, SemanticCache
+from .singleflight import SingleFlight
+from .summarizer import DEFAULT_SUMMARY_SETTINGS, ConversationSummarizer
+from .transport import SharedTransport, get_transport
+
+logger = logging.getLogger(__name__)
+
+
+class UniversalLLMClient:
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 transport: Optional[SharedTransport] = None):
+        config = config or {}
+        generation = config.get("generation", {})
+        # config.json's provider entry, with the environment as an override
+        self.provider = os.getenv("LLM_PROVIDER") or config.get("llm_provider", "openai")
+        provider_config = config.get("providers", {}).get(self.provider, {})
+        self.api_key = os.getenv("API_KEY") or provider_config.get("api_key") or None
+        self.model = os.getenv("MODEL") or provider_config.get("model") or None
+        self.base_url = os.getenv("BASE_URL") or provider_config.get("base_url") or None
+        self.api_version = (os.getenv("API_VERSION") or provider_config.get("api_version")
+                            or "2024-02-15-preview")
+        self.streaming = os.getenv("STREAMING", "true").lower() == "true"
+        self.temperature = float(os.getenv("TEMPERATURE", generation.get("temperature", 0.7)))
+        self.max_tokens = int(os.getenv("MAX_TOKENS", generation.get("max_tokens", 2000)))
+        # Default deadline for a chat turn, from the first byte sent to the last token received
+        self.request_timeout = float(os.getenv("REQUEST_TIMEOUT", generation.get("timeout_seconds") or 0)) or None
+        self.memory_settings = dict(DEFAULT_MEMORY_SETTINGS)
+        self.memory_settings.update(config.get("memory", {}))
+        self.transport = transport or get_transport(config.get("http"))
+        configure_rate_limits(config.get("rate_limits"))
+        configure_prompt_cache(config.get("prompt_cache"))
+        configure_circuit_breakers(config.get("circuit_breaker"))
+        self.scheduler = configure_scheduler(config.get("scheduler"))
+        self.config = config
+
+        # The adapter (and with it the provider SDK) is built on first use
+        self._client: Optional[Any] = None
+        self.routed = bool(config.get("routing", {}).get("enabled") or config.get("hedging", {}).get("enabled"))
+
+        self.summary_settings = dict(DEFAULT_SUMMARY_SETTINGS)
+        self.summary_settings.update(config.get("summarization", {}))
+        self._summarizer: Optional[ConversationSummarizer] = None
+        self._summarizer_built = False
+
+        self.cache_settings = dict(DEFAULT_CACHE_SETTINGS)
+        self.cache_settings.update(config.get("cache", {}))
+        self.cache = ResponseCache.from_settings(self.cache_settings) if self.cache_settings["enabled"] else None
+
+        semantic_settings = dict(DEFAULT_SEMANTIC_SETTINGS)
+        semantic_settings.update(config.get("semantic_cache", {}))
+        self.semantic_cache = None
+        if semantic_settings["enabled"]:
+            # Provider embeddings need an OpenAI-compatible client, otherwise use the offline embedder;
+            # this builds the adapter now rather than on the first request
+            primary = self.client.backends[0].adapter if isinstance(self.client, LLMRouter) else self.client
+            embedding_client = primary.client if isinstance(primary, OpenAICompatibleAdapter) else None
+            self.semantic_cache = SemanticCache.from_settings(semantic_settings, embedding_client)
+
+        # Identical concurrent requests share one upstream call
+        self.singleflight = SingleFlight() if config.get("singleflight", {}).get("enabled", True) else None
+
+    @property
+    def client(self):
+        """Provider adapter, or a router over several when routing or hedging is enabled"""
+        if self._client is None:
+            client = self.setup_client()
+            if self.routed:
+                # The configured provider becomes the primary of several backends
+                client = LLMRouter.from_config(client, self.config, self.transport)
+            self._client = client
+        return self._client
+
+    @property
+    def summarizer(self) -> Optional[ConversationSummarizer]:
+        """Shared summarizer, built when the first conversation memory is"""
+        if not self._summarizer_built:
+            self._summarizer_built = True
+            if self.memory_settings["enabled"] and self.summary_settings["enabled"]:
+                self._summarizer = self.setup_summarizer(self.config)
+        return self._summarizer
+
+    def setup_client(self) -> ProviderAdapter:
+        """Setup adapter based on provider"""
+        return create_adapter(
+            self.provider,
+            self.api_key,
+            self.model,
+            base_url=self.base_url,
+            api_version=self.api_version,
+            transport=self.transport
+        )
+
+    def setup_summarizer(self, config: Dict[str, Any]) -> Optional[ConversationSummarizer]:
+        """Summarizer on the configured cheap provider/model, defaulting to the chat provider"""
+        provider = self.summary_settings["provider"] or self.provider
+        if provider == self.provider:
+            api_key, base_url, api_version = self.api_key, self.base_url, self.api_version
+            model = self.summary_settings["model"] or self.model
+        else:
+            provider_config = config.get("providers", {}).get(provider, {})
+            api_key = provider_config.get("api_key")
+            base_url = provider_config.get("base_url")
+            api_version = provider_config.get("api_version")
+            model = self.summary_settings["model"] or provider_config.get("model")
+        try:
+            adapter = create_adapter(
+                provider,
+                api_key,
+                model,
+                base_url=base_url,
+                api_version=api_version,
+                transport=self.transport
+            )
+        except (ImportError, ValueError) as e:
+            logger.warning("summarization disabled: %s", e)
+            return None
+        return ConversationSummarizer(adapter, self.summary_settings["max_summary_tokens"], self.scheduler)
+
+    def new_memory(self, system_prompt: Optional[str] = None) -> Optional[ConversationMemory]:
+        """Conversation memory sized for this client's model, None when disabled"""
+        if not self.memory_settings["enabled"]:
+            return None
+        budget = prompt_budget(self.model, self.max_tokens, self.memory_settings["max_prompt_tokens"])
+        return ConversationMemory(
+            self.model,
+            system_prompt,
+            budget,
+            summarizer=self.summarizer,
+            trigger_ratio=self.summary_settings["trigger_ratio"],
+            keep_recent_turns=self.summary_settings["keep_recent_turns"]
+        )
+
+    @property
+    def sampling_params(self) -> Dict[str, Any]:
+        return {"temperature": self.temperature, "max_tokens": self.max_tokens}
+
+    def cache_key(self, messages: list) -> Optional[str]:
+        """Cache key for a request, or None when it should not be cached"""
+        if self.cache is None:
+            return None
+        if self.cache_settings["deterministic_only"] and self.temperature != 0:
+            return None
+        return make_cache_key(self.provider, self.model, messages, self.sampling_params)
+
+    async def cached_response(self, messages: list, key: Optional[str]) -> Optional[str]:
+        """Exact-match cache first, then the semantic cache"""
+        if key:
+            try:
+                cached = await self.cache.aget(key)
+            except Exception as e:
+                # A broken cache database is a miss, not a failed chat turn
+                logger.warning("response cache: lookup failed: %s", e)
+                cached = None
+            if cached is not None:
+                METRICS.cache_hit(self.provider, self.model, "exact")
+                return cached
+        if self.semantic_cache is not None:
+            try:
+                cached = await self.semantic_cache.lookup(
+                    self.provider, self.model, messages, self.sampling_params
+                )
+            except Exception:
+                # A failing embedder must never fail the chat turn
+                return None
+            if cached is not None:
+                METRICS.cache_hit(self.provider, self.model, "semantic")
+            return cached
+        return None
+
+    async def remember_response(self, messages: list, key: Optional[str], response: str):
+        """Store a completed response in every enabled cache"""
+        if key:
+            try:
+                await self.cache.aset(key, response)
+            except Exception as e:
+                # The response was delivered; failing to keep it must not fail the turn
+                logger.warning("response cache: write failed: %s", e)
+        if self.semantic_cache is not None:
+            try:
+                await self.semantic_cache.store(
+                    self.provider, self.model, messages, response, self.sampling_params
+                )
+            except Exception:
+                pass
+
+    def flight_key(self, messages: list) -> str:
+        """Identity of a request for single-flight coalescing"""
+        return make_cache_key(self.provider, self.model, messages, self.sampling_params)
+
+    def request_cost(self, messages: list) -> int:
+        """Approximate prompt tokens, the scheduler's fairness cost for a request
+
+        The character estimate the rate limiter uses: running the tokenizer
+        over the whole history here would recount every turn on every turn.
+        """
+        return estimate_tokens(messages, 0)
+
+    async def _complete_upstream(self, messages: list, key: Optional[str],
+                                 session_id: Optional[str] = None, lane: str = INTERACTIVE) -> str:
+        if self.scheduler is None:
+            response = await self.client.complete(
+                messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            )
+        else:
+            async with self.scheduler.slot(session_id or "", lane, self.request_cost(messages)):
+                response = await self.client.complete(
+                    messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature
+                )
+        if response:
+            await self.remember_response(messages, key, response)
+        return response
+
+    async def _stream_upstream(self, messages: list, key: Optional[str],
+                               session_id: Optional[str] = None, lane: str = INTERACTIVE) -> AsyncIterator[str]:
+        parts = []
+        if self.scheduler is not None:
+            # The slot is held until the stream ends or the consumer closes it
+            await self.scheduler.acquire(session_id or "", lane, self.request_cost(messages))
+        stream = self.client.stream(
+            messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature
+        )
+        try:
+            async for delta in stream:
+                parts.append(delta)
+                yield delta
+        finally:
+            # Close the provider stream now rather than when the generator is collected
+            await stream.aclose()
+            if self.scheduler is not None:
+                self.scheduler.release()
+
+        # Only complete streams are cached
+        if parts:
+            await self.remember_response(messages, key, "".join(parts))
+
+    async def complete(self, messages: list, session_id: Optional[str] = None,
+                       lane: str = INTERACTIVE, timeout: Optional[float] = None) -> str:
+        """Chat completion that raises on failure; session_id and lane decide its place in the scheduler queue
+
+        timeout (default generation.timeout_seconds) is the deadline for
+        the whole call. Cancelling the calling task aborts the provider
+        request and frees its scheduler slot.
+        """
+        key = self.cache_key(messages)
+        cached = await self.cached_response(messages, key)
+        if cached is not None:
+            return cached
+
+        with deadline_scope(timeout or self.request_timeout):
+            if self.singleflight is not None:
+                return await self.singleflight.do(
+                    self.flight_key(messages),
+                    lambda: self._complete_upstream(messages, key, session_id, lane)
+                )
+            return await self._complete_upstream(messages, key, session_id, lane)
+
+    async def chat_completion(self, messages: list, session_id: Optional[str] = None,
+                              lane: str = INTERACTIVE, timeout: Optional[float] = None) -> str:
+        """Universal chat completion; a failure comes back as an "Error: ..." reply instead of raising"""
+        try:
+            return await self.complete(messages, session_id, lane, timeout)
+        except Exception as e:
+            return f"Error: {str(e)}"
+
+    async def stream_chat_completion(self, messages: list, session_id: Optional[str] = None,
+                                     lane: str = INTERACTIVE, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Universal streaming chat completion, yields text deltas as they arrive
+
+        Closing the generator (or cancelling its consumer) closes the
+        provider stream; timeout works as for complete.
+        """
+        key = self.cache_key(messages)
+        cached = await self.cached_response(messages, key)
+        if cached is not None:
+            yield cached
+            return
+
+        if self.singleflight is not None:
+            source = self.singleflight.stream(
+                self.flight_key(messages),
+                lambda: self._stream_upstream(messages, key, session_id, lane)
+            )
+        else:
+            source = self._stream_upstream(messages, key, session_id, lane)
+        stream = stream_with_deadline(source, deadline_after(timeout or self.request_timeout))
+        try:
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+
+    def prompt_cache_stats(self) -> Dict[str, Any]:
+        """Prompt tokens served from each backend's provider-side cache"""
+        if isinstance(self.client, LLMRouter):
+            adapters = [backend.adapter for backend in self.client.backends]
+        else:
+            adapters = [self.client]
+        return {adapter.prompt_cache.name: adapter.prompt_cache.snapshot() for adapter in adapters}
+
+    def scheduler_stats(self) -> Optional[Dict[str, Any]]:
+        """Active slots and queue depth per lane, None when the scheduler is off"""
+        return self.scheduler.stats() if self.scheduler is not None else None
+
+    def circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker state per provider"""
+        return circuit_states()
+
+    async def aclose(self):
+        """Release pooled connections and the cache database"""
+        await self.transport.aclose()
+        if self.cache is not None:
+            # Waits for queued cache writes, so not on the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.close)
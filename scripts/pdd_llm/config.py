@@ -0,0 +1,566 @@
+"""
+Shared Configuration Loader
+config.json parsed, migrated from older layouts and validated once per change,
+for every script and the chat app
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypedDict
+
+from .filestore import PathLike, atomic_write, file_lock, read_text
+
+logger = logging.getLogger(__name__)
+
+CONFIG_SCHEMA_VERSION = 2
+
+# Provider sections that the environment configurator wrote at the top level
+LEGACY_PROVIDER_KEYS = ("openai", "deepseek", "anthropic", "local", "azure", "gemini")
+
+
+class ProviderConfig(TypedDict, total=False):
+    api_key: str
+    model: str
+    base_url: str
+    api_version: str
+
+
+class OAuthClientConfig(TypedDict, total=False):
+    client_id: str
+    client_secret: str
+    redirect_uri: str
+    scopes: str
+    access_token: str
+
+
+class AppConfig(TypedDict, total=False):
+    schema_version: int
+    llm_provider: str
+    providers: Dict[str, ProviderConfig]
+    oauth_clients: Dict[str, OAuthClientConfig]
+    session: Dict[str, Any]
+    app_settings: Dict[str, Any]
+    git_integration: Dict[str, Any]
+
+
+class ConfigError(ValueError):
+    """config.json is not valid JSON or does not match the schema"""
+
+
+class ConfigConflict(RuntimeError):
+    """config.json was changed by someone else since it was read"""
+
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "schema_version": CONFIG_SCHEMA_VERSION,
+    "llm_provider": "openai",
+    "providers": {
+        "openai": {
+            "api_key": "",
+            "model": "gpt-4",
+            "base_url": "https://api.openai.com/v1"
+        },
+        "deepseek": {
+            "api_key": "",
+            "model": "deepseek-chat",
+            "base_url": "https://api.deepseek.com/v1"
+        },
+        "anthropic": {
+            "api_key": "",
+            "model": "claude-3-sonnet-20240229",
+            "base_url": "https://api.anthropic.com/v1"
+        },
+        "local": {
+            "api_key": "local",
+            "model": "llama2",
+            "base_url": "http://localhost:11434/v1"
+        },
+        "azure": {
+            "api_key": "",
+            "model": "gpt-4",
+            "base_url": "https://your-resource.openai.azure.com/",
+            "api_version": "2024-02-15-preview"
+        },
+        "gemini": {
+            "api_key": "",
+            "model": "gemini-2.0-flash-exp",
+            "base_url": "https://generativelanguage.googleapis.com/v1beta"
+        }
+    },
+    "oauth_clients": {
+        "xero": {
+            "client_id": "",
+            "client_secret": "",
+            "redirect_uri": "http://localhost:8001/callback",
+            "scopes": "accounting.transactions,accounting.contacts,accounting.settings"
+        },
+        "github": {
+            "client_id": "",
+            "client_secret": "",
+            "redirect_uri": "http://localhost:8001/callback",
+            "scopes": "repo,user"
+        },
+        "google": {
+            "client_id": "",
+            "client_secret": "",
+            "redirect_uri": "http://localhost:8001/callback",
+            "scopes": "openid,email,profile"
+        },
+        "microsoft": {
+            "client_id": "",
+            "client_secret": "",
+            "redirect_uri": "http://localhost:8001/callback",
+            "scopes": "User.Read"
+        }
+    },
+    "session": {
+        "auto_prompt_recording": True,
+        "auto_start_watcher": True,
+        "port": 8001,
+        "debug": False,
+        "streaming": True
+    },
+    "generation": {
+        "temperature": 0.7,
+        "max_tokens": 2000,
+        "timeout_seconds": 120
+    },
+    "cache": {
+        "enabled": True,
+        "deterministic_only": True,
+        "ttl_seconds": 86400,
+        "max_entries": 1024,
+        "db_path": ".cache/llm_responses.db",
+        "max_db_entries": 50000
+    },
+    "semantic_cache": {
+        "enabled": False,
+        "threshold": 0.92,
+        "max_entries": 2048,
+        "embedder": "hashing",
+        "dim": 512,
+        "embedding_model": "text-embedding-3-small"
+    },
+    "singleflight": {
+        "enabled": True
+    },
+    "batch": {
+        "mode": "auto",
+        "concurrency": 8,
+        "chunk_size": 1000,
+        "poll_interval_seconds": 30.0,
+        "completion_window": "24h",
+        "retry_errors": False
+    },
+    "workers": {
+        "count": 1,
+        "base_port": 8101,
+        "health_path": "/healthz",
+        "health_interval_seconds": 2.0,
+        "max_failed_checks": 3,
+        "startup_timeout_seconds": 60.0,
+        "drain_timeout_seconds": 60.0,
+        "reload_on_change": ["chainlit_app.py", "scripts/pdd_chat", "scripts/pdd_llm"],
+        "log_dir": ".cache/workers",
+        "sticky_cookie": "pdd_worker"
+    },
+    "warmup": {
+        "enabled": True,
+        "connections_per_host": 2,
+        "timeout_seconds": 15.0
+    },
+    "scheduler": {
+        "enabled": True,
+        "max_concurrency": 16,
+        "lanes": ["interactive", "background"],
+        "quantum_tokens": 2000,
+        "aging_seconds": 30.0
+    },
+    "routing": {
+        "enabled": False,
+        "providers": [],
+        "alpha": 0.3,
+        "max_error_rate": 0.5,
+        "error_half_life_seconds": 30.0,
+        "timeout_seconds": 60.0,
+        "max_attempts": 3
+    },
+    "hedging": {
+        "enabled": False,
+        "percentile": 95,
+        "min_samples": 20,
+        "min_delay_ms": 100,
+        "max_hedge_fraction": 0.1,
+        "window": 1000
+    },
+    "memory": {
+        "enabled": True,
+        "max_prompt_tokens": 8000
+    },
+    "metrics": {
+        "enabled": True,
+        "path": "/metrics",
+        "port": None
+    },
+    "circuit_breaker": {
+        "enabled": True,
+        "failure_threshold": 5,
+        "open_seconds": 30,
+        "max_open_seconds": 300,
+        "probe": True,
+        "probe_timeout_seconds": 10
+    },
+    "prompt_cache": {
+        "enabled": True,
+        "cache_history": True,
+        "gemini_min_tokens": 4096,
+        "gemini_ttl_seconds": 3600,
+        "log_every_requests": 100
+    },
+    "summarization": {
+        "enabled": True,
+        "provider": None,
+        "model": None,
+        "trigger_ratio": 0.75,
+        "keep_recent_turns": 4,
+        "max_summary_tokens": 300
+    },
+    "rate_limits": {
+        "openai": {
+            "requests_per_minute": None,
+            "tokens_per_minute": None,
+            "max_wait_seconds": 120.0
+        },
+        "deepseek": {
+            "requests_per_minute": None,
+            "tokens_per_minute": None,
+            "max_wait_seconds": 120.0
+        },
+        "anthropic": {
+            "requests_per_minute": None,
+            "tokens_per_minute": None,
+            "max_wait_seconds": 120.0
+        },
+        "local": {
+            "requests_per_minute": None,
+            "tokens_per_minute": None,
+            "max_wait_seconds": 120.0
+        },
+        "azure": {
+            "requests_per_minute": None,
+            "tokens_per_minute": None,
+            "max_wait_seconds": 120.0
+        },
+        "gemini": {
+            "requests_per_minute": None,
+            "tokens_per_minute": None,
+            "max_wait_seconds": 120.0
+        }
+    },
+    "http": {
+        "max_connections_per_host": 20,
+        "max_keepalive_per_host": 10,
+        "keepalive_expiry": 30.0,
+        "http2": True
+    }
+}
+
+
+def _compile_schema(defaults: Dict[str, Any], prefix: str = "") -> Dict[str, type]:
+    """Expected type per dotted key, taken from the defaults; None defaults accept anything"""
+    schema: Dict[str, type] = {}
+    for key, value in defaults.items():
+        path = f"{prefix}{key}"
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            schema[path] = dict
+            schema.update(_compile_schema(value, path + "."))
+        elif isinstance(value, bool):
+            schema[path] = bool
+        elif isinstance(value, (int, float)):
+            schema[path] = float
+        else:
+            schema[path] = type(value)
+    return schema
+
+
+# Built once at import; validation is a walk over the loaded dict
+SCHEMA = _compile_schema(DEFAULT_CONFIG)
+
+
+def default_config() -> AppConfig:
+    """A fresh copy of the default configuration"""
+    return copy.deepcopy(DEFAULT_CONFIG)
+
+
+def migrate_config(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Bring an older config.json layout up to the current schema; the input is not modified
+
+    Version 1 is the layout the environment configurator wrote:
+    default_provider plus one top-level section per provider, with
+    Azure's endpoint and deployment, and the port under app_settings.
+    """
+    config = copy.deepcopy(raw)
+    if config.get("schema_version", 1) >= CONFIG_SCHEMA_VERSION:
+        return config
+
+    if "default_provider" in config:
+        provider = config.pop("default_provider")
+        config.setdefault("llm_provider", provider)
+
+    providers = config.setdefault("providers", {})
+    for name in LEGACY_PROVIDER_KEYS:
+        section = config.get(name)
+        if not isinstance(section, dict):
+            continue
+        entry = dict(config.pop(name))
+        if "endpoint" in entry:
+            entry.setdefault("base_url", entry.pop("endpoint"))
+        deployment = entry.pop("deployment", None)
+        if deployment and not entry.get("model"):
+            entry["model"] = deployment
+        providers[name] = dict(providers.get(name, {}), **entry)
+
+    app_settings = config.get("app_settings", {})
+    session = config.setdefault("session", {})
+    if "chainlit_port" in app_settings:
+        session.setdefault("port", app_settings["chainlit_port"])
+    if "debug" in app_settings:
+        session.setdefault("debug", app_settings["debug"])
+
+    config["schema_version"] = CONFIG_SCHEMA_VERSION
+    return config
+
+
+def _merge(defaults: Dict[str, Any], values: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(defaults)
+    for key, value in values.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _type_errors(values: Dict[str, Any], prefix: str = "") -> List[str]:
+    errors = []
+    for key, value in values.items():
+        path = f"{prefix}{key}"
+        expected = SCHEMA.get(path)
+        if expected is not None and value is not None:
+            if expected is float:
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+            else:
+                valid = isinstance(value, expected)
+            if not valid:
+                errors.append(f"{path} should be {'number' if expected is float else expected.__name__}, "
+                              f"not {type(value).__name__}")
+                continue
+        if isinstance(value, dict):
+            errors.extend(_type_errors(value, path + "."))
+    return errors
+
+
+def validate_config(config: Dict[str, Any]):
+    """Raise ConfigError listing every value of the wrong type"""
+    errors = _type_errors(config)
+    providers = config.get("providers")
+    if isinstance(providers, dict):
+        errors.extend(f"providers.{name} should be dict, not {type(entry).__name__}"
+                      for name, entry in providers.items() if not isinstance(entry, dict))
+    if errors:
+        raise ConfigError("; ".join(errors))
+
+
+def normalize_config(raw: Dict[str, Any]) -> AppConfig:
+    """Migrated, validated and completed with defaults, so every section and key is present"""
+    if not isinstance(raw, dict):
+        raise ConfigError(f"expected a JSON object, not {type(raw).__name__}")
+    config = migrate_config(raw)
+    validate_config(config)
+    return _merge(DEFAULT_CONFIG, config)
+
+
+def config_revision(data: Optional[str]) -> str:
+    """Content hash identifying one version of the file; empty for a missing file"""
+    if data is None:
+        return ""
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_config(data: Optional[str], path: PathLike = "config.json") -> AppConfig:
+    """Normalized configuration from the file's text (None for a missing file); raises ConfigError"""
+    if data is None:
+        return normalize_config({})
+    try:
+        raw = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{path}: {e}") from e
+    try:
+        config = normalize_config(raw)
+    except ConfigError as e:
+        raise ConfigError(f"{path}: {e}") from e
+    if "default_provider" in raw or any(isinstance(raw.get(name), dict) for name in LEGACY_PROVIDER_KEYS):
+        logger.info("%s uses an older layout; it is migrated in memory until next saved", path)
+    return config
+
+
+class ConfigLoader:
+    """One config file, parsed and normalized once per change
+
+    The cache key is the file's inode, size and mtime in nanoseconds, so
+    both an edit in place and a replace by rename invalidate it; an
+    unchanged file costs one stat() per load(). A missing file loads as
+    the defaults.
+    """
+
+    def __init__(self, path: str = "config.json"):
+        self.path = Path(path)
+        self._key: Optional[Tuple[int, int, int]] = None
+        self._config: Optional[AppConfig] = None
+        # Revision of the cached parse, for save_config()
+        self.revision: Optional[str] = None
+
+    def _stat_key(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def changed(self) -> bool:
+        """True when the file differs from the cached parse"""
+        return self._config is None or self._stat_key() != self._key
+
+    def load(self) -> AppConfig:
+        """The cached configuration, re-read first if the file changed; raises ConfigError"""
+        key = self._stat_key()
+        if self._config is not None and key == self._key:
+            return self._config
+        data = read_text(self.path) if key is not None else None
+        config = parse_config(data, self.path)
+        self._key, self._config, self.revision = key, config, config_revision(data)
+        return config
+
+
+_loaders: Dict[str, ConfigLoader] = {}
+
+
+def get_config_loader(path: str = "config.json") -> ConfigLoader:
+    """The process-wide loader for a config file"""
+    key = os.path.abspath(path)
+    loader = _loaders.get(key)
+    if loader is None:
+        loader = _loaders[key] = ConfigLoader(path)
+    return loader
+
+
+def load_config(path: str = "config.json", editable: bool = False) -> AppConfig:
+    """config.json via the shared cache
+
+    The returned dict is shared with every other caller in the process
+    and must be treated as read-only; pass editable=True for a private copy.
+    """
+    config = get_config_loader(path).load()
+    return copy.deepcopy(config) if editable else config
+
+
+def checkout_config(path: str = "config.json") -> Tuple[AppConfig, str]:
+    """An editable copy of config.json and the revision it was read at, for save_config()"""
+    data = read_text(path)
+    return parse_config(data, path), config_revision(data)
+
+
+def _dump(config: Dict[str, Any]) -> str:
+    return json.dumps(config, indent=2)
+
+
+def _raw_config(data: Optional[str], path: PathLike) -> Dict[str, Any]:
+    """The file's own settings, migrated but without the defaults"""
+    if data is None:
+        return {}
+    try:
+        raw = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{path}: {e}") from e
+    if not isinstance(raw, dict):
+        raise ConfigError(f"{path}: expected a JSON object, not {type(raw).__name__}")
+    return migrate_config(raw)
+
+
+def user_layer(raw: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """What to write back for config: the file's own settings plus every change made to its loaded form
+
+    Defaults the user never set stay out of the file, so a later change
+    to a default reaches them; keys removed from config are removed from
+    the file (a removed default comes back on the next load).
+    """
+    layer = {"schema_version": CONFIG_SCHEMA_VERSION}
+    layer.update(copy.deepcopy(raw))
+    apply_edits(layer, normalize_config(raw), config)
+    return layer
+
+
+def save_config(config: Dict[str, Any], path: str = "config.json", revision: Optional[str] = None) -> str:
+    """Write config.json atomically under its lock; returns the new revision
+
+    Only the user's layer is written (see user_layer()). With a revision
+    (from checkout_config()), this is a compare-and-swap: ConfigConflict
+    if the file changed since, and nothing is written.
+    """
+    with file_lock(path):
+        data = read_text(path)
+        if revision is not None:
+            current = config_revision(data)
+            if current != revision:
+                raise ConfigConflict(f"{path} changed since it was read (revision {revision}, now {current})")
+        validate_config(config)
+        data = _dump(user_layer(_raw_config(data, path), config))
+        atomic_write(path, data)
+    return config_revision(data)
+
+
+def update_config(mutate: Callable[[AppConfig], None], path: str = "config.json") -> AppConfig:
+    """Locked read-modify-write of config.json: mutate edits the current configuration in place
+
+    For changes made in one short step, such as storing a token; changes
+    from other tools made before the lock was taken are kept.
+    """
+    with file_lock(path):
+        raw = _raw_config(read_text(path), path)
+        config = normalize_config(raw)
+        mutate(config)
+        validate_config(config)
+        atomic_write(path, _dump(user_layer(raw, config)))
+    return config
+
+
+def apply_edits(current: Dict[str, Any], base: Dict[str, Any], edited: Dict[str, Any]):
+    """Replay onto current every difference between base and edited (a three-way merge)
+
+    Keys only the other writer changed keep its value; keys both changed
+    take the edited value. Keys in base but not in edited are removed.
+    """
+    for key, value in edited.items():
+        original = base.get(key)
+        if isinstance(value, dict) and isinstance(original, dict):
+            if value == original:
+                continue
+            target = current.get(key)
+            if not isinstance(target, dict):
+                target = current[key] = {}
+            apply_edits(target, original, value)
+        elif key not in base or value != original:
+            current[key] = copy.deepcopy(value)
+    for key in base:
+        if key not in edited:
+            current.pop(key, None)
@@ -0,0 +1,103 @@
+"""
+Request Deadlines
+An absolute deadline for the current request, carried in a context variable
+through the client, scheduler, router and adapters (and into the tasks they start)
+"""
+
+import asyncio
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request ran out of time; not worth retrying or failing over"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        super().__init__("Request deadline exceeded" + (f" ({timeout:g}s)" if timeout else ""))
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """Absolute deadline seconds from now; an enclosing earlier deadline still wins"""
+    current = _deadline.get()
+    if not seconds:
+        return current
+    deadline = time.monotonic() + seconds
+    return deadline if current is None else min(deadline, current)
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """Bound the block to seconds from now"""
+    deadline = deadline_after(seconds)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, None without a deadline"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded(timeout: Optional[float]) -> Optional[float]:
+    """The smaller of timeout and the time left"""
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+def check_deadline():
+    """Raise DeadlineExceeded once the current request is out of time"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()
+
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """Await with the time left; the awaitable is cancelled when the deadline passes"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        # Close the coroutine so it does not warn about never being awaited
+        getattr(awaitable, "close", lambda: None)()
+        raise DeadlineExceeded()
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except asyncio.TimeoutError as e:
+        if isinstance(e, DeadlineExceeded) or remaining() > 0:
+            # Already converted, or an inner timeout that fired first
+            raise
+        raise DeadlineExceeded() from e
+
+
+async def stream_with_deadline(stream: AsyncIterator[T], deadline: Optional[float]) -> AsyncIterator[T]:
+    """Iterate stream with deadline in effect while each item is produced, and enforced on each
+
+    The context variable is set and reset around every step rather than
+    across the yields, so it never leaks into the consumer, even when the
+    stream is abandoned and finalized from another task.
+    """
+    try:
+        while True:
+            token = _deadline.set(deadline)
+            try:
+                item = await within_deadline(stream.__anext__())
+            except StopAsyncIteration:
+                return
+            finally:
+                _deadline.reset(token)
+            yield item
+    finally:
+        await stream.aclose()
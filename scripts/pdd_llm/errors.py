@@ -0,0 +1,66 @@
+"""
+Provider Error Classification
+SDK-agnostic helpers for deciding how to react to a failed call
+"""
+
+import asyncio
+from typing import Optional
+
+from .deadline import DeadlineExceeded
+
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK exception, if any"""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_timeout(exc: BaseException) -> bool:
+    """Timeouts from asyncio, httpx or any provider SDK"""
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    return any("Timeout" in cls.__name__ or "DeadlineExceeded" in cls.__name__
+               for cls in type(exc).__mro__)
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """Network-level failures (refused, reset, DNS)"""
+    if isinstance(exc, ConnectionError):
+        return True
+    return any("Connect" in cls.__name__ or "ServiceUnavailable" in cls.__name__
+               for cls in type(exc).__mro__)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header on the failed response, if any"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                return None
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Failures another attempt or another backend may not hit: timeouts, network, 429, 5xx, open circuits
+
+    An expired request deadline is not retryable; no other backend can beat it.
+    """
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    if is_timeout(exc) or is_connection_error(exc):
+        return True
+    if any("RateLimit" in cls.__name__ or "CircuitOpen" in cls.__name__ for cls in type(exc).__mro__):
+        return True
+    status = error_status(exc)
+    return status is not None and (status == 429 or status >= 500)
@@ -0,0 +1,79 @@
+"""
+Bounded Thread Executor
+Dedicated, instrumented thread pool for SDK calls that only have a
+blocking API, so they neither share nor exhaust the loop's default executor
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class BoundedExecutor:
+    """ThreadPoolExecutor with admission control and usage counters
+
+    At most max_workers calls run at once; up to max_queued more wait
+    for a thread. Anything beyond that waits on the event loop instead of
+    piling up threads or work items.
+    """
+
+    def __init__(self, name: str, max_workers: int = 16, max_queued: int = 64):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._admission: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0}
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    def _run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            self.active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the pool and await its result"""
+        loop = asyncio.get_running_loop()
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_workers + self.max_queued)
+        self.waiting += 1
+        try:
+            await self._admission.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.counters["submitted"] += 1
+        future = self.pool.submit(functools.partial(self._run, fn, *args, **kwargs))
+        # Release the slot when the thread finishes, even if the caller was cancelled
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._admission.release))
+        try:
+            result = await asyncio.wrap_future(future)
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        self.counters["completed"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.counters)
+        stats.update({"active": self.active, "waiting": self.waiting, "max_workers": self.max_workers})
+        return stats
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
@@ -0,0 +1,135 @@
+"""
+Shared File Persistence
+Advisory locks and atomic replace for the files several tools edit at once
+(config.json and .env): readers never see a truncated file, writers never interleave
+"""
+
+import contextlib
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(fd: int):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _unlock(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+DEFAULT_LOCK_TIMEOUT = 10.0
+
+PathLike = Union[str, Path]
+
+
+class FileLockTimeout(TimeoutError):
+    """Another process held the file's lock for longer than the timeout"""
+
+
+def _hidden(path: Path, suffix: str) -> str:
+    name = path.name if path.name.startswith(".") else f".{path.name}"
+    return name + suffix
+
+
+def lock_path(path: PathLike) -> Path:
+    """The lock file guarding path; a sidecar, since the file itself is replaced on every write"""
+    path = Path(path)
+    return path.with_name(_hidden(path, ".lock"))
+
+
+@contextlib.contextmanager
+def file_lock(path: PathLike, timeout: float = DEFAULT_LOCK_TIMEOUT) -> Iterator[None]:
+    """Exclusive advisory lock on path for the duration of the block, across processes
+
+    Only writers that also take the lock are excluded; readers need not,
+    because writes go through atomic_write().
+    """
+    target = lock_path(path)
+    fd = os.open(target, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fd):
+            if time.monotonic() >= deadline:
+                raise FileLockTimeout(f"{path} is locked by another process ({target})")
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: PathLike, text: str):
+    """Replace path with text via a temp file in the same directory, fsync and rename
+
+    The existing file's permissions are kept; a new file is created
+    owner-only (0600), since these files hold API keys.
+    """
+    path = Path(path)
+    directory = path.parent
+    fd, temp = tempfile.mkstemp(prefix=_hidden(path, "."), suffix=".tmp", dir=str(directory))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        with contextlib.suppress(FileNotFoundError):
+            os.chmod(temp, os.stat(path).st_mode & 0o777)
+        os.replace(temp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp)
+        raise
+
+    if os.name != "nt":
+        # Make the rename itself durable
+        dir_fd = os.open(str(directory), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+def read_text(path: PathLike) -> Optional[str]:
+    """The file's contents, or None if it does not exist"""
+    try:
+        return Path(path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def update_text(path: PathLike, transform: Callable[[Optional[str]], str],
+                timeout: float = DEFAULT_LOCK_TIMEOUT) -> str:
+    """Locked read-modify-write: transform gets the current text (None if missing) and returns the new text"""
+    with file_lock(path, timeout):
+        text = transform(read_text(path))
+        atomic_write(path, text)
+    return text
+
+
+def write_text(path: PathLike, text: str, timeout: float = DEFAULT_LOCK_TIMEOUT):
+    """Replace the whole file atomically, serialized with other locked writers"""
+    update_text(path, lambda _current: text, timeout)
@@ -0,0 +1,73 @@
+"""
+Chat Worker Health
+Readiness and in-flight request counts for one chat app process, served as
+JSON for the worker supervisor's health checks and drains
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from .workers import worker_index
+
+
+class WorkerHealth:
+    """What the supervisor needs to know about this process
+
+    The app marks itself ready once it has loaded and warmed up; the
+    supervisor only routes new sessions to ready workers, and waits for
+    in_flight to reach zero before restarting one.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.warming = False
+        self.warmup: Dict[str, Any] = {}
+        self.in_flight = 0
+        self.served = 0
+        self.started = time.monotonic()
+
+    def mark_warming(self):
+        self.warming = True
+
+    def mark_ready(self, warmup: Optional[Dict[str, Any]] = None):
+        self.warming = False
+        self.warmup = warmup or {}
+        self.ready = True
+
+    def request_started(self):
+        self.in_flight += 1
+
+    def request_finished(self):
+        self.in_flight -= 1
+        self.served += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "warming" if self.warming else "starting",
+            "worker": worker_index(),
+            "pid": os.getpid(),
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "uptime_seconds": round(time.monotonic() - self.started, 1),
+            "warmup": self.warmup
+        }
+
+
+HEALTH = WorkerHealth()
+
+
+def mount_health(app: Any, path: str = "/healthz"):
+    """Add the health route to a Starlette/FastAPI app (the Chainlit server); 503 until ready"""
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    # A reloaded app module replaces the route, so it reports on the live HEALTH
+    app.router.routes[:] = [route for route in app.router.routes if getattr(route, "path", None) != path]
+
+    def health_endpoint(request):
+        return Response(json.dumps(HEALTH.snapshot()), status_code=200 if HEALTH.ready else 503,
+                        media_type="application/json")
+
+    app.router.routes.insert(0, Route(path, health_endpoint, methods=["GET"]))
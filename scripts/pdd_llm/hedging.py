@@ -0,0 +1,98 @@
+"""
+Hedged Requests
+Fires a request at a second provider when the first is slower than
+its own recent latency percentile; the first responder wins
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGING_SETTINGS = {
+    "enabled": False,
+    "percentile": 95,
+    "min_samples": 20,
+    "min_delay_ms": 100,
+    "max_hedge_fraction": 0.1,
+    "window": 1000
+}
+
+
+def percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no data"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, min(len(ordered), math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+class HedgePolicy:
+    """When to hedge, how many hedges the budget allows, and what it bought
+
+    The hedge delay is the configured percentile of the primary's recent
+    first-output latency. At most max_hedge_fraction of requests may be
+    hedged. report() compares the tail latency users saw with the
+    primary's own tail; for primaries cancelled by a winning hedge the
+    time at cancellation is used, so the reduction is a lower bound.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(DEFAULT_HEDGING_SETTINGS)
+        self.settings.update(settings or {})
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.observed = deque(maxlen=self.settings["window"])
+        self.primary = deque(maxlen=self.settings["window"])
+
+    def delay_for(self, samples: Iterable[float]) -> Optional[float]:
+        """Seconds to wait for the primary before hedging, None while warming up"""
+        samples = list(samples)
+        if not samples or len(samples) < self.settings["min_samples"]:
+            return None
+        delay = percentile(samples, self.settings["percentile"])
+        return max(delay, self.settings["min_delay_ms"] / 1000.0)
+
+    def begin(self):
+        """Count a request that is eligible for hedging"""
+        self.requests += 1
+
+    def try_acquire(self) -> bool:
+        """Spend budget on one hedge if the hedged fraction allows it"""
+        if self.hedged + 1 > self.settings["max_hedge_fraction"] * self.requests:
+            self.budget_denied += 1
+            return False
+        self.hedged += 1
+        return True
+
+    def record(self, observed: float, primary: Optional[float], hedge_won: bool):
+        """Latency the caller saw and the primary's (possibly censored) latency"""
+        self.observed.append(observed)
+        if primary is not None:
+            self.primary.append(primary)
+        if hedge_won:
+            self.hedge_wins += 1
+
+    def report(self) -> Dict[str, Any]:
+        """p99 with hedging against the primary alone, and the extra requests spent"""
+        observed_p99 = percentile(self.observed, 99)
+        primary_p99 = percentile(self.primary, 99)
+        reduction = None
+        if observed_p99 is not None and primary_p99 is not None:
+            reduction = round((primary_p99 - observed_p99) * 1000, 1)
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "extra_request_fraction": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "p50_ms": round(percentile(self.observed, 50) * 1000, 1) if self.observed else None,
+            "p99_ms": round(observed_p99 * 1000, 1) if observed_p99 is not None else None,
+            "primary_p99_ms": round(primary_p99 * 1000, 1) if primary_p99 is not None else None,
+            "p99_reduction_ms": reduction
+        }
@@ -0,0 +1,188 @@
+"""
+Chat Load Generator
+Simulated chat sessions driving UniversalLLMClient the way the Chainlit
+on_message handler does, with think time and a weighted prompt mix
+"""
+
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .client import UniversalLLMClient
+from .hedging import percentile
+
+DEFAULT_LOAD_SETTINGS = {
+    "sessions": 20,
+    "turns": 5,
+    "think_time_seconds": 2.0,
+    "ramp_seconds": 5.0,
+    "streaming": True,
+    "seed": 0,
+    "lag_interval_seconds": 0.05
+}
+
+DEFAULT_PROMPT_MIX: List[Tuple[float, str]] = [
+    (0.5, "What is the next step after writing the spec in Prompt-Driven Development?"),
+    (0.3, "Write a Python function that refreshes a Xero OAuth2 access token and retries once on 401."),
+    (0.15, "Review this plan and list the risks: " + "The service syncs invoices nightly, " * 40),
+    (0.05, "Summarize our conversation so far as a prompt history record.")
+]
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires; lag means the loop was blocked"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def report(self) -> Dict[str, Optional[float]]:
+        return {
+            "mean_ms": _ms(sum(self.samples) / len(self.samples)) if self.samples else None,
+            "p99_ms": _ms(percentile(self.samples, 99)),
+            "max_ms": _ms(max(self.samples)) if self.samples else None
+        }
+
+
+class TurnResult:
+    """Timing of one simulated chat turn"""
+
+    def __init__(self, started: float, ttft: Optional[float], latency: float,
+                 output_chars: int, error: Optional[str] = None):
+        self.started = started
+        self.ttft = ttft
+        self.latency = latency
+        self.output_chars = output_chars
+        self.error = error
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class LoadGenerator:
+    """Runs concurrent simulated sessions against one client and reports latency percentiles
+
+    Each session keeps its own conversation memory, so prompts grow turn
+    by turn as they do in the app, and sessions start spread over
+    ramp_seconds rather than all at once.
+    """
+
+    def __init__(self, client: UniversalLLMClient, settings: Optional[Dict[str, Any]] = None,
+                 prompt_mix: Optional[Sequence[Tuple[float, str]]] = None,
+                 system_prompt: Optional[str] = None):
+        self.client = client
+        self.settings = dict(DEFAULT_LOAD_SETTINGS)
+        self.settings.update(settings or {})
+        self.prompt_mix = list(prompt_mix or DEFAULT_PROMPT_MIX)
+        self.system_prompt = system_prompt
+        self.rng = random.Random(self.settings["seed"])
+        self.results: List[TurnResult] = []
+
+    def _think_time(self) -> float:
+        mean = self.settings["think_time_seconds"]
+        return self.rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+
+    def _prompt(self) -> str:
+        weights = [weight for weight, _ in self.prompt_mix]
+        return self.rng.choices([prompt for _, prompt in self.prompt_mix], weights=weights)[0]
+
+    async def _turn(self, messages: List[Dict[str, str]], session_id: str) -> Tuple[TurnResult, str]:
+        started = time.perf_counter()
+        ttft = None
+        parts: List[str] = []
+        error = None
+        try:
+            if self.settings["streaming"]:
+                async for delta in self.client.stream_chat_completion(messages, session_id=session_id):
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    parts.append(delta)
+            else:
+                response = await self.client.complete(messages, session_id=session_id)
+                ttft = time.perf_counter() - started
+                parts.append(response)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if not parts and error is None:
+            error = "empty response"
+        response = "".join(parts)
+        return TurnResult(started, ttft, time.perf_counter() - started, len(response), error), response
+
+    async def _session(self, index: int):
+        await asyncio.sleep(self.settings["ramp_seconds"] * index / max(1, self.settings["sessions"]))
+        memory = self.client.new_memory(self.system_prompt)
+        history: List[Dict[str, str]] = []
+        if memory is None and self.system_prompt:
+            history.append({"role": "system", "content": self.system_prompt})
+        try:
+            for turn in range(self.settings["turns"]):
+                if turn:
+                    await asyncio.sleep(self._think_time())
+                prompt = self._prompt()
+                if memory is not None:
+                    memory.add("user", prompt)
+                    messages = memory.messages()
+                else:
+                    messages = history + [{"role": "user", "content": prompt}]
+                result, response = await self._turn(messages, f"load-{index}")
+                self.results.append(result)
+                if result.error is None:
+                    if memory is not None:
+                        memory.add("assistant", response)
+                        memory.summarize_in_background()
+                    else:
+                        history = messages + [{"role": "assistant", "content": response}]
+        finally:
+            if memory is not None:
+                memory.close()
+
+    async def run(self) -> Dict[str, Any]:
+        self.results = []
+        monitor = LoopLagMonitor(self.settings["lag_interval_seconds"])
+        monitor.start()
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._session(i) for i in range(self.settings["sessions"])))
+        finally:
+            await monitor.stop()
+        return self.report(time.perf_counter() - started, monitor)
+
+    def report(self, elapsed: float, monitor: LoopLagMonitor) -> Dict[str, Any]:
+        ok = [result for result in self.results if result.error is None]
+        latencies = [result.latency for result in ok]
+        ttfts = [result.ttft for result in ok if result.ttft is not None]
+        errors = Counter(result.error.split("\n")[0][:120] for result in self.results if result.error)
+        return {
+            "sessions": self.settings["sessions"],
+            "turns": len(self.results),
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_turns_per_second": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+            "output_tokens_per_second": round(sum(r.output_chars for r in ok) / 4 / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(1 - len(ok) / len(self.results), 4) if self.results else 0.0,
+            "errors": dict(errors.most_common(5)),
+            "ttft_ms": {f"p{pct}": _ms(percentile(ttfts, pct)) for pct in (50, 95, 99)},
+            "latency_ms": {f"p{pct}": _ms(percentile(latencies, pct)) for pct in (50, 95, 99)},
+            "loop_lag_ms": monitor.report()
+        }
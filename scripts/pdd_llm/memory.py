@@ -0,0 +1,231 @@
+"""
+Conversation Memory
+Per-session chat history with incremental token accounting, trimmed
+to a per-model prompt budget before each call
+"""
+
+import asyncio
+import functools
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .startup import lazy_import
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_SETTINGS = {
+    "enabled": True,
+    "max_prompt_tokens": 8000
+}
+
+# Context windows by model-name prefix, longest prefix wins
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "deepseek": 64000,
+    "claude": 200000,
+    "gemini-pro": 32760,
+    "gemini-1.5": 1000000,
+    "gemini-2.0": 1000000,
+    "llama2": 4096
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Per-message framing tokens in the chat format
+MESSAGE_OVERHEAD = 4
+REPLY_PRIMING = 3
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model: Optional[str]):
+    """tiktoken encoding for a model, loaded once; None when unavailable
+
+    tiktoken itself is imported here, on the first count, not when the app starts.
+    """
+    tiktoken = lazy_import("tiktoken")
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or "")
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # e.g. the BPE file cannot be downloaded offline
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens in text; roughly 4 characters per token without tiktoken"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def context_window(model: Optional[str]) -> int:
+    name = (model or "").lower()
+    matches = [prefix for prefix in CONTEXT_WINDOWS if name.startswith(prefix)]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def prompt_budget(model: Optional[str], max_tokens: int, max_prompt_tokens: Optional[int] = None) -> int:
+    """Prompt tokens that fit next to a max_tokens reply in the model's window"""
+    budget = context_window(model) - max_tokens
+    if max_prompt_tokens:
+        budget = min(budget, max_prompt_tokens)
+    return max(budget, 0)
+
+
+class ConversationMemory:
+    """System prompt, running summary and a sliding window of turns within a token budget
+
+    Every message is counted exactly once, when it is added, and the
+    window total is kept as a running sum, so building a request costs
+    O(1) amortised per turn: trimming only ever pops from the front.
+
+    With a summarizer, older turns are folded into a running summary in
+    a background task once the prompt passes trigger_ratio of the budget;
+    the summary then replaces those turns in later requests. Turns
+    trimmed before they were summarised are folded in on the next pass.
+    """
+
+    def __init__(self, model: Optional[str], system_prompt: Optional[str] = None,
+                 budget: int = DEFAULT_MEMORY_SETTINGS["max_prompt_tokens"],
+                 summarizer=None, trigger_ratio: float = 0.75, keep_recent_turns: int = 4):
+        self.model = model
+        self.budget = budget
+        self.system: Optional[Tuple[Dict[str, str], int]] = None
+        self.summary: Optional[Tuple[Dict[str, str], int]] = None
+        self.summary_text: Optional[str] = None
+        self.turns: Deque[Tuple[Dict[str, str], int]] = deque()
+        self.window_tokens = 0
+        self.trimmed_turns = 0
+        self.summarized_turns = 0
+        self.summarizer = summarizer
+        self.trigger_ratio = trigger_ratio
+        self.keep_recent_turns = keep_recent_turns
+        # Sequence number of turns[0]; turns are numbered as they are added
+        self._front_seq = 0
+        self._unsummarized: List[Tuple[int, Dict[str, str]]] = []
+        self._summary_task: Optional[asyncio.Task] = None
+        if system_prompt:
+            self.set_system(system_prompt)
+
+    def _count(self, message: Dict[str, str]) -> int:
+        return count_tokens(message["content"], self.model) + MESSAGE_OVERHEAD
+
+    def set_system(self, content: str):
+        message = {"role": "system", "content": content}
+        self.system = (message, self._count(message))
+
+    def set_summary(self, content: str):
+        self.summary_text = content
+        message = {"role": "system", "content": f"Summary of the earlier conversation:\n{content}"}
+        self.summary = (message, self._count(message))
+
+    def add(self, role: str, content: str):
+        """Append a turn, counting its tokens once"""
+        message = {"role": role, "content": content}
+        tokens = self._count(message)
+        self.turns.append((message, tokens))
+        self.window_tokens += tokens
+
+    def pop(self) -> Optional[Dict[str, str]]:
+        """Remove the latest turn, e.g. a question whose reply failed; None when there is none"""
+        if not self.turns:
+            return None
+        message, tokens = self.turns.pop()
+        self.window_tokens -= tokens
+        return message
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Tokens the next request will use"""
+        system_tokens = self.system[1] if self.system else 0
+        summary_tokens = self.summary[1] if self.summary else 0
+        return system_tokens + summary_tokens + self.window_tokens + REPLY_PRIMING
+
+    def _pop_oldest(self) -> Tuple[Dict[str, str], int]:
+        message, tokens = self.turns.popleft()
+        self.window_tokens -= tokens
+        self._front_seq += 1
+        return message, tokens
+
+    def trim(self) -> List[Dict[str, str]]:
+        """Drop the oldest turns until the prompt fits; returns what was dropped
+
+        The latest turn is always kept, and the window always starts with
+        a user message because some providers reject anything else.
+        """
+        dropped = []
+        while len(self.turns) > 1:
+            if self.prompt_tokens <= self.budget and self.turns[0][0]["role"] == "user":
+                break
+            seq = self._front_seq
+            message = self._pop_oldest()[0]
+            self.trimmed_turns += 1
+            dropped.append(message)
+            if self.summarizer is not None:
+                self._unsummarized.append((seq, message))
+        return dropped
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Messages for the next request, trimmed to the budget"""
+        self.trim()
+        messages = [self.system[0]] if self.system else []
+        if self.summary:
+            messages.append(self.summary[0])
+        messages.extend(message for message, _ in self.turns)
+        return messages
+
+    def summarize_in_background(self) -> Optional[asyncio.Task]:
+        """Start folding older turns into the summary if the prompt is getting large"""
+        if self.summarizer is None or (self._summary_task and not self._summary_task.done()):
+            return None
+        foldable = len(self.turns) - self.keep_recent_turns
+        # Keep the window starting on a user turn after the fold
+        while 0 < foldable < len(self.turns) and self.turns[foldable][0]["role"] != "user":
+            foldable -= 1
+        over_trigger = self.prompt_tokens > self.trigger_ratio * self.budget
+        if foldable <= 0 or not (over_trigger or self._unsummarized):
+            return None
+
+        upto = self._front_seq + foldable
+        turns = [message for _, message in self._unsummarized]
+        turns.extend(self.turns[i][0] for i in range(foldable))
+        self._summary_task = asyncio.ensure_future(self._fold(self.summary_text, turns, upto))
+        return self._summary_task
+
+    async def _fold(self, previous: Optional[str], turns: List[Dict[str, str]], upto: int):
+        try:
+            summary = await self.summarizer.summarize(previous, turns)
+        except Exception as e:
+            logger.warning("memory: summarization failed, keeping full turns: %s", e)
+            return
+        if not summary:
+            return
+        self.set_summary(summary)
+        self._unsummarized = [(seq, message) for seq, message in self._unsummarized if seq >= upto]
+        while self.turns and self._front_seq < upto:
+            self._pop_oldest()
+            self.summarized_turns += 1
+
+    def close(self):
+        """Cancel a summary still in progress"""
+        if self._summary_task and not self._summary_task.done():
+            self._summary_task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": len(self.turns),
+            "trimmed_turns": self.trimmed_turns,
+            "summarized_turns": self.summarized_turns,
+            "summary_tokens": self.summary[1] if self.summary else 0,
+            "prompt_tokens": self.prompt_tokens,
+            "budget": self.budget
+        }
@@ -0,0 +1,280 @@
+"""
+LLM Request Metrics
+Per-request latency, token and outcome metrics rendered in the Prometheus text format
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .breaker import CircuitOpenError, circuit_states
+from .deadline import DeadlineExceeded
+from .errors import error_status, is_timeout
+from .ratelimit import RateLimitTimeout
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+QUEUE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0)
+RATE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500)
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0, 60.0)
+
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+# Outcomes whose partial output nobody reads
+ABANDONED_OUTCOMES = ("cancelled", "deadline_exceeded")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labels, labels)} {value:g}"
+                  for labels, value in sorted(self.values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        counts, total = self.values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket = 'le="' + le + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, bucket)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total[0]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+def outcome_of(exc: Optional[BaseException]) -> str:
+    """Outcome label for a finished request"""
+    if exc is None:
+        return "success"
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, RateLimitTimeout) or error_status(exc) == 429:
+        return "rate_limited"
+    if isinstance(exc, DeadlineExceeded):
+        return "deadline_exceeded"
+    if is_timeout(exc):
+        return "timeout"
+    if isinstance(exc, (GeneratorExit, KeyboardInterrupt)) or type(exc).__name__ == "CancelledError":
+        return "cancelled"
+    return "error"
+
+
+class RequestTimer:
+    """Timing of one provider request; used as a context manager around the call"""
+
+    def __init__(self, metrics: "LLMMetrics", provider: str, model: str):
+        self.metrics = metrics
+        self.provider = provider
+        self.model = model or ""
+        self.started = time.perf_counter()
+        self.queue_seconds = 0.0
+        self.ttft: Optional[float] = None
+        self.output_chars = 0
+
+    def queued(self, seconds: float):
+        self.queue_seconds += seconds
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+
+    def output(self, text: str):
+        self.output_chars += len(text)
+
+    def retried(self, reason: str):
+        self.metrics.retry(self.provider, self.model, reason)
+
+    def __enter__(self) -> "RequestTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.finish(self, exc)
+        return False
+
+
+class LLMMetrics:
+    """Process-wide registry for provider requests
+
+    Writes happen on the event loop and renders on the /metrics thread,
+    so both take the registry lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        provider_model = ("provider", "model")
+        self.requests = Counter("llm_requests_total", "Provider requests by outcome", provider_model + ("outcome",))
+        self.queue = Histogram("llm_queue_seconds", "Time spent waiting for rate-limit capacity",
+                               provider_model, QUEUE_BUCKETS)
+        self.ttft = Histogram("llm_time_to_first_token_seconds", "Time to the first output token",
+                              provider_model, LATENCY_BUCKETS)
+        self.latency = Histogram("llm_request_duration_seconds", "Total request latency including queueing",
+                                 provider_model + ("outcome",), LATENCY_BUCKETS)
+        self.tokens_per_second = Histogram("llm_output_tokens_per_second",
+                                           "Output rate after the first token (estimated from text)",
+                                           provider_model, RATE_BUCKETS)
+        self.prompt_tokens = Counter("llm_prompt_tokens_total", "Prompt tokens reported by the provider", provider_model)
+        self.cached_prompt_tokens = Counter("llm_prompt_cache_read_tokens_total",
+                                            "Prompt tokens served from the provider's prompt cache", provider_model)
+        self.completion_tokens = Counter("llm_completion_tokens_total",
+                                         "Completion tokens reported by the provider", provider_model)
+        self.retries = Counter("llm_retries_total", "Retries and failovers", provider_model + ("reason",))
+        self.cache_hits = Counter("llm_response_cache_hits_total", "Responses served from the local caches",
+                                  provider_model + ("cache",))
+        self.abandoned_tokens = Counter("llm_abandoned_output_tokens_total",
+                                        "Output tokens streamed before the request was cancelled or ran out of time "
+                                        "(estimated from text)", provider_model + ("outcome",))
+        self.scheduler_wait = Histogram("llm_scheduler_wait_seconds", "Time spent waiting for a scheduler slot",
+                                        ("lane",), WAIT_BUCKETS)
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Extra exposition lines (gauges owned by other modules) appended to every render"""
+        self._collectors.append(collector)
+
+    def track(self, provider: str, model: str) -> RequestTimer:
+        return RequestTimer(self, provider, model)
+
+    def finish(self, timer: RequestTimer, exc: Optional[BaseException]):
+        elapsed = time.perf_counter() - timer.started
+        outcome = outcome_of(exc)
+        labels = (timer.provider, timer.model)
+        with self._lock:
+            self.requests.inc(*labels, outcome)
+            self.latency.observe(elapsed, *labels, outcome)
+            self.queue.observe(timer.queue_seconds, *labels)
+            if outcome in ABANDONED_OUTCOMES:
+                self.abandoned_tokens.inc(*labels, outcome, amount=timer.output_chars // 4)
+            if timer.ttft is not None:
+                self.ttft.observe(timer.ttft, *labels)
+                generating = elapsed - timer.ttft
+                if outcome == "success" and generating > 0 and timer.output_chars:
+                    self.tokens_per_second.observe(timer.output_chars / 4 / generating, *labels)
+
+    def usage(self, provider: str, model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int):
+        labels = (provider, model or "")
+        with self._lock:
+            self.prompt_tokens.inc(*labels, amount=prompt_tokens)
+            self.cached_prompt_tokens.inc(*labels, amount=cached_tokens)
+            self.completion_tokens.inc(*labels, amount=completion_tokens)
+
+    def retry(self, provider: str, model: str, reason: str):
+        with self._lock:
+            self.retries.inc(provider, model or "", reason)
+
+    def cache_hit(self, provider: str, model: str, cache: str):
+        with self._lock:
+            self.cache_hits.inc(provider, model or "", cache)
+
+    def scheduled(self, lane: str, wait_seconds: float):
+        with self._lock:
+            self.scheduler_wait.observe(wait_seconds, lane)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines: List[str] = []
+            for metric in (self.requests, self.queue, self.ttft, self.latency, self.tokens_per_second,
+                           self.prompt_tokens, self.cached_prompt_tokens, self.completion_tokens,
+                           self.retries, self.cache_hits, self.abandoned_tokens, self.scheduler_wait):
+                lines += metric.render()
+        lines += ["# HELP llm_circuit_state Circuit breaker state (0 closed, 1 half-open, 2 open)",
+                  "# TYPE llm_circuit_state gauge"]
+        for provider, state in sorted(circuit_states().items()):
+            lines.append(f'llm_circuit_state{{provider="{_escape(provider)}"}} {CIRCUIT_STATE_VALUES[state["state"]]}')
+        for collector in self._collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+METRICS = LLMMetrics()
+
+
+def render_metrics() -> str:
+    return METRICS.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    path_prefix = "/metrics"
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != self.path_prefix:
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+
+def mount_metrics(app: Any, path: str = "/metrics"):
+    """Add the metrics route to a Starlette/FastAPI app (the Chainlit server)
+
+    The route goes first so it wins over catch-all frontend routes.
+    """
+    from starlette.responses import Response
+    from starlette.routing import Route
+
+    if any(getattr(route, "path", None) == path for route in app.router.routes):
+        return
+
+    def metrics_endpoint(request):
+        return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+    app.router.routes.insert(0, Route(path, metrics_endpoint, methods=["GET"]))
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", path: str = "/metrics") -> ThreadingHTTPServer:
+    """Serve /metrics on a sidecar port from a daemon thread"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"path_prefix": path})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,668 @@
+"""
+Offline Mock Provider Server
+Speaks the OpenAI chat-completions, Anthropic messages and Gemini
+generateContent wire formats (plain and streaming), plus the OpenAI and
+Anthropic batch APIs, with configurable latency, token rate, error
+injection and 429s, for benchmarking without keys
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .semantic_cache import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MOCK_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8787,
+    "seed": None,
+    "latency": {"distribution": "lognormal", "median_ms": 300, "sigma": 0.5},
+    "tokens_per_second": 60.0,
+    "response_tokens": 120,
+    "error_rate": 0.0,
+    "error_status": 500,
+    "rate_limit_rate": 0.0,
+    "retry_after_seconds": 1.0,
+    "requests_per_minute": None,
+    "hang_rate": 0.0,
+    "hang_seconds": 120.0,
+    "batch_seconds": 2.0
+}
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+    500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable", 529: "Overloaded"
+}
+
+GEMINI_STATUSES = {429: "RESOURCE_EXHAUSTED", 503: "UNAVAILABLE"}
+
+FILLER = (
+    "prompt driven development keeps every change traceable from the prompt history "
+    "record through the specification plan tasks and the code that implements them"
+).split()
+
+
+class LatencyModel:
+    """Time to first token drawn from a fixed, uniform, normal, lognormal or exponential distribution"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        settings = dict(settings or {})
+        self.distribution = settings.pop("distribution", "fixed")
+        self.params = settings
+        if self.distribution not in ("fixed", "uniform", "normal", "lognormal", "exponential"):
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds, never negative"""
+        p = self.params
+        if self.distribution == "fixed":
+            ms = p.get("ms", 0)
+        elif self.distribution == "uniform":
+            ms = rng.uniform(p.get("min_ms", 0), p.get("max_ms", 0))
+        elif self.distribution == "normal":
+            ms = rng.gauss(p.get("mean_ms", 0), p.get("stddev_ms", 0))
+        elif self.distribution == "lognormal":
+            ms = p.get("median_ms", 0) * math.exp(rng.gauss(0, p.get("sigma", 0.5)))
+        else:
+            ms = rng.expovariate(1.0 / p["mean_ms"]) if p.get("mean_ms") else 0
+        return max(0.0, ms) / 1000
+
+
+def count_text_tokens(text: str) -> int:
+    """Same 4-characters-per-token estimate the rate limiter uses"""
+    return max(1, len(text) // 4)
+
+
+class MockRequest:
+    """A parsed, format-independent chat request"""
+
+    def __init__(self, api: str, model: str, prompt: str, max_tokens: Optional[int], stream: bool,
+                 cacheable_prefix: Optional[str] = None, include_usage: bool = False):
+        self.api = api
+        self.model = model
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.stream = stream
+        self.cacheable_prefix = cacheable_prefix
+        self.include_usage = include_usage
+
+
+class MockLLMServer:
+    """HTTP/1.1 server on asyncio streams; one instance can serve all three formats at once
+
+    Routes:
+      POST /v1/chat/completions, /openai/deployments/{name}/chat/completions
+      POST /v1/embeddings
+      POST /v1/messages
+      POST /v1beta/models/{model}:generateContent, :streamGenerateContent
+      POST /v1/files, GET /v1/files/{id}/content, POST /v1/batches, GET /v1/batches/{id}
+      POST /v1/messages/batches, GET /v1/messages/batches/{id}, /v1/messages/batches/{id}/results
+      GET  /mock/stats, POST /mock/config (change settings while running)
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(DEFAULT_MOCK_SETTINGS)
+        self.settings.update(settings or {})
+        self.latency = LatencyModel(self.settings["latency"])
+        self.rng = random.Random(self.settings["seed"])
+        self.embedder = HashingEmbedder()
+        self.port = self.settings["port"]
+        self.counters: Counter = Counter()
+        self._window: Deque[float] = deque()
+        self._cached_prefixes: set = set()
+        self._files: Dict[str, bytes] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.settings['host']}:{self.port}"
+
+    def base_url_for(self, provider: str) -> str:
+        """base_url to configure for a provider so its SDK lands on this server"""
+        if provider in ("anthropic", "gemini", "azure"):
+            return self.base_url
+        return f"{self.base_url}/v1"
+
+    def configure(self, settings: Dict[str, Any]):
+        self.settings.update(settings)
+        if "latency" in settings:
+            self.latency = LatencyModel(self.settings["latency"])
+        if "seed" in settings:
+            self.rng = random.Random(self.settings["seed"])
+
+    async def start(self) -> "MockLLMServer":
+        self._server = await asyncio.start_server(self._handle_connection, self.settings["host"], self.port)
+        # Port 0 picks a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("mock server: listening on %s", self.base_url)
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Idle keep-alive connections would otherwise outlive the server
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "MockLLMServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters)
+
+    # HTTP plumbing
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                keep_alive = await self._handle_request(writer, method, target, headers, body)
+                if not keep_alive or headers.get("connection", "").lower() == "close":
+                    break
+        except ConnectionError:
+            # The client went away mid-response, e.g. an aborted stream
+            self.counters["client_disconnects"] += 1
+        except (asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            # Cancelled on shutdown; the connection is simply dropped
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: Any,
+                    headers: Optional[Dict[str, str]] = None):
+        await self._send_body(writer, status, json.dumps(payload).encode(), "application/json", headers)
+
+    async def _send_body(self, writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str,
+                         headers: Optional[Dict[str, str]] = None):
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}",
+                f"Content-Type: {content_type}", f"Content-Length: {len(body)}"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def _send_stream(self, writer: asyncio.StreamWriter, events: AsyncIterator[bytes],
+                           headers: Optional[Dict[str, str]] = None,
+                           content_type: str = "text/event-stream"):
+        head = ["HTTP/1.1 200 OK", f"Content-Type: {content_type}", "Cache-Control: no-cache",
+                "Transfer-Encoding: chunked"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode())
+        async for event in events:
+            writer.write(b"%x\r\n%s\r\n" % (len(event), event))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _handle_request(self, writer, method: str, target: str, headers: Dict[str, str],
+                              body: bytes) -> bool:
+        url = urlsplit(target)
+        path, query = url.path, parse_qs(url.query)
+        self.counters["requests"] += 1
+
+        if method == "GET" and path == "/mock/stats":
+            await self._send(writer, 200, self.stats())
+            return True
+        if method == "POST" and path == "/mock/config":
+            self.configure(json.loads(body or b"{}"))
+            await self._send(writer, 200, self.settings)
+            return True
+        if "/batches" in path or "/files" in path:
+            try:
+                await self._batch_request(writer, method, path, headers, body)
+            except (ValueError, KeyError, TypeError) as e:
+                await self._send(writer, 400, {"error": {"message": f"Bad request: {e}"}})
+            return True
+        if method != "POST":
+            await self._send(writer, 404, {"error": {"message": f"No route for {method} {path}"}})
+            return True
+
+        try:
+            payload = json.loads(body or b"{}")
+            request = self._parse(path, query, payload)
+        except (ValueError, KeyError, TypeError) as e:
+            await self._send(writer, 400, {"error": {"message": f"Bad request: {e}"}})
+            return True
+        if request is None:
+            await self._send(writer, 404, {"error": {"message": f"No route for {path}"}})
+            return True
+        if request.api == "embeddings":
+            await self._send(writer, 200, await self._embeddings(payload))
+            return True
+
+        self.counters[f"{request.api}_requests"] += 1
+        fault = self._fault()
+        if fault == "hang":
+            await asyncio.sleep(self.settings["hang_seconds"])
+            return False
+        if fault is not None:
+            status, extra = fault
+            self.counters[f"status_{status}"] += 1
+            await asyncio.sleep(self.latency.sample(self.rng) / 4)
+            await self._send(writer, status, self._error_body(request.api, status), extra)
+            return True
+
+        self.counters["status_200"] += 1
+        ttft = self.latency.sample(self.rng)
+        text_tokens = self._reply_tokens(request)
+        headers_out = self._rate_headers(request.api)
+        if request.stream:
+            await asyncio.sleep(ttft)
+            content_type = "application/json" if request.api == "gemini" and "alt" not in query else "text/event-stream"
+            await self._send_stream(writer, self._stream_events(request, text_tokens, query), headers_out, content_type)
+        else:
+            await asyncio.sleep(ttft + len(text_tokens) / self.settings["tokens_per_second"])
+            await self._send(writer, 200, self._complete_body(request, text_tokens), headers_out)
+        return True
+
+    # Batch APIs: jobs finish batch_seconds after submission, checked when polled
+
+    async def _batch_request(self, writer, method: str, path: str, headers: Dict[str, str], body: bytes):
+        parts = path.rstrip("/").split("/")
+        if method == "POST" and parts[-1] == "files":
+            fields = self._multipart(headers.get("content-type", ""), body)
+            file_id = f"file-{uuid.uuid4().hex[:24]}"
+            self._files[file_id] = fields.get("file", b"")
+            await self._send(writer, 200, self._file_object(file_id, fields.get("purpose", b"batch").decode()))
+            return
+        if method == "GET" and parts[-1] == "content" and parts[-3] == "files":
+            content = self._files.get(parts[-2])
+            if content is None:
+                await self._send(writer, 404, {"error": {"message": f"No such file: {parts[-2]}"}})
+            else:
+                await self._send_body(writer, 200, content, "application/octet-stream")
+            return
+        if method == "POST" and parts[-1] == "batches":
+            payload = json.loads(body or b"{}")
+            if parts[-2] == "messages":
+                requests = [(entry["custom_id"], "/v1/messages", entry["params"]) for entry in payload["requests"]]
+                batch = self._new_batch("anthropic", requests)
+            else:
+                lines = self._files[payload["input_file_id"]].decode().splitlines()
+                requests = [(entry["custom_id"], entry["url"], entry["body"])
+                            for entry in map(json.loads, filter(str.strip, lines))]
+                batch = self._new_batch("openai", requests, payload)
+            await self._send(writer, 200, self._batch_object(batch))
+            return
+        if method == "GET":
+            batch_id = parts[-2] if parts[-1] == "results" else parts[-1]
+            batch = self._batches.get(batch_id)
+            if batch is None:
+                await self._send(writer, 404, {"error": {"message": f"No such batch: {batch_id}"}})
+            elif parts[-1] == "results":
+                self._finish_batch(batch)
+                if batch["results"] is None:
+                    await self._send(writer, 400, {"error": {"message": "Batch is still in progress"}})
+                else:
+                    await self._send_body(writer, 200, batch["results"], "application/binary")
+            else:
+                self._finish_batch(batch)
+                await self._send(writer, 200, self._batch_object(batch))
+            return
+        await self._send(writer, 404, {"error": {"message": f"No route for {method} {path}"}})
+
+    @staticmethod
+    def _multipart(content_type: str, body: bytes) -> Dict[str, bytes]:
+        message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                for part in message.iter_parts()}
+
+    def _file_object(self, file_id: str, purpose: str) -> Dict[str, Any]:
+        return {"id": file_id, "object": "file", "bytes": len(self._files[file_id]),
+                "created_at": int(time.time()), "filename": f"{file_id}.jsonl", "purpose": purpose}
+
+    def _new_batch(self, api: str, requests: List[Any], payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        prefix = "msgbatch_" if api == "anthropic" else "batch_"
+        batch = {
+            "id": f"{prefix}{uuid.uuid4().hex[:24]}", "api": api, "requests": requests,
+            "created_at": time.time(), "ready_at": time.monotonic() + self.settings["batch_seconds"],
+            "payload": payload or {}, "results": None, "succeeded": 0, "errored": 0
+        }
+        self._batches[batch["id"]] = batch
+        self.counters["batch_jobs"] += 1
+        self.counters["batch_requests"] += len(requests)
+        return batch
+
+    def _finish_batch(self, batch: Dict[str, Any]):
+        """Produce every result at once, the first time the batch is polled after ready_at"""
+        if batch["results"] is not None or time.monotonic() < batch["ready_at"]:
+            return
+        outputs, errors = [], []
+        for custom_id, url, params in batch["requests"]:
+            request = self._parse(url, {}, dict(params, stream=False))
+            failed = self.rng.random() < self.settings["error_rate"]
+            status = self.settings["error_status"]
+            if batch["api"] == "anthropic":
+                result = ({"type": "errored", "error": self._error_body("anthropic", status)} if failed else
+                          {"type": "succeeded", "message": self._complete_body(request, self._reply_tokens(request))})
+                outputs.append({"custom_id": custom_id, "result": result})
+            else:
+                body = (self._error_body("openai", status) if failed
+                        else self._complete_body(request, self._reply_tokens(request)))
+                line = {"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": custom_id,
+                        "response": {"status_code": status if failed else 200,
+                                     "request_id": uuid.uuid4().hex, "body": body},
+                        "error": None}
+                (errors if failed else outputs).append(line)
+            batch["errored" if failed else "succeeded"] += 1
+        if batch["api"] == "openai":
+            for kind, lines in (("output_file_id", outputs), ("error_file_id", errors)):
+                if lines:
+                    file_id = f"file-{uuid.uuid4().hex[:24]}"
+                    self._files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode()
+                    batch[kind] = file_id
+        batch["results"] = "".join(json.dumps(line) + "\n" for line in outputs).encode()
+        batch["ended_at"] = time.time()
+
+    def _batch_object(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        ended = batch["results"] is not None
+        total = len(batch["requests"])
+        if batch["api"] == "anthropic":
+            def stamp(seconds: Optional[float]) -> Optional[str]:
+                if seconds is None:
+                    return None
+                return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+            return {
+                "id": batch["id"], "type": "message_batch",
+                "processing_status": "ended" if ended else "in_progress",
+                "request_counts": {"processing": 0 if ended else total, "succeeded": batch["succeeded"],
+                                   "errored": batch["errored"], "canceled": 0, "expired": 0},
+                "created_at": stamp(batch["created_at"]), "expires_at": stamp(batch["created_at"] + 86400),
+                "ended_at": stamp(batch.get("ended_at")), "archived_at": None, "cancel_initiated_at": None,
+                "results_url": f"{self.base_url}/v1/messages/batches/{batch['id']}/results" if ended else None
+            }
+        payload = batch["payload"]
+        return {
+            "id": batch["id"], "object": "batch", "endpoint": payload.get("endpoint", "/v1/chat/completions"),
+            "errors": None, "input_file_id": payload.get("input_file_id"),
+            "completion_window": payload.get("completion_window", "24h"),
+            "status": "completed" if ended else "in_progress",
+            "output_file_id": batch.get("output_file_id"), "error_file_id": batch.get("error_file_id"),
+            "created_at": int(batch["created_at"]), "in_progress_at": int(batch["created_at"]),
+            "expires_at": int(batch["created_at"]) + 86400, "finalizing_at": None,
+            "completed_at": int(batch["ended_at"]) if ended else None, "failed_at": None, "expired_at": None,
+            "cancelling_at": None, "cancelled_at": None,
+            "request_counts": {"total": total, "completed": batch["succeeded"], "failed": batch["errored"]},
+            "metadata": payload.get("metadata")
+        }
+
+    # Request parsing
+
+    def _parse(self, path: str, query: Dict[str, List[str]], payload: Dict[str, Any]) -> Optional[MockRequest]:
+        if path.endswith("/chat/completions"):
+            prompt = "\n".join(self._text(msg.get("content")) for msg in payload["messages"])
+            return MockRequest(
+                "openai", payload.get("model") or path.split("/")[-3], prompt,
+                payload.get("max_tokens") or payload.get("max_completion_tokens"),
+                bool(payload.get("stream")),
+                include_usage=bool((payload.get("stream_options") or {}).get("include_usage"))
+            )
+        if path.endswith("/embeddings"):
+            return MockRequest("embeddings", payload.get("model", ""), "", None, False)
+        if path.endswith("/messages"):
+            system = payload.get("system") or ""
+            prefix = None
+            if isinstance(system, list):
+                cached = [block["text"] for block in system if block.get("cache_control")]
+                prefix = cached[0] if cached else None
+                system = "\n".join(block.get("text", "") for block in system)
+            prompt = "\n".join([system] + [self._text(msg.get("content")) for msg in payload["messages"]])
+            return MockRequest("anthropic", payload["model"], prompt, payload.get("max_tokens"),
+                               bool(payload.get("stream")), cacheable_prefix=prefix)
+        if ":generateContent" in path or ":streamGenerateContent" in path:
+            model = path.split("/models/", 1)[-1].split(":", 1)[0]
+            parts = [part.get("text", "") for content in payload.get("contents", [])
+                     for part in content.get("parts", [])]
+            instruction = payload.get("systemInstruction") or payload.get("system_instruction") or {}
+            parts = [part.get("text", "") for part in instruction.get("parts", [])] + parts
+            config = payload.get("generationConfig") or payload.get("generation_config") or {}
+            return MockRequest("gemini", model, "\n".join(parts),
+                               config.get("maxOutputTokens") or config.get("max_output_tokens"),
+                               ":streamGenerateContent" in path)
+        return None
+
+    @staticmethod
+    def _text(content: Any) -> str:
+        if isinstance(content, list):
+            return "\n".join(block.get("text", "") for block in content if isinstance(block, dict))
+        return str(content or "")
+
+    # Faults and rate limits
+
+    def _fault(self):
+        """None, "hang", or (status, headers) for an injected error or 429"""
+        now = time.monotonic()
+        rpm = self.settings["requests_per_minute"]
+        if rpm:
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if len(self._window) >= rpm:
+                wait = 60 - (now - self._window[0])
+                return 429, {"retry-after": f"{math.ceil(wait)}", "x-ratelimit-remaining-requests": "0",
+                             "x-ratelimit-reset-requests": f"{wait:.3f}s"}
+            self._window.append(now)
+        roll = self.rng.random()
+        if roll < self.settings["hang_rate"]:
+            return "hang"
+        roll -= self.settings["hang_rate"]
+        if roll < self.settings["rate_limit_rate"]:
+            return 429, {"retry-after": f"{self.settings['retry_after_seconds']:g}"}
+        roll -= self.settings["rate_limit_rate"]
+        if roll < self.settings["error_rate"]:
+            return self.settings["error_status"], {}
+        return None
+
+    def _rate_headers(self, api: str) -> Dict[str, str]:
+        rpm = self.settings["requests_per_minute"]
+        if not rpm:
+            return {}
+        remaining = max(0, rpm - len(self._window))
+        reset = 60 - (time.monotonic() - self._window[0]) if self._window else 0.0
+        if api == "anthropic":
+            reset_at = datetime.fromtimestamp(time.time() + reset, tz=timezone.utc)
+            return {"anthropic-ratelimit-requests-limit": str(rpm),
+                    "anthropic-ratelimit-requests-remaining": str(remaining),
+                    "anthropic-ratelimit-requests-reset": reset_at.isoformat().replace("+00:00", "Z")}
+        return {"x-ratelimit-limit-requests": str(rpm),
+                "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s"}
+
+    def _error_body(self, api: str, status: int) -> Dict[str, Any]:
+        message = "Rate limit exceeded (mock)" if status == 429 else "Injected failure (mock)"
+        if api == "anthropic":
+            kind = "rate_limit_error" if status == 429 else ("overloaded_error" if status == 529 else "api_error")
+            return {"type": "error", "error": {"type": kind, "message": message}}
+        if api == "gemini":
+            return {"error": {"code": status, "message": message, "status": GEMINI_STATUSES.get(status, "INTERNAL")}}
+        kind = "rate_limit_exceeded" if status == 429 else "server_error"
+        return {"error": {"message": message, "type": kind, "code": kind}}
+
+    # Response bodies
+
+    def _reply_tokens(self, request: MockRequest) -> List[str]:
+        """Deterministic reply for the prompt, one list item per token"""
+        count = self.settings["response_tokens"]
+        if request.max_tokens:
+            count = min(count, request.max_tokens)
+        seed = int(hashlib.sha256(request.prompt.encode()).hexdigest()[:8], 16)
+        tokens = ["Mock", " reply"]
+        tokens += [f" {FILLER[(seed + i) % len(FILLER)]}" for i in range(max(0, count - len(tokens)))]
+        return tokens[:max(1, count)]
+
+    def _usage(self, request: MockRequest, output_tokens: int) -> Dict[str, int]:
+        """Prompt tokens, with Anthropic-style prompt caching of the marked prefix"""
+        input_tokens = count_text_tokens(request.prompt)
+        cached = written = 0
+        if request.cacheable_prefix:
+            key = hashlib.sha256(f"{request.model}\0{request.cacheable_prefix}".encode()).hexdigest()
+            size = min(input_tokens, count_text_tokens(request.cacheable_prefix))
+            if key in self._cached_prefixes:
+                cached = size
+            else:
+                self._cached_prefixes.add(key)
+                written = size
+        return {"input": input_tokens, "output": output_tokens, "cached": cached, "written": written}
+
+    def _complete_body(self, request: MockRequest, tokens: List[str]) -> Dict[str, Any]:
+        usage = self._usage(request, len(tokens))
+        text = "".join(tokens)
+        if request.api == "anthropic":
+            return {
+                "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+                "model": request.model, "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": self._anthropic_usage(usage)
+            }
+        if request.api == "gemini":
+            return self._gemini_chunk(text, usage, finished=True)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion",
+            "created": int(time.time()), "model": request.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": self._openai_usage(usage)
+        }
+
+    @staticmethod
+    def _openai_usage(usage: Dict[str, int]) -> Dict[str, Any]:
+        return {"prompt_tokens": usage["input"], "completion_tokens": usage["output"],
+                "total_tokens": usage["input"] + usage["output"],
+                "prompt_tokens_details": {"cached_tokens": usage["cached"]}}
+
+    @staticmethod
+    def _anthropic_usage(usage: Dict[str, int]) -> Dict[str, int]:
+        # input_tokens excludes cache reads and writes, as in the real API
+        return {"input_tokens": usage["input"] - usage["cached"] - usage["written"],
+                "output_tokens": usage["output"],
+                "cache_read_input_tokens": usage["cached"],
+                "cache_creation_input_tokens": usage["written"]}
+
+    @staticmethod
+    def _gemini_chunk(text: str, usage: Optional[Dict[str, int]], finished: bool) -> Dict[str, Any]:
+        candidate: Dict[str, Any] = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        chunk: Dict[str, Any] = {"candidates": [candidate]}
+        if usage is not None:
+            chunk["usageMetadata"] = {"promptTokenCount": usage["input"],
+                                      "candidatesTokenCount": usage["output"],
+                                      "totalTokenCount": usage["input"] + usage["output"]}
+        return chunk
+
+    async def _embeddings(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = payload.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        vectors = [await self.embedder.embed(text) for text in inputs]
+        return {
+            "object": "list", "model": payload.get("model", ""),
+            "data": [{"object": "embedding", "index": i, "embedding": [float(x) for x in vector]}
+                     for i, vector in enumerate(vectors)],
+            "usage": {"prompt_tokens": sum(count_text_tokens(text) for text in inputs),
+                      "total_tokens": sum(count_text_tokens(text) for text in inputs)}
+        }
+
+    async def _stream_events(self, request: MockRequest, tokens: List[str],
+                             query: Dict[str, List[str]]) -> AsyncIterator[bytes]:
+        usage = self._usage(request, len(tokens))
+        interval = 1.0 / self.settings["tokens_per_second"]
+        if request.api == "anthropic":
+            events = self._anthropic_events(request, tokens, usage, interval)
+        elif request.api == "gemini":
+            events = self._gemini_events(tokens, usage, interval, sse="alt" in query)
+        else:
+            events = self._openai_events(request, tokens, usage, interval)
+        async for event in events:
+            yield event
+
+    async def _openai_events(self, request: MockRequest, tokens: List[str], usage: Dict[str, int],
+                             interval: float) -> AsyncIterator[bytes]:
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": request.model}
+
+        def event(choices: List[Dict[str, Any]], **extra) -> bytes:
+            return b"data: " + json.dumps(dict(base, choices=choices, **extra)).encode() + b"\n\n"
+
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(interval)
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            yield event([{"index": 0, "delta": delta, "finish_reason": None}])
+        yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if request.include_usage:
+            yield event([], usage=self._openai_usage(usage))
+        yield b"data: [DONE]\n\n"
+
+    async def _anthropic_events(self, request: MockRequest, tokens: List[str], usage: Dict[str, int],
+                                interval: float) -> AsyncIterator[bytes]:
+        def event(kind: str, data: Dict[str, Any]) -> bytes:
+            data = dict(data, type=kind)
+            return f"event: {kind}\ndata: {json.dumps(data)}\n\n".encode()
+
+        start_usage = dict(self._anthropic_usage(usage), output_tokens=1)
+        yield event("message_start", {"message": {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+            "model": request.model, "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": start_usage
+        }})
+        yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        yield event("ping", {})
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(interval)
+            yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": token}})
+        yield event("content_block_stop", {"index": 0})
+        yield event("message_delta", {"delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                      "usage": {"output_tokens": usage["output"]}})
+        yield event("message_stop", {})
+
+    async def _gemini_events(self, tokens: List[str], usage: Dict[str, int], interval: float,
+                             sse: bool) -> AsyncIterator[bytes]:
+        # Gemini sends a few tokens per chunk; without alt=sse the body is one JSON array
+        chunks = [tokens[i:i + 4] for i in range(0, len(tokens), 4)]
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(interval * len(chunk))
+            last = i == len(chunks) - 1
+            payload = json.dumps(self._gemini_chunk("".join(chunk), usage if last else None, last))
+            if sse:
+                yield f"data: {payload}\r\n\r\n".encode()
+            else:
+                yield (("[" if i == 0 else ",\r\n") + payload + ("]" if last else "")).encode()
@@ -0,0 +1,112 @@
+"""
+Provider Prompt-Prefix Caching
+Cache-control settings and accounting of prompt tokens served from the provider's cache
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROMPT_CACHE_SETTINGS = {
+    "enabled": True,
+    "cache_history": True,
+    "gemini_min_tokens": 4096,
+    "gemini_ttl_seconds": 3600,
+    # Cumulative hit ratio logged at INFO every this many requests (0: never); per request at DEBUG
+    "log_every_requests": 100
+}
+
+_prompt_cache_settings: Dict[str, Any] = dict(DEFAULT_PROMPT_CACHE_SETTINGS)
+
+
+def configure_prompt_cache(settings: Optional[Dict[str, Any]]):
+    """Settings from the prompt_cache section of config.json"""
+    _prompt_cache_settings.update(settings or {})
+
+
+def prompt_cache_settings() -> Dict[str, Any]:
+    return _prompt_cache_settings
+
+
+def stable_prefix(messages: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """The leading system message (identical on every turn) and everything after it"""
+    if messages and messages[0]["role"] == "system":
+        return messages[0]["content"], messages[1:]
+    return None, messages
+
+
+def _field(obj: Any, name: str) -> int:
+    value = getattr(obj, name, None)
+    if value is None and isinstance(obj, dict):
+        value = obj.get(name)
+    return value or 0
+
+
+Usage = Tuple[int, int, int, int]
+
+
+def openai_usage(usage: Any) -> Usage:
+    """(prompt tokens, cached tokens, cache writes, completion tokens) from an OpenAI-compatible usage block"""
+    if usage is None:
+        return 0, 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    # DeepSeek reports hits at the top level instead of in prompt_tokens_details
+    cached = _field(details, "cached_tokens") if details is not None else _field(usage, "prompt_cache_hit_tokens")
+    return _field(usage, "prompt_tokens"), cached, 0, _field(usage, "completion_tokens")
+
+
+def anthropic_usage(usage: Any) -> Usage:
+    """Anthropic's input_tokens excludes cache reads and writes, so add them back"""
+    if usage is None:
+        return 0, 0, 0, 0
+    cached = _field(usage, "cache_read_input_tokens")
+    written = _field(usage, "cache_creation_input_tokens")
+    return _field(usage, "input_tokens") + cached + written, cached, written, _field(usage, "output_tokens")
+
+
+def gemini_usage(metadata: Any) -> Usage:
+    if metadata is None:
+        return 0, 0, 0, 0
+    return (_field(metadata, "prompt_token_count"), _field(metadata, "cached_content_token_count"), 0,
+            _field(metadata, "candidates_token_count"))
+
+
+class PromptCacheStats:
+    """Prompt tokens sent to one provider/model and how many were cache hits"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.cache_write_tokens = 0
+
+    def record(self, usage: Usage):
+        input_tokens, cached_tokens, cache_write_tokens = usage[:3]
+        if not input_tokens:
+            return
+        self.requests += 1
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+        self.cache_write_tokens += cache_write_tokens
+        logger.debug(
+            "prompt cache: %s input=%d cached=%d written=%d",
+            self.name, input_tokens, cached_tokens, cache_write_tokens
+        )
+        every = _prompt_cache_settings.get("log_every_requests") or 0
+        if every and self.requests % every == 0:
+            logger.info(
+                "prompt cache: %s %d requests, %.1f%% of %d input tokens cached, %d written",
+                self.name, self.requests, 100.0 * self.cached_tokens / self.input_tokens,
+                self.input_tokens, self.cache_write_tokens
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "hit_ratio": round(self.cached_tokens / self.input_tokens, 4) if self.input_tokens else 0.0
+        }
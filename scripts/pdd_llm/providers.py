@@ -0,0 +1,541 @@
+"""
+LLM Provider Adapters
+One adapter per wire format (OpenAI-compatible, Anthropic, Gemini),
+all built on the shared pooled HTTP transport; each SDK is imported
+only when its first adapter is built
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .breaker import CLOSED, CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from .deadline import bounded, check_deadline, within_deadline
+from .errors import error_status, retry_after
+from .executor import BoundedExecutor
+from .memory import count_tokens
+from .metrics import METRICS, RequestTimer
+from .prompt_cache import (
+    PromptCacheStats,
+    Usage,
+    anthropic_usage,
+    gemini_usage,
+    openai_usage,
+    prompt_cache_settings,
+    stable_prefix,
+)
+from .ratelimit import ProviderRateLimiter, estimate_tokens, get_rate_limiter, rate_limit_listener
+from .startup import lazy_import
+from .transport import SharedTransport, get_transport
+
+logger = logging.getLogger(__name__)
+
+OPENAI_COMPATIBLE = ("openai", "deepseek", "azure", "local")
+
+# Providers whose streaming API accepts stream_options and sends a final usage chunk
+STREAM_USAGE_PROVIDERS = ("openai", "deepseek")
+
+EPHEMERAL = {"type": "ephemeral"}
+
+# Half-open probe: the smallest request that proves the provider answers
+PROBE_MESSAGES = [{"role": "user", "content": "ping"}]
+SUPPORTED_PROVIDERS = OPENAI_COMPATIBLE + ("anthropic", "gemini")
+
+DEFAULT_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "deepseek": "https://api.deepseek.com/v1",
+    "anthropic": "https://api.anthropic.com",
+    "gemini": "https://generativelanguage.googleapis.com",
+    "local": "http://localhost:11434/v1"
+}
+
+# genai.configure is process-wide, so only reconfigure when the key or endpoint changes
+_gemini_configured: Optional[Tuple[str, Optional[str]]] = None
+
+# GenerativeModel instances are reused per (model, system instruction),
+# together with the time their cached content expires
+_gemini_models: Dict[Tuple[str, Optional[str]], Tuple[Any, float]] = {}
+
+# Used when the installed SDK has no generate_content_async or a REST base_url is set
+gemini_executor = BoundedExecutor("gemini", max_workers=16)
+
+
+def anthropic_request(messages: List[Dict[str, str]], cache: bool = True,
+                      cache_history: bool = True) -> Dict[str, Any]:
+    """Anthropic takes the system prompt as a parameter, not as a message
+
+    The fixed system prompt gets a cache breakpoint, and so does the last
+    message, so the next turn reads the whole earlier conversation from
+    the prompt cache.
+    """
+    system = [{"type": "text", "text": msg['content']} for msg in messages if msg['role'] == 'system']
+    chat_messages = [dict(msg) for msg in messages if msg['role'] != 'system']
+    if cache:
+        if system:
+            system[0]["cache_control"] = EPHEMERAL
+        if cache_history and chat_messages:
+            last = chat_messages[-1]
+            last["content"] = [{"type": "text", "text": last["content"], "cache_control": EPHEMERAL}]
+    params: Dict[str, Any] = {"messages": chat_messages}
+    if system:
+        params["system"] = system
+    return params
+
+
+def anthropic_text(message: Any) -> str:
+    """Text of an Anthropic message; empty when it has no text blocks (e.g. stopped at once)"""
+    return "".join(block.text for block in message.content or [] if getattr(block, "type", None) == "text")
+
+
+def to_gemini_prompt(messages: List[Dict[str, str]]) -> str:
+    """Convert messages to Gemini format - combine into single prompt"""
+    prompt_parts = []
+    for msg in messages:
+        if msg['role'] == 'system':
+            prompt_parts.append(f"Instructions: {msg['content']}")
+        elif msg['role'] == 'user':
+            prompt_parts.append(f"User: {msg['content']}")
+        elif msg['role'] == 'assistant':
+            prompt_parts.append(f"Assistant: {msg['content']}")
+    return "\n\n".join(prompt_parts)
+
+
+class ProviderAdapter:
+    """A configured SDK client for one provider and model
+
+    complete() and stream() pass the provider's circuit breaker, queue on
+    its rate limiter and retry 429s, all within the request deadline;
+    subclasses implement the provider calls in _complete() and _stream().
+    """
+
+    uses_transport = True
+    # Upper bound on one SDK call; the router sets its per-backend timeout here
+    attempt_timeout: Optional[float] = None
+
+    def __init__(self, provider: str, api_key: str, model: str,
+                 base_url: Optional[str] = None, api_version: Optional[str] = None,
+                 transport: Optional[SharedTransport] = None,
+                 rate_limiter: Optional[ProviderRateLimiter] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.api_version = api_version
+        self.transport = transport or get_transport()
+        self._rate_limiter = rate_limiter
+        self.breaker = breaker or get_circuit_breaker(provider)
+        self.prompt_cache = PromptCacheStats(f"{provider}/{model}")
+        self.client = self.setup_client()
+        if self.uses_transport:
+            # Rate-limit headers and 429s on any response adjust the buckets
+            listener = rate_limiter.observe if rate_limiter is not None else rate_limit_listener(provider)
+            self.transport.add_response_listener(self.host_url, listener)
+
+    @property
+    def rate_limiter(self) -> ProviderRateLimiter:
+        """The limiter given at construction, else the provider's current process-wide one"""
+        return self._rate_limiter or get_rate_limiter(self.provider)
+
+    @property
+    def host_url(self) -> Optional[str]:
+        return self.base_url or DEFAULT_BASE_URLS.get(self.provider)
+
+    @property
+    def http_client(self):
+        """Pooled connection for this adapter's host"""
+        return self.transport.client_for(self.host_url)
+
+    def setup_client(self):
+        """Build the SDK client"""
+        raise NotImplementedError
+
+    async def warm_up(self, connections: int = 1, system: Optional[str] = None):
+        """Open pooled connections to the provider host so the first request skips DNS and TLS
+
+        Any answer will do (usually a 404 for the bare base URL); the
+        connection stays in the keep-alive pool for the next request.
+        """
+        if not self.uses_transport or not self.host_url:
+            return
+        client = self.http_client
+        await asyncio.gather(*(client.get(self.host_url) for _ in range(max(1, connections))))
+
+    def time_limit(self) -> Optional[float]:
+        """Seconds one SDK call may take: the attempt timeout, capped to the time left before the deadline"""
+        return bounded(self.attempt_timeout)
+
+    def timeout_options(self) -> Dict[str, Any]:
+        """SDK request timeout"""
+        limit = self.time_limit()
+        return {} if limit is None else {"timeout": max(0.001, limit)}
+
+    def _should_retry(self, exc: Exception, attempt: int) -> bool:
+        """Retry 429s after the limiter's pause, up to max_retries"""
+        if error_status(exc) != 429 or attempt >= self.rate_limiter.settings["max_retries"]:
+            return False
+        if not self.uses_transport:
+            # No response hook saw this 429, so pause the limiter here
+            self.rate_limiter.rate_limited(retry_after(exc))
+        return True
+
+    async def _admit(self):
+        """Pass the circuit breaker; the half-open probe is a one-token request"""
+        if not self.breaker.allow() or not self.breaker.settings["probe"]:
+            # Closed, or the real request is the half-open trial
+            return
+        try:
+            await asyncio.wait_for(
+                self._complete(PROBE_MESSAGES, 1, 0),
+                timeout=bounded(self.breaker.settings["probe_timeout_seconds"])
+            )
+        except Exception as e:
+            self.breaker.record(e)
+            if self.breaker.state != CLOSED:
+                raise CircuitOpenError(self.breaker.name, self.breaker.retry_in()) from e
+            return
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+
+    async def _acquire(self, messages: List[Dict[str, str]], max_tokens: int, timer: RequestTimer):
+        """Wait for rate-limit capacity; failing here says nothing about the provider, so the breaker only releases"""
+        started = time.perf_counter()
+        try:
+            await within_deadline(self.rate_limiter.acquire(estimate_tokens(messages, max_tokens)))
+        except BaseException:
+            self.breaker.release()
+            raise
+        timer.queued(time.perf_counter() - started)
+
+    def _record_usage(self, usage: Usage):
+        """Provider-reported token usage: prompt-cache stats and metrics"""
+        self.prompt_cache.record(usage)
+        prompt_tokens, cached_tokens, _, completion_tokens = usage
+        if prompt_tokens or completion_tokens:
+            METRICS.usage(self.provider, self.model, prompt_tokens, cached_tokens, completion_tokens)
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = 2000,
+                       temperature: float = 0.7) -> str:
+        """Return the full completion text"""
+        with METRICS.track(self.provider, self.model) as timer:
+            check_deadline()
+            await self._admit()
+            attempt = 0
+            while True:
+                await self._acquire(messages, max_tokens, timer)
+                try:
+                    response = await within_deadline(self._complete(messages, max_tokens, temperature))
+                except Exception as e:
+                    if self._should_retry(e, attempt):
+                        timer.retried("rate_limited")
+                        attempt += 1
+                        continue
+                    self.breaker.record(e)
+                    raise
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                break
+            self.breaker.record_success()
+            timer.first_token()
+            return response
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int = 2000,
+                     temperature: float = 0.7) -> AsyncIterator[str]:
+        """Yield completion text deltas as they arrive; 429s are retried before the first delta
+
+        The deadline bounds the wait for every delta, so a stream that
+        stalls midway is cut off when the time is up. The provider stream
+        is closed as soon as the consumer stops, so an abandoned
+        generation stops streaming (and billing) right away.
+        """
+        with METRICS.track(self.provider, self.model) as timer:
+            check_deadline()
+            await self._admit()
+            attempt = 0
+            while True:
+                await self._acquire(messages, max_tokens, timer)
+                started = False
+                source = self._stream(messages, max_tokens, temperature)
+                try:
+                    while True:
+                        try:
+                            delta = await within_deadline(source.__anext__())
+                        except StopAsyncIteration:
+                            break
+                        if not started:
+                            started = True
+                            timer.first_token()
+                            # The provider is serving; a stream cut short later is recorded separately
+                            self.breaker.record_success()
+                        timer.output(delta)
+                        yield delta
+                    break
+                except Exception as e:
+                    if not started and self._should_retry(e, attempt):
+                        timer.retried("rate_limited")
+                        attempt += 1
+                        continue
+                    self.breaker.record(e)
+                    raise
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                finally:
+                    await source.aclose()
+            if not started:
+                self.breaker.record_success()
+
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int,
+                        temperature: float) -> str:
+        raise NotImplementedError
+
+    async def _stream(self, messages: List[Dict[str, str]], max_tokens: int,
+                      temperature: float) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """OpenAI, DeepSeek, Azure OpenAI and local OpenAI-compatible servers"""
+
+    def setup_client(self):
+        openai = lazy_import("openai")
+        if openai is None:
+            raise ImportError("openai package not installed. Run: pip install openai")
+
+        if self.provider == "azure":
+            return openai.AsyncAzureOpenAI(
+                api_key=self.api_key,
+                azure_endpoint=self.base_url,
+                api_version=self.api_version or "2024-02-15-preview",
+                http_client=self.http_client,
+                max_retries=0
+            )
+        # Retries are the rate limiter's (429s) and the router's (failover) business
+        return openai.AsyncOpenAI(
+            api_key="local" if self.provider == "local" else self.api_key,
+            base_url=self.base_url or None,
+            http_client=self.http_client,
+            max_retries=0
+        )
+
+    async def warm_up(self, connections: int = 1, system: Optional[str] = None):
+        # The SDK loads its resource classes on first attribute access
+        _ = self.client.chat.completions
+        await super().warm_up(connections, system)
+
+    async def _complete(self, messages, max_tokens, temperature):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **self.timeout_options()
+        )
+        # Providers cache long prompt prefixes automatically; just count the hits
+        self._record_usage(openai_usage(response.usage))
+        return response.choices[0].message.content
+
+    async def _stream(self, messages, max_tokens, temperature):
+        extra = {"stream_options": {"include_usage": True}} if self.provider in STREAM_USAGE_PROVIDERS else {}
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **extra,
+            **self.timeout_options()
+        )
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    self._record_usage(openai_usage(chunk.usage))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Closing the response is what tells the provider to stop generating
+            await stream.close()
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Anthropic messages API"""
+
+    def setup_client(self):
+        anthropic = lazy_import("anthropic")
+        if anthropic is None:
+            raise ImportError("anthropic package not installed. Run: pip install anthropic")
+        extra = {"base_url": self.base_url} if self.base_url else {}
+        return anthropic.AsyncAnthropic(api_key=self.api_key, http_client=self.http_client, max_retries=0, **extra)
+
+    async def warm_up(self, connections: int = 1, system: Optional[str] = None):
+        _ = self.client.messages
+        await super().warm_up(connections, system)
+
+    def request_params(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        settings = prompt_cache_settings()
+        return anthropic_request(messages, settings["enabled"], settings["cache_history"])
+
+    async def _complete(self, messages, max_tokens, temperature):
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **self.request_params(messages),
+            **self.timeout_options()
+        )
+        self._record_usage(anthropic_usage(response.usage))
+        return anthropic_text(response)
+
+    async def _stream(self, messages, max_tokens, temperature):
+        async with self.client.messages.stream(
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **self.request_params(messages),
+            **self.timeout_options()
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+            message = await stream.get_final_message()
+            self._record_usage(anthropic_usage(message.usage))
+
+
+class GeminiAdapter(ProviderAdapter):
+    """Google Gemini through google-generativeai
+
+    Calls use the SDK's native async API (generate_content_async). Older
+    SDKs without it fall back to the dedicated gemini_executor pool
+    rather than the loop's default executor. The SDK keeps its own
+    channel and does not accept an injected HTTP client, so the pooled
+    transport is not used here. A base_url (e.g. the offline mock server)
+    switches the SDK to its REST transport, which only has a sync client.
+
+    The leading system message becomes the model's system instruction;
+    once it is long enough for Gemini's context caching it is uploaded
+    as cached content and reused until shortly before its TTL runs out.
+    """
+
+    uses_transport = False
+
+    def setup_client(self):
+        global _gemini_configured
+        genai = lazy_import("google.generativeai")
+        if genai is None:
+            raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
+        if _gemini_configured != (self.api_key, self.base_url):
+            if self.base_url:
+                genai.configure(api_key=self.api_key, transport="rest",
+                                client_options={"api_endpoint": self.base_url})
+            else:
+                genai.configure(api_key=self.api_key)
+            _gemini_configured = (self.api_key, self.base_url)
+            # Models hold clients bound to the old key
+            _gemini_models.clear()
+        return genai
+
+    async def warm_up(self, connections: int = 1, system: Optional[str] = None):
+        """Build the shared GenerativeModel; the SDK opens its own channel on the first call"""
+        await self.model_for(system)
+
+    def use_async(self, model) -> bool:
+        return not self.base_url and hasattr(model, "generate_content_async")
+
+    def _cached_model(self, system: str, ttl: float):
+        """GenerativeModel backed by cached content holding the system instruction"""
+        cached = self.client.caching.CachedContent.create(
+            model=self.model,
+            system_instruction=system,
+            ttl=datetime.timedelta(seconds=ttl)
+        )
+        return self.client.GenerativeModel.from_cached_content(cached_content=cached)
+
+    async def model_for(self, system: Optional[str]):
+        """Shared GenerativeModel for this adapter's model and system instruction"""
+        key = (self.model, system)
+        now = time.time()
+        entry = _gemini_models.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        settings = prompt_cache_settings()
+        model, expires = None, float("inf")
+        if system and settings["enabled"] and count_tokens(system, self.model) >= settings["gemini_min_tokens"]:
+            ttl = settings["gemini_ttl_seconds"]
+            try:
+                model = await gemini_executor.run(self._cached_model, system, ttl)
+                # Refresh a little early so requests never hit an expired cache
+                expires = now + ttl * 0.9
+            except Exception as e:
+                logger.warning("prompt cache: gemini cached content unavailable for %s: %s", self.model, e)
+        if model is None:
+            extra = {"system_instruction": system} if system else {}
+            model = self.client.GenerativeModel(self.model, **extra)
+        _gemini_models[key] = (model, expires)
+        return model
+
+    def timeout_options(self) -> Dict[str, Any]:
+        limit = self.time_limit()
+        return {} if limit is None else {"request_options": {"timeout": max(0.001, limit)}}
+
+    def generation_config(self, max_tokens: int, temperature: float) -> Dict[str, float]:
+        return {"max_output_tokens": max_tokens, "temperature": temperature}
+
+    async def _complete(self, messages, max_tokens, temperature):
+        system, rest = stable_prefix(messages)
+        model = await self.model_for(system)
+        prompt = to_gemini_prompt(rest)
+        config = self.generation_config(max_tokens, temperature)
+        if self.use_async(model):
+            response = await model.generate_content_async(prompt, generation_config=config, **self.timeout_options())
+        else:
+            response = await gemini_executor.run(model.generate_content, prompt, generation_config=config,
+                                                 **self.timeout_options())
+        self._record_usage(gemini_usage(getattr(response, "usage_metadata", None)))
+        return response.text
+
+    async def _stream(self, messages, max_tokens, temperature):
+        system, rest = stable_prefix(messages)
+        model = await self.model_for(system)
+        prompt = to_gemini_prompt(rest)
+        config = self.generation_config(max_tokens, temperature)
+        if self.use_async(model):
+            response = await model.generate_content_async(prompt, generation_config=config, stream=True,
+                                                          **self.timeout_options())
+            async for chunk in response:
+                # Chunks without parts (e.g. safety stops) have no text
+                if chunk.parts:
+                    yield chunk.text
+            self._record_usage(gemini_usage(getattr(response, "usage_metadata", None)))
+            return
+
+        response = await gemini_executor.run(model.generate_content, prompt, generation_config=config, stream=True,
+                                             **self.timeout_options())
+        chunks = iter(response)
+        while True:
+            chunk = await gemini_executor.run(next, chunks, None)
+            if chunk is None:
+                self._record_usage(gemini_usage(getattr(response, "usage_metadata", None)))
+                return
+            if chunk.parts:
+                yield chunk.text
+
+
+def create_adapter(provider: str, api_key: str, model: str, base_url: Optional[str] = None,
+                   api_version: Optional[str] = None,
+                   transport: Optional[SharedTransport] = None) -> ProviderAdapter:
+    """Build the adapter for a provider name"""
+    if provider in OPENAI_COMPATIBLE:
+        adapter_class = OpenAICompatibleAdapter
+    elif provider == "anthropic":
+        adapter_class = AnthropicAdapter
+    elif provider == "gemini":
+        adapter_class = GeminiAdapter
+    else:
+        raise ValueError(f"Unsupported provider: {provider}")
+    return adapter_class(provider, api_key, model, base_url, api_version, transport)
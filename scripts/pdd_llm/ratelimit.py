@@ -0,0 +1,255 @@
+"""
+Client-Side Rate Limiting
+Per-provider token buckets for requests/min and tokens/min that queue
+callers instead of burning requests on 429s, and follow the provider's
+rate-limit headers and Retry-After live
+"""
+
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from .workers import worker_count
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    "requests_per_minute": None,
+    "tokens_per_minute": None,
+    "max_wait_seconds": 120.0,
+    "max_retries": 2,
+    "default_retry_after_seconds": 5.0
+}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class RateLimitTimeout(Exception):
+    """The request would have to queue longer than max_wait_seconds"""
+
+
+def parse_reset(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds until reset from '1.5s' / '6m0s' / '20ms', plain seconds or an RFC 3339 time"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(0.0, reset_at.timestamp() - now)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Rough prompt size (4 chars per token) plus the completion allowance"""
+    prompt_chars = sum(len(str(msg.get("content", ""))) for msg in messages)
+    return prompt_chars // 4 + 4 * len(messages) + max_tokens
+
+
+class TokenBucket:
+    """Refills continuously at capacity per minute; unlimited when capacity is None
+
+    share is the fraction of the provider quota this process may use
+    (1 / worker count in a multi-worker chat app), applied to the
+    configured capacity and to limits learned from response headers.
+    """
+
+    def __init__(self, per_minute: Optional[float] = None, share: float = 1.0):
+        self.share = share
+        per_minute = per_minute * share if per_minute else per_minute
+        self.capacity = per_minute
+        self.tokens = float(per_minute) if per_minute else 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.refill_at: Optional[float] = None
+
+    def _refill(self, now: float):
+        if self.refill_at is not None and now >= self.refill_at:
+            # The provider said its window resets here
+            self.tokens = self.capacity or 0.0
+            self.refill_at = None
+        if self.capacity:
+            elapsed = now - self.updated
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken"""
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        if not self.capacity:
+            return blocked
+        # Requests bigger than the bucket go through once it is full
+        amount = min(amount, self.capacity)
+        missing = amount - self.tokens
+        refill = missing * 60.0 / self.capacity if missing > 0 else 0.0
+        if refill and self.refill_at is not None:
+            refill = min(refill, self.refill_at - now)
+        return max(blocked, refill)
+
+    def take(self, amount: float):
+        if self.capacity:
+            self.tokens -= min(amount, self.capacity)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float], now: float):
+        """Follow the provider's own view of this bucket"""
+        self._refill(now)
+        if limit and not self.capacity:
+            # No configured quota: learn it from the headers
+            self.capacity = limit * self.share
+            self.tokens = self.capacity
+        if remaining is not None and self.capacity:
+            # The headers count for the whole deployment
+            self.tokens = min(self.tokens, remaining * self.share)
+        if reset is not None and self.capacity:
+            self.refill_at = now + reset
+        if remaining is not None and remaining <= 0 and reset:
+            self.blocked_until = max(self.blocked_until, now + reset)
+
+
+class ProviderRateLimiter:
+    """Requests/min and tokens/min buckets for one provider
+
+    Callers queue in FIFO order on acquire(). Response headers and 429s
+    feed back into the buckets through observe().
+    """
+
+    def __init__(self, provider: str, settings: Optional[Dict[str, Any]] = None):
+        self.provider = provider
+        self.settings = dict(DEFAULT_RATE_LIMIT_SETTINGS)
+        self.settings.update(settings or {})
+        share = 1.0 / worker_count()
+        self.requests = TokenBucket(self.settings["requests_per_minute"], share)
+        self.tokens = TokenBucket(self.settings["tokens_per_minute"], share)
+        self._queue = asyncio.Lock()
+        self.counters = {"acquired": 0, "queued": 0, "wait_seconds": 0.0, "rate_limited": 0}
+
+    async def acquire(self, tokens: int):
+        """Wait until both buckets allow one request of this many tokens"""
+        started = time.monotonic()
+        async with self._queue:
+            while True:
+                now = time.monotonic()
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    break
+                queued_for = now - started + wait
+                if queued_for > self.settings["max_wait_seconds"]:
+                    raise RateLimitTimeout(
+                        f"{self.provider} rate limit: would queue {queued_for:.0f}s "
+                        f"(max {self.settings['max_wait_seconds']:.0f}s)"
+                    )
+                logger.debug("rate limit: %s bucket empty, waiting %.2fs", self.provider, wait)
+                await asyncio.sleep(wait)
+
+        waited = time.monotonic() - started
+        self.counters["acquired"] += 1
+        if waited > 0.001:
+            self.counters["queued"] += 1
+            self.counters["wait_seconds"] += waited
+
+    def observe(self, status_code: int, headers: Mapping[str, str]):
+        """Apply rate-limit headers from any provider response"""
+        now = time.monotonic()
+        lowered = {key.lower(): value for key, value in headers.items()}
+
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            limit = remaining = reset = None
+            for prefix in ("x-ratelimit-", "anthropic-ratelimit-"):
+                openai_style = prefix == "x-ratelimit-"
+                limit_value = lowered.get(f"{prefix}limit-{kind}" if openai_style else f"{prefix}{kind}-limit")
+                remaining_value = lowered.get(f"{prefix}remaining-{kind}" if openai_style else f"{prefix}{kind}-remaining")
+                reset_value = lowered.get(f"{prefix}reset-{kind}" if openai_style else f"{prefix}{kind}-reset")
+                if limit_value or remaining_value or reset_value:
+                    limit = _to_float(limit_value)
+                    remaining = _to_float(remaining_value)
+                    reset = parse_reset(reset_value)
+                    break
+            if limit is not None or remaining is not None:
+                bucket.sync(limit, remaining, reset, now)
+
+        if status_code == 429:
+            retry_after = None
+            if "retry-after-ms" in lowered:
+                retry_after = (_to_float(lowered["retry-after-ms"]) or 0.0) / 1000.0
+            elif "retry-after" in lowered:
+                retry_after = parse_reset(lowered["retry-after"])
+            self.rate_limited(retry_after)
+
+    def rate_limited(self, retry_after: Optional[float] = None):
+        """Pause the provider after a 429"""
+        delay = retry_after if retry_after is not None else self.settings["default_retry_after_seconds"]
+        self.requests.blocked_until = max(self.requests.blocked_until, time.monotonic() + delay)
+        self.counters["rate_limited"] += 1
+        logger.warning("rate limit: %s returned 429, pausing %.1fs", self.provider, delay)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.counters)
+        stats["requests_available"] = round(self.requests.tokens, 1) if self.requests.capacity else None
+        stats["tokens_available"] = round(self.tokens.tokens) if self.tokens.capacity else None
+        return stats
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+_rate_limit_settings: Dict[str, Dict[str, Any]] = {}
+_rate_limiters: Dict[str, ProviderRateLimiter] = {}
+_response_listeners: Dict[str, Callable[[int, Mapping[str, str]], None]] = {}
+
+
+def configure_rate_limits(settings: Optional[Dict[str, Dict[str, Any]]]):
+    """Per-provider settings from the rate_limits section of config.json
+
+    A limiter is replaced only when its settings change, so building a
+    new client keeps the limits already learned from response headers.
+    """
+    _rate_limit_settings.update(settings or {})
+    for provider, limiter in list(_rate_limiters.items()):
+        merged = dict(DEFAULT_RATE_LIMIT_SETTINGS)
+        merged.update(_rate_limit_settings.get(provider) or {})
+        if merged != limiter.settings:
+            del _rate_limiters[provider]
+
+
+def get_rate_limiter(provider: str) -> ProviderRateLimiter:
+    """Process-wide limiter for a provider, shared by all its adapters"""
+    limiter = _rate_limiters.get(provider)
+    if limiter is None:
+        limiter = ProviderRateLimiter(provider, _rate_limit_settings.get(provider))
+        _rate_limiters[provider] = limiter
+    return limiter
+
+
+def rate_limit_listener(provider: str) -> Callable[[int, Mapping[str, str]], None]:
+    """Transport response listener feeding the provider's current limiter
+
+    One function per provider, so registering it again for every adapter
+    and client is a no-op, and a replaced limiter leaves nothing behind.
+    """
+    listener = _response_listeners.get(provider)
+    if listener is None:
+        def listener(status_code: int, headers: Mapping[str, str]):
+            get_rate_limiter(provider).observe(status_code, headers)
+        _response_listeners[provider] = listener
+    return listener
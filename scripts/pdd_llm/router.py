@@ -0,0 +1,380 @@
+"""
+Latency-Aware Provider Router
+Sends each request to the healthiest, fastest configured backend
+and fails over on timeouts, network errors, 429s and 5xx responses
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .deadline import DeadlineExceeded, remaining
+from .errors import is_retryable, is_timeout
+from .hedging import DEFAULT_HEDGING_SETTINGS, HedgePolicy
+from .metrics import METRICS
+from .providers import ProviderAdapter, create_adapter
+from .transport import SharedTransport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTING_SETTINGS = {
+    "enabled": False,
+    "providers": [],
+    "alpha": 0.3,
+    "max_error_rate": 0.5,
+    "error_half_life_seconds": 30.0,
+    "timeout_seconds": 60.0,
+    "max_attempts": 3
+}
+
+
+class BackendStats:
+    """EWMA of response latency and error rate for one provider/model
+
+    Latency is time to the first piece of output: the whole response for
+    plain completions, the first delta for streams. The error rate decays
+    with a half-life so a backend that stopped failing is retried.
+    """
+
+    def __init__(self, alpha: float = 0.3, error_half_life: float = 30.0, window: int = 1000):
+        self.alpha = alpha
+        self.error_half_life = error_half_life
+        self.latency: Optional[float] = None
+        self.samples = deque(maxlen=window)
+        self._error_rate = 0.0
+        self._error_updated = time.monotonic()
+        self.requests = 0
+        self.failures = 0
+
+    def error_rate(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        if self.error_half_life <= 0:
+            return self._error_rate
+        elapsed = now - self._error_updated
+        return self._error_rate * 0.5 ** (elapsed / self.error_half_life)
+
+    def _update_error(self, failed: bool):
+        now = time.monotonic()
+        self._error_rate = (1 - self.alpha) * self.error_rate(now) + (self.alpha if failed else 0.0)
+        self._error_updated = now
+
+    def _update_latency(self, seconds: float):
+        self.samples.append(seconds)
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency = (1 - self.alpha) * self.latency + self.alpha * seconds
+
+    def record_success(self, seconds: float):
+        self.requests += 1
+        self._update_latency(seconds)
+        self._update_error(False)
+
+    def record_failure(self, seconds: Optional[float] = None):
+        self.requests += 1
+        self.failures += 1
+        if seconds is not None:
+            self._update_latency(seconds)
+        self._update_error(True)
+
+    def record_censored(self, seconds: float):
+        """Latency lower bound for a call cancelled before it answered"""
+        self.samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate(), 4),
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+class Backend:
+    """A provider adapter together with its routing statistics"""
+
+    def __init__(self, adapter: ProviderAdapter, stats: BackendStats):
+        self.adapter = adapter
+        self.stats = stats
+
+    @property
+    def name(self) -> str:
+        return f"{self.adapter.provider}/{self.adapter.model}"
+
+
+class LLMRouter:
+    """Drop-in replacement for a single ProviderAdapter
+
+    Backends are ranked healthy-first (error rate below max_error_rate and
+    circuit not open), then by EWMA latency; backends without measurements
+    keep their configured order, primary first.
+    """
+
+    def __init__(self, adapters: List[ProviderAdapter], settings: Optional[Dict[str, Any]] = None,
+                 hedging: Optional[HedgePolicy] = None):
+        if not adapters:
+            raise ValueError("Router needs at least one backend")
+        self.settings = dict(DEFAULT_ROUTING_SETTINGS)
+        self.settings.update(settings or {})
+        self.hedging = hedging
+        self.backends = [
+            Backend(adapter, BackendStats(self.settings["alpha"], self.settings["error_half_life_seconds"]))
+            for adapter in adapters
+        ]
+        for adapter in adapters:
+            # The SDK gives up when the router does, rather than hold a connection to a backend it left
+            adapter.attempt_timeout = self.settings["timeout_seconds"]
+        self.provider = adapters[0].provider
+        self.model = adapters[0].model
+
+    @classmethod
+    def from_config(cls, primary: ProviderAdapter, config: Dict[str, Any],
+                    transport: Optional[SharedTransport] = None) -> "LLMRouter":
+        """Primary adapter plus every other provider in config.json with credentials"""
+        settings = dict(DEFAULT_ROUTING_SETTINGS)
+        settings.update(config.get("routing", {}))
+        providers = config.get("providers", {})
+        names = settings["providers"] or list(providers)
+
+        adapters = [primary]
+        for name in names:
+            provider_config = providers.get(name, {})
+            if name == primary.provider or not provider_config.get("api_key"):
+                continue
+            # The local server is only a fallback when listed explicitly
+            if name == "local" and not settings["providers"]:
+                continue
+            try:
+                adapters.append(create_adapter(
+                    name,
+                    provider_config["api_key"],
+                    provider_config.get("model"),
+                    base_url=provider_config.get("base_url"),
+                    api_version=provider_config.get("api_version"),
+                    transport=transport
+                ))
+            except (ImportError, ValueError) as e:
+                logger.warning("routing: skipping %s: %s", name, e)
+
+        hedging_settings = dict(DEFAULT_HEDGING_SETTINGS)
+        hedging_settings.update(config.get("hedging", {}))
+        hedging = HedgePolicy(hedging_settings) if hedging_settings["enabled"] else None
+        return cls(adapters, settings, hedging)
+
+    def ranked(self) -> List[Backend]:
+        """Backends in the order they should be tried"""
+        now = time.monotonic()
+        max_error_rate = self.settings["max_error_rate"]
+
+        def score(position: int) -> tuple:
+            backend = self.backends[position]
+            stats = backend.stats
+            unhealthy = stats.error_rate(now) >= max_error_rate or not backend.adapter.breaker.available()
+            if stats.latency is not None:
+                latency = stats.latency
+            else:
+                # Unmeasured: the primary goes first, fallbacks after measured backends
+                latency = -1.0 if position == 0 else float("inf")
+            return (unhealthy, latency, position)
+
+        return [self.backends[i] for i in sorted(range(len(self.backends)), key=score)]
+
+    def _attempts(self) -> List[Backend]:
+        backends = self.ranked()[:max(1, self.settings["max_attempts"])]
+        logger.info(
+            "routing: %s",
+            ", ".join(f"{b.name} {b.stats.snapshot()}" for b in backends)
+        )
+        return backends
+
+    def _failed(self, backend: Backend, started: float, exc: BaseException):
+        elapsed = time.monotonic() - started
+        # Fast failures say nothing about latency; timeouts do
+        backend.stats.record_failure(elapsed if is_timeout(exc) else None)
+        METRICS.retry(backend.adapter.provider, backend.adapter.model, "failover")
+        logger.warning("routing: %s failed after %.2fs (%s), failing over", backend.name, elapsed, exc)
+
+    def _attempt_timeout(self) -> Optional[float]:
+        """Per-backend timeout, unless the request deadline comes first and the adapter enforces that"""
+        left = remaining()
+        timeout = self.settings["timeout_seconds"]
+        return None if left is not None and left <= timeout else timeout
+
+    async def _attempt(self, backend: Backend, awaitable):
+        """Await one backend call under the per-backend timeout
+
+        wait_for cancels the adapter call on timeout, which releases its
+        circuit breaker without an outcome; a backend that hangs is down,
+        so the timeout is recorded on the breaker here.
+        """
+        timeout = self._attempt_timeout()
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError as e:
+            if (not isinstance(e, DeadlineExceeded) and timeout is not None
+                    and time.monotonic() - started >= timeout):
+                backend.adapter.breaker.record(e)
+            raise
+
+    async def _complete_on(self, backend: Backend, messages, max_tokens, temperature) -> str:
+        return await self._attempt(
+            backend,
+            backend.adapter.complete(messages, max_tokens=max_tokens, temperature=temperature)
+        )
+
+    async def _first_delta(self, backend: Backend, messages, max_tokens, temperature):
+        """Open a stream and wait for its first delta; returns (delta or None, stream)"""
+        stream = backend.adapter.stream(messages, max_tokens=max_tokens, temperature=temperature)
+        try:
+            first = await self._attempt(backend, stream.__anext__())
+        except StopAsyncIteration:
+            return None, stream
+        except BaseException:
+            await stream.aclose()
+            raise
+        return first, stream
+
+    async def _failover(self, backends: List[Backend], start, last_error: Optional[BaseException] = None):
+        """Try backends in order until one succeeds; returns (backend, result)"""
+        for backend in backends:
+            started = time.monotonic()
+            try:
+                result = await start(backend)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                self._failed(backend, started, e)
+                last_error = e
+                continue
+            backend.stats.record_success(time.monotonic() - started)
+            return backend, result
+        raise last_error
+
+    async def _race(self, backends: List[Backend], delay: float, start, discard=None):
+        """Start the primary; after delay (or its failure) start the secondary too
+
+        The first success wins and the other call is cancelled. If both
+        fail, the remaining backends are tried in order.
+        """
+        primary, secondary = backends[0], backends[1]
+        self.hedging.begin()
+        started: Dict[Backend, float] = {}
+        tasks: Dict[asyncio.Future, Backend] = {}
+        winner = None
+        hedged = False
+        primary_elapsed: Optional[float] = None
+        last_error: Optional[BaseException] = None
+
+        def launch(backend: Backend):
+            started[backend] = time.monotonic()
+            tasks[asyncio.ensure_future(start(backend))] = backend
+
+        launch(primary)
+        timeout: Optional[float] = delay
+        try:
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    timeout = None
+                    if self.hedging.try_acquire():
+                        hedged = True
+                        METRICS.retry(secondary.adapter.provider, secondary.adapter.model, "hedge")
+                        logger.info("hedging: %s slower than %.0fms, also sending to %s",
+                                    primary.name, delay * 1000, secondary.name)
+                        launch(secondary)
+                        pending = {task for task in tasks if not task.done()}
+                    continue
+
+                for task in done:
+                    backend = tasks[task]
+                    exc = task.exception()
+                    if exc is None:
+                        elapsed = time.monotonic() - started[backend]
+                        backend.stats.record_success(elapsed)
+                        if backend is primary:
+                            primary_elapsed = elapsed
+                        winner = task
+                        break
+                    if not is_retryable(exc):
+                        raise exc
+                    self._failed(backend, started[backend], exc)
+                    last_error = exc
+
+                if winner is None and secondary not in started:
+                    # The primary failed before the hedge delay: plain failover
+                    timeout = None
+                    launch(secondary)
+                    pending = {task for task in tasks if not task.done()}
+        finally:
+            for task, backend in tasks.items():
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                    if backend is primary:
+                        primary_elapsed = time.monotonic() - started[primary]
+                        primary.stats.record_censored(primary_elapsed)
+                    logger.info("hedging: cancelled %s", backend.name)
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+        if winner is None:
+            return await self._failover(backends[2:], start, last_error)
+
+        hedge_won = hedged and tasks[winner] is secondary
+        self.hedging.record(time.monotonic() - started[primary], primary_elapsed, hedge_won)
+        if hedge_won:
+            logger.info("hedging: %s answered first", secondary.name)
+        return tasks[winner], winner.result()
+
+    async def _dispatch(self, start, discard=None):
+        """Hedge between the top two backends when possible, otherwise fail over in order"""
+        backends = self._attempts()
+        if self.hedging is not None and len(backends) > 1:
+            delay = self.hedging.delay_for(backends[0].stats.samples)
+            if delay is not None:
+                return await self._race(backends, delay, start, discard)
+        return await self._failover(backends, start)
+
+    async def complete(self, messages: List[Dict[str, str]], max_tokens: int = 2000,
+                       temperature: float = 0.7) -> str:
+        async def start(backend: Backend) -> str:
+            return await self._complete_on(backend, messages, max_tokens, temperature)
+
+        backend, response = await self._dispatch(start)
+        logger.info("routing: served by %s", backend.name)
+        return response
+
+    async def stream(self, messages: List[Dict[str, str]], max_tokens: int = 2000,
+                     temperature: float = 0.7) -> AsyncIterator[str]:
+        """Failover and hedging are only possible until the first delta"""
+        async def start(backend: Backend):
+            return await self._first_delta(backend, messages, max_tokens, temperature)
+
+        async def discard(result):
+            await result[1].aclose()
+
+        backend, (first, stream) = await self._dispatch(start, discard)
+        logger.info("routing: streaming from %s", backend.name)
+        try:
+            if first is None:
+                return
+            yield first
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+
+    def status(self) -> Dict[str, Any]:
+        """Routing statistics per backend (and hedging), for logs and monitoring"""
+        status: Dict[str, Any] = {}
+        for backend in self.backends:
+            status[backend.name] = backend.stats.snapshot()
+            status[backend.name]["circuit"] = backend.adapter.breaker.state
+        if self.hedging is not None:
+            status["hedging"] = self.hedging.report()
+        return status
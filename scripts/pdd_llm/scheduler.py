@@ -0,0 +1,221 @@
+"""
+Global LLM Request Scheduler
+Bounded concurrency for provider calls, with priority lanes and
+deficit round-robin between sessions inside each lane
+"""
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from .deadline import DeadlineExceeded, within_deadline
+from .metrics import METRICS
+from .workers import partition_concurrency
+
+DEFAULT_SCHEDULER_SETTINGS = {
+    "enabled": True,
+    "max_concurrency": 16,
+    "lanes": ["interactive", "background"],
+    "quantum_tokens": 2000,
+    "aging_seconds": 30.0
+}
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+
+class _Waiter:
+    def __init__(self, session: str, cost: int, future: asyncio.Future):
+        self.session = session
+        self.cost = cost
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class _Lane:
+    """One priority lane: a FIFO per session, served by deficit round-robin on token cost
+
+    A session with many or large requests only gets its quantum per
+    round, so it cannot starve sessions with a single short message.
+    """
+
+    def __init__(self, name: str, quantum: int):
+        self.name = name
+        self.quantum = quantum
+        self.queues: Dict[str, Deque[_Waiter]] = {}
+        self.ring: Deque[str] = deque()
+        self.deficits: Dict[str, int] = {}
+        self.depth = 0
+
+    def push(self, waiter: _Waiter):
+        queue = self.queues.get(waiter.session)
+        if queue is None:
+            queue = self.queues[waiter.session] = deque()
+            self.ring.append(waiter.session)
+            self.deficits[waiter.session] = 0
+        queue.append(waiter)
+        self.depth += 1
+
+    def remove(self, waiter: _Waiter):
+        """Take out a request that gave up waiting (cancelled or out of time)"""
+        queue = self.queues.get(waiter.session)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.depth -= 1
+            if not queue:
+                self._drop_session(waiter.session)
+
+    def _drop_session(self, session: str):
+        self.ring.remove(session)
+        del self.queues[session]
+        del self.deficits[session]
+
+    def oldest(self) -> Optional[float]:
+        """Enqueue time of the longest-waiting live request"""
+        times = [queue[0].enqueued for queue in self.queues.values() if queue]
+        return min(times) if times else None
+
+    def pop(self) -> Optional[_Waiter]:
+        while self.ring:
+            session = self.ring[0]
+            queue = self.queues[session]
+            head = queue[0]
+            if self.deficits[session] >= head.cost:
+                self.deficits[session] -= head.cost
+                queue.popleft()
+                self.depth -= 1
+                if not queue:
+                    self._drop_session(session)
+                return head
+            self.deficits[session] += self.quantum
+            self.ring.rotate(-1)
+        return None
+
+
+class RequestScheduler:
+    """Admission control for every provider call made by the app
+
+    At most max_concurrency calls run at once across the deployment, so a
+    multi-worker chat app gives each worker its share. Free slots go to the
+    highest-priority lane with waiters, except that a lower lane whose
+    oldest request has waited aging_seconds is served first, so
+    background work is delayed but never starved.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(DEFAULT_SCHEDULER_SETTINGS)
+        self.settings.update(settings or {})
+        self.max_concurrency = partition_concurrency(int(self.settings["max_concurrency"]))
+        self.lanes = [_Lane(name, self.settings["quantum_tokens"]) for name in self.settings["lanes"]]
+        self._lanes_by_name = {lane.name: lane for lane in self.lanes}
+        self.active = 0
+        self.counters = {"granted": 0, "queued": 0, "cancelled": 0, "expired": 0, "wait_seconds": 0.0}
+
+    def _lane(self, name: str) -> _Lane:
+        lane = self._lanes_by_name.get(name)
+        if lane is None:
+            raise ValueError(f"Unknown scheduler lane: {name}")
+        return lane
+
+    def _next(self) -> Optional[_Waiter]:
+        now = time.monotonic()
+        for lane in self.lanes[1:]:
+            oldest = lane.oldest()
+            if oldest is not None and now - oldest >= self.settings["aging_seconds"]:
+                waiter = lane.pop()
+                if waiter is not None:
+                    return waiter
+        for lane in self.lanes:
+            waiter = lane.pop()
+            if waiter is not None:
+                return waiter
+        return None
+
+    def _dispatch(self):
+        while self.active < self.max_concurrency:
+            waiter = self._next()
+            if waiter is None:
+                return
+            self.active += 1
+            waiter.future.set_result(None)
+
+    async def acquire(self, session: str = "", lane: str = INTERACTIVE, cost: int = 1):
+        """Wait for a slot, at most until the request deadline; every acquire must be paired with release()"""
+        target = self._lane(lane)
+        started = time.monotonic()
+        if self.active < self.max_concurrency and not any(l.depth for l in self.lanes):
+            self.active += 1
+        else:
+            waiter = _Waiter(session, max(1, cost), asyncio.get_running_loop().create_future())
+            target.push(waiter)
+            self.counters["queued"] += 1
+            try:
+                await within_deadline(waiter.future)
+            except DeadlineExceeded:
+                target.remove(waiter)
+                self.counters["expired"] += 1
+                raise
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Granted and cancelled in the same tick: hand the slot on
+                    self.release()
+                else:
+                    target.remove(waiter)
+                self.counters["cancelled"] += 1
+                raise
+        waited = time.monotonic() - started
+        self.counters["granted"] += 1
+        self.counters["wait_seconds"] += waited
+        METRICS.scheduled(lane, waited)
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, session: str = "", lane: str = INTERACTIVE, cost: int = 1) -> AsyncIterator[None]:
+        await self.acquire(session, lane, cost)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.counters)
+        stats["active"] = self.active
+        stats["queue_depth"] = {lane.name: lane.depth for lane in self.lanes}
+        return stats
+
+    def gauges(self) -> List[str]:
+        lines = ["# HELP llm_scheduler_active Provider calls currently holding a scheduler slot",
+                 "# TYPE llm_scheduler_active gauge",
+                 f"llm_scheduler_active {self.active}",
+                 "# HELP llm_scheduler_queue_depth Requests waiting for a scheduler slot",
+                 "# TYPE llm_scheduler_queue_depth gauge"]
+        lines += [f'llm_scheduler_queue_depth{{lane="{lane.name}"}} {lane.depth}' for lane in self.lanes]
+        return lines
+
+
+_scheduler: Optional[RequestScheduler] = None
+
+
+def configure_scheduler(settings: Optional[Dict[str, Any]]) -> Optional[RequestScheduler]:
+    """Process-wide scheduler from the scheduler section of config.json; None when disabled"""
+    global _scheduler
+    merged = dict(DEFAULT_SCHEDULER_SETTINGS)
+    merged.update(settings or {})
+    if not merged["enabled"]:
+        _scheduler = None
+    elif _scheduler is None or _scheduler.settings != merged:
+        # Requests already holding a slot release it on the scheduler they came from
+        _scheduler = RequestScheduler(merged)
+    return _scheduler
+
+
+def get_scheduler() -> Optional[RequestScheduler]:
+    return _scheduler
+
+
+METRICS.add_collector(lambda: _scheduler.gauges() if _scheduler is not None else [])
@@ -0,0 +1,187 @@
+"""
+Semantic Response Cache
+Answers near-identical prompts from a float16 embedding matrix
+with one vectorised cosine-similarity pass per lookup
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, List, Optional
+
+from .cache import make_cache_key
+from .startup import lazy_import
+
+DEFAULT_SEMANTIC_SETTINGS = {
+    "enabled": False,
+    "threshold": 0.92,
+    "max_entries": 2048,
+    "embedder": "hashing",
+    "dim": 512,
+    "embedding_model": "text-embedding-3-small"
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _numpy():
+    """NumPy, imported when a semantic cache or embedder is first used"""
+    np = lazy_import("numpy")
+    if np is None:
+        raise ImportError("numpy package not installed. Run: pip install numpy")
+    return np
+
+
+class HashingEmbedder:
+    """Offline stand-in embedder: hashed word and character trigram features
+
+    Deterministic and dependency-free apart from NumPy, so the semantic
+    cache can be exercised without network access. Rewordings that share
+    most words and trigrams land close together.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> int:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.dim
+
+    async def embed(self, text: str):
+        np = _numpy()
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = _TOKEN_PATTERN.findall(text.lower())
+        for word in words:
+            vector[self._bucket("w:" + word)] += 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                vector[self._bucket("c:" + padded[i:i + 3])] += 0.5
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class OpenAIEmbedder:
+    """Embeddings from an OpenAI-compatible SDK client"""
+
+    def __init__(self, client, model: str = "text-embedding-3-small"):
+        self.client = client
+        self.model = model
+
+    async def embed(self, text: str):
+        np = _numpy()
+        response = await self.client.embeddings.create(model=self.model, input=text)
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Fixed-capacity embedding matrix with LRU replacement
+
+    Only the final user message is embedded. Everything before it
+    (system prompt, earlier turns) plus provider, model and sampling
+    params forms a namespace that must match exactly, so a semantic hit
+    never crosses conversations or configurations.
+    """
+
+    def __init__(self, embedder, threshold: float = 0.92, max_entries: int = 2048):
+        np = _numpy()
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.vectors = None
+        self.namespaces = np.full(max_entries, -1, dtype=np.int64)
+        self.last_used = np.zeros(max_entries, dtype=np.int64)
+        self.values: List[Optional[str]] = [None] * max_entries
+        self.size = 0
+        self._namespace_ids: Dict[str, int] = {}
+        self._clock = 0
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "writes": 0}
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]] = None, client=None) -> "SemanticCache":
+        """Build a cache from the semantic_cache section of config.json"""
+        merged = dict(DEFAULT_SEMANTIC_SETTINGS)
+        merged.update(settings or {})
+        if merged["embedder"] == "openai" and client is not None:
+            embedder = OpenAIEmbedder(client, merged["embedding_model"])
+        else:
+            embedder = HashingEmbedder(merged["dim"])
+        return cls(embedder, threshold=merged["threshold"], max_entries=merged["max_entries"])
+
+    @staticmethod
+    def split_query(messages: List[Dict[str, str]]):
+        """Separate the final user message from the context that precedes it"""
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index].get("role") == "user":
+                return messages[:index], str(messages[index].get("content", ""))
+        return messages, ""
+
+    def _namespace_id(self, namespace: str) -> int:
+        if namespace not in self._namespace_ids:
+            if len(self._namespace_ids) >= 4 * self.max_entries:
+                self._compact_namespaces()
+            self._namespace_ids[namespace] = max(self._namespace_ids.values(), default=-1) + 1
+        return self._namespace_ids[namespace]
+
+    def _compact_namespaces(self):
+        """Forget namespaces whose entries have all been evicted"""
+        live = set(self.namespaces[:self.size].tolist())
+        self._namespace_ids = {name: ns for name, ns in self._namespace_ids.items() if ns in live}
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    async def lookup(self, provider: str, model: str, messages: List[Dict[str, str]],
+                     params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Return the stored answer for the most similar prompt above threshold"""
+        context, query = self.split_query(messages)
+        namespace = self._namespace_ids.get(make_cache_key(provider, model, context, params))
+        if not query or namespace is None or self.size == 0:
+            self.counters["misses"] += 1
+            return None
+
+        np = _numpy()
+        vector = (await self.embedder.embed(query)).astype(np.float32)
+        similarities = np.matmul(self.vectors[:self.size], vector, dtype=np.float32)
+        similarities[self.namespaces[:self.size] != namespace] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.counters["misses"] += 1
+            return None
+
+        self.last_used[best] = self._tick()
+        self.counters["hits"] += 1
+        return self.values[best]
+
+    async def store(self, provider: str, model: str, messages: List[Dict[str, str]],
+                    response: str, params: Optional[Dict[str, Any]] = None):
+        """Add a prompt/answer pair, replacing the least recently used slot when full"""
+        context, query = self.split_query(messages)
+        if not query:
+            return
+        np = _numpy()
+        vector = await self.embedder.embed(query)
+        if self.vectors is None:
+            self.vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float16)
+
+        if self.size < self.max_entries:
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(np.argmin(self.last_used))
+            self.counters["evictions"] += 1
+
+        self.vectors[slot] = vector.astype(np.float16)
+        self.namespaces[slot] = self._namespace_id(make_cache_key(provider, model, context, params))
+        self.values[slot] = response
+        self.last_used[slot] = self._tick()
+        self.counters["writes"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        stats = dict(self.counters)
+        stats["entries"] = self.size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
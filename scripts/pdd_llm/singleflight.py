@@ -0,0 +1,122 @@
+"""
+Single-Flight Request Coalescing
+Identical in-flight requests share one upstream call; streams are
+fanned out to every subscriber, late joiners replay what they missed
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class _Flight:
+    """One upstream call and the number of callers waiting on it"""
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """One upstream stream pumped into a shared buffer"""
+
+    def __init__(self, source: AsyncIterator[str]):
+        self.buffer: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator[str]):
+        try:
+            async for delta in source:
+                self.buffer.append(delta)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            await source.aclose()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            if index < len(self.buffer):
+                yield self.buffer[index]
+                index += 1
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key
+
+    The upstream call runs as its own task, so one caller going away
+    does not cancel it for the others; it is only cancelled when every
+    caller has gone, and a stream's last subscriber waits for that.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.counters = {"upstream_calls": 0, "coalesced": 0}
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call() once per key, sharing the result with concurrent callers"""
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+            self.counters["upstream_calls"] += 1
+        else:
+            self.counters["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Iterate one upstream stream per key, fanned out to every subscriber"""
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight(open_stream())
+            self._streams[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(self._streams, key, flight))
+            self.counters["upstream_calls"] += 1
+        else:
+            self.counters["coalesced"] += 1
+
+        flight.subscribers += 1
+        try:
+            async for delta in flight.subscribe():
+                yield delta
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.task.done():
+                flight.task.cancel()
+                # Let the upstream close its stream and free its slot before returning
+                await asyncio.wait({flight.task})
+
+    @staticmethod
+    def _forget(flights: Dict[str, Any], key: str, flight: Any):
+        if flights.get(key) is flight:
+            del flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        stats = dict(self.counters)
+        stats["in_flight"] = len(self._calls) + len(self._streams)
+        return stats
@@ -0,0 +1,56 @@
+"""
+Startup Import Timing
+Records how long heavy imports take so cold-start regressions show up in the logs
+"""
+
+import contextlib
+import importlib
+import logging
+import time
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Import name -> seconds, in the order the imports happened
+IMPORT_TIMES: Dict[str, float] = {}
+
+_modules: Dict[str, Any] = {}
+
+
+def record_import(name: str, seconds: float):
+    IMPORT_TIMES[name] = IMPORT_TIMES.get(name, 0.0) + seconds
+
+
+@contextlib.contextmanager
+def timed_import(name: str) -> Iterator[None]:
+    """Time the import statements in the block under name"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_import(name, time.perf_counter() - started)
+
+
+def lazy_import(module_name: str) -> Optional[Any]:
+    """Import a module on first use and time it; None when it is not installed"""
+    if module_name not in _modules:
+        with timed_import(module_name):
+            try:
+                _modules[module_name] = importlib.import_module(module_name)
+            except ImportError:
+                _modules[module_name] = None
+    return _modules[module_name]
+
+
+def startup_report(total_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """Log and return the import times recorded so far"""
+    imports = {name: round(seconds * 1000, 1) for name, seconds in IMPORT_TIMES.items()}
+    report: Dict[str, Any] = {"imports_ms": imports}
+    if total_seconds is not None:
+        report["total_ms"] = round(total_seconds * 1000, 1)
+    logger.info(
+        "startup: %s; imports: %s",
+        f"{report['total_ms']:.0f}ms" if total_seconds is not None else "n/a",
+        ", ".join(f"{name} {ms:.0f}ms" for name, ms in sorted(imports.items(), key=lambda item: -item[1])) or "none"
+    )
+    return report
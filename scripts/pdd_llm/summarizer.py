@@ -0,0 +1,49 @@
+"""
+Conversation Summarizer
+Folds older chat turns into a compact running summary with a cheap model
+"""
+
+from typing import Dict, List, Optional
+
+from .memory import count_tokens
+from .providers import ProviderAdapter
+from .scheduler import BACKGROUND, RequestScheduler
+
+DEFAULT_SUMMARY_SETTINGS = {
+    "enabled": True,
+    "provider": None,
+    "model": None,
+    "trigger_ratio": 0.75,
+    "keep_recent_turns": 4,
+    "max_summary_tokens": 300
+}
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain the running summary of a Prompt-Driven Development chat. "
+    "Merge the new turns into the existing summary. Keep requirements, decisions, "
+    "file and function names, the current PDD stage and open questions; drop "
+    "pleasantries and anything superseded. Reply with the updated summary only."
+)
+
+
+class ConversationSummarizer:
+    """Produces an updated summary from the previous one plus new turns"""
+
+    def __init__(self, adapter: ProviderAdapter, max_summary_tokens: int = 300,
+                 scheduler: Optional[RequestScheduler] = None):
+        self.adapter = adapter
+        self.max_summary_tokens = max_summary_tokens
+        self.scheduler = scheduler
+
+    async def summarize(self, previous: Optional[str], turns: List[Dict[str, str]]) -> str:
+        transcript = "\n\n".join(f"{turn['role'].title()}: {turn['content']}" for turn in turns)
+        prompt = f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"
+        messages = [
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": prompt}
+        ]
+        if self.scheduler is None:
+            return await self.adapter.complete(messages, max_tokens=self.max_summary_tokens, temperature=0)
+        # Summaries are never on a user's critical path, so they queue behind chat turns
+        async with self.scheduler.slot("summarizer", BACKGROUND, count_tokens(prompt, self.adapter.model)):
+            return await self.adapter.complete(messages, max_tokens=self.max_summary_tokens, temperature=0)
@@ -0,0 +1,123 @@
+"""
+Shared HTTP Transport for LLM Provider Clients
+Long-lived, pooled httpx clients with keep-alive and per-host connection limits
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Mapping, Optional
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    http2_available = True
+except ImportError:
+    http2_available = False
+
+logger = logging.getLogger(__name__)
+
+ResponseListener = Callable[[int, Mapping[str, str]], None]
+
+DEFAULT_HTTP_SETTINGS = {
+    "max_connections_per_host": 20,
+    "max_keepalive_per_host": 10,
+    "keepalive_expiry": 30.0,
+    "connect_timeout": 10.0,
+    "read_timeout": 120.0,
+    "http2": True
+}
+
+
+class SharedTransport:
+    """One pooled httpx.AsyncClient per host, shared by every provider adapter
+
+    Keeping a client per host gives each backend its own connection limit
+    while DNS lookups and TLS sessions are reused across requests. The pools
+    belong to the event loop that first used them.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(DEFAULT_HTTP_SETTINGS)
+        self.settings.update(settings or {})
+        self._clients: Dict[str, Any] = {}
+        self._listeners: Dict[str, List[ResponseListener]] = {}
+
+    @staticmethod
+    def host_key(base_url: Optional[str]) -> str:
+        """Normalise a base URL to scheme://host:port"""
+        if not base_url:
+            return "default"
+        parts = urlsplit(base_url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        return f"{parts.scheme}://{parts.hostname}:{port}"
+
+    def add_response_listener(self, base_url: Optional[str], listener: ResponseListener):
+        """Call listener(status_code, headers) for every response from this host"""
+        listeners = self._listeners.setdefault(self.host_key(base_url), [])
+        if listener not in listeners:
+            listeners.append(listener)
+
+    def _response_hook(self, key: str):
+        async def hook(response):
+            for listener in self._listeners.get(key, ()):
+                try:
+                    listener(response.status_code, response.headers)
+                except Exception as e:
+                    logger.warning("transport: response listener failed: %s", e)
+        return hook
+
+    def client_for(self, base_url: Optional[str] = None):
+        """Return the pooled client for a host, creating it on first use"""
+        if httpx is None:
+            raise ImportError("httpx package not installed. Run: pip install httpx")
+
+        key = self.host_key(base_url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.settings["max_connections_per_host"],
+                max_keepalive_connections=self.settings["max_keepalive_per_host"],
+                keepalive_expiry=self.settings["keepalive_expiry"]
+            )
+            timeout = httpx.Timeout(
+                self.settings["read_timeout"],
+                connect=self.settings["connect_timeout"]
+            )
+            client = httpx.AsyncClient(
+                limits=limits,
+                timeout=timeout,
+                http2=bool(self.settings["http2"]) and http2_available,
+                event_hooks={"response": [self._response_hook(key)]}
+            )
+            self._clients[key] = client
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """Pooled hosts and whether HTTP/2 is in use"""
+        return {
+            "hosts": sorted(self._clients),
+            "http2": bool(self.settings["http2"]) and http2_available
+        }
+
+    async def aclose(self):
+        """Close every pooled connection"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            if not client.is_closed:
+                await client.aclose()
+
+
+_shared_transport: Optional[SharedTransport] = None
+
+
+def get_transport(settings: Optional[Dict[str, Any]] = None) -> SharedTransport:
+    """Process-wide transport; settings only apply on first call"""
+    global _shared_transport
+    if _shared_transport is None:
+        _shared_transport = SharedTransport(settings)
+    return _shared_transport
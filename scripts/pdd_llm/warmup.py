@@ -0,0 +1,132 @@
+"""
+Connection Pre-Warming
+Builds the provider clients, loads tokenizers and opens pooled connections
+when the chat app starts, so the first user after a deploy does not pay for them
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from .client import UniversalLLMClient
+from .health import HEALTH
+from .memory import get_encoding
+from .providers import ProviderAdapter
+from .router import LLMRouter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARMUP_SETTINGS = {
+    "enabled": True,
+    "connections_per_host": 2,
+    "timeout_seconds": 15.0
+}
+
+
+def client_adapters(client: UniversalLLMClient) -> List[ProviderAdapter]:
+    """Every adapter the client may call: the primary, routed backends and the summarizer"""
+    primary = client.client
+    adapters = [backend.adapter for backend in primary.backends] if isinstance(primary, LLMRouter) else [primary]
+    summarizer = client.summarizer
+    if summarizer is not None:
+        adapters.append(summarizer.adapter)
+
+    unique: Dict[Any, ProviderAdapter] = {}
+    for adapter in adapters:
+        unique.setdefault((adapter.provider, adapter.model, adapter.host_url), adapter)
+    return list(unique.values())
+
+
+async def warm_up(client: UniversalLLMClient, settings: Optional[Dict[str, Any]] = None,
+                  system_prompt: Optional[str] = None) -> Dict[str, Any]:
+    """Instantiate every adapter, load its tokenizer and open its connections; never raises
+
+    Returns milliseconds per step and adapter, plus any errors, which
+    are logged and otherwise ignored: a provider that is down at startup
+    is the circuit breaker's business, not a reason to stay unready.
+    """
+    merged = dict(DEFAULT_WARMUP_SETTINGS)
+    merged.update(settings or {})
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"adapters_ms": {}, "errors": {}}
+
+    try:
+        adapters = client_adapters(client)
+    except Exception as e:
+        # e.g. no API key: the first request reports it to the user
+        report["errors"]["client"] = str(e)
+        adapters = []
+    report["models_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    step = time.perf_counter()
+    models = sorted({adapter.model or "" for adapter in adapters} | {client.model or ""})
+    # tiktoken may download its BPE file on first load
+    await asyncio.get_running_loop().run_in_executor(None, lambda: [get_encoding(model) for model in models])
+    report["tokenizers_ms"] = round((time.perf_counter() - step) * 1000, 1)
+
+    async def warm(adapter: ProviderAdapter):
+        name = f"{adapter.provider}/{adapter.model}"
+        adapter_started = time.perf_counter()
+        try:
+            await asyncio.wait_for(adapter.warm_up(merged["connections_per_host"], system_prompt),
+                                   merged["timeout_seconds"])
+        except Exception as e:
+            report["errors"][name] = str(e) or type(e).__name__
+            return
+        report["adapters_ms"][name] = round((time.perf_counter() - adapter_started) * 1000, 1)
+
+    await asyncio.gather(*(warm(adapter) for adapter in adapters))
+    report["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    logger.info("warm-up: %.0fms (%s)%s", report["total_ms"],
+                ", ".join(f"{name} {ms:.0f}ms" for name, ms in report["adapters_ms"].items()) or "no adapters",
+                "; failed: " + ", ".join(f"{name}: {error}" for name, error in report["errors"].items())
+                if report["errors"] else "")
+    return report
+
+
+def install_warmup(app: Any, client: UniversalLLMClient, system_prompt: Optional[str] = None,
+                   settings: Optional[Dict[str, Any]] = None):
+    """Warm up from the app's (the Chainlit server's) lifespan, then mark the worker ready
+
+    Pooled connections belong to the event loop that opened them, so
+    warm-up runs in the server's loop once it starts rather than when
+    the chat app module is imported. The server accepts connections
+    meanwhile; only the health route keeps answering 503.
+    """
+    merged = dict(DEFAULT_WARMUP_SETTINGS)
+    merged.update(settings or {})
+    lifespan = getattr(app.router, "lifespan_context", None)
+    if not merged["enabled"] or lifespan is None:
+        HEALTH.mark_ready()
+        return
+
+    async def warm_then_ready():
+        HEALTH.mark_warming()
+        try:
+            report = await warm_up(client, merged, system_prompt)
+        except Exception as e:
+            logger.warning("warm-up failed: %s", e)
+            report = {"errors": {"warmup": str(e)}}
+        HEALTH.mark_ready(report)
+
+    @contextlib.asynccontextmanager
+    async def lifespan_with_warmup(server_app):
+        async with lifespan(server_app) as state:
+            task = asyncio.ensure_future(warm_then_ready())
+            try:
+                yield state
+            finally:
+                task.cancel()
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        # Imported again inside the running server (chainlit -w reload): no lifespan to wait for
+        loop.create_task(warm_then_ready())
+        return
+    app.router.lifespan_context = lifespan_with_warmup
@@ -0,0 +1,530 @@
+"""
+Multi-Worker Chat Deployment
+Runs several chat app processes behind a small sticky load balancer, with
+health checks, crash restarts and draining rolling restarts
+"""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKER_SETTINGS = {
+    "count": 1,
+    "base_port": 8101,
+    "health_path": "/healthz",
+    "health_interval_seconds": 2.0,
+    "max_failed_checks": 3,
+    "startup_timeout_seconds": 60.0,
+    "drain_timeout_seconds": 60.0,
+    "reload_on_change": ["chainlit_app.py", "scripts/pdd_chat", "scripts/pdd_llm"],
+    "log_dir": ".cache/workers",
+    "sticky_cookie": "pdd_worker"
+}
+
+# Set by the supervisor in each worker's environment
+WORKER_INDEX_ENV = "PDD_WORKER_INDEX"
+WORKER_COUNT_ENV = "PDD_WORKER_COUNT"
+
+MAX_HEAD_BYTES = 64 * 1024
+PIPE_CHUNK = 64 * 1024
+
+# Spawning and binding the balancer on top of the workers' own startup timeout
+STARTUP_GRACE_SECONDS = 15.0
+
+
+class WorkerPoolError(RuntimeError):
+    """The pool could not start: a spawn failed, the balancer port was taken, or it timed out"""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def worker_index() -> int:
+    """This process's slot in the pool, 0 when not run by the supervisor"""
+    return _env_int(WORKER_INDEX_ENV, 0)
+
+
+def worker_count() -> int:
+    """Processes sharing the deployment-wide limits, 1 when not run by the supervisor"""
+    return max(1, _env_int(WORKER_COUNT_ENV, 1))
+
+
+def partition_concurrency(limit: int) -> int:
+    """This worker's share of a deployment-wide concurrency limit, at least 1"""
+    return max(1, math.ceil(limit / worker_count()))
+
+
+def resolve_worker_count(settings: Optional[Dict[str, Any]]) -> int:
+    """Configured worker count; 0 means one per CPU core"""
+    count = int((settings or {}).get("count", DEFAULT_WORKER_SETTINGS["count"]) or 0)
+    return count if count > 0 else (os.cpu_count() or 1)
+
+
+class Worker:
+    """One chat app process on its own loopback port"""
+
+    def __init__(self, index: int, port: int):
+        self.index = index
+        self.port = port
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.spawned_at = 0.0
+        self.healthy = False
+        self.was_ready = False
+        self.draining = False
+        self.restarting = False
+        self.failed_checks = 0
+        self.connections = 0
+        self.restarts = 0
+        self.health: Dict[str, Any] = {}
+
+    @property
+    def routable(self) -> bool:
+        """Accepts new sessions"""
+        return self.healthy and not self.draining
+
+    @property
+    def in_flight(self) -> int:
+        return int(self.health.get("in_flight", 0))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "connections": self.connections,
+            "in_flight": self.in_flight,
+            "restarts": self.restarts
+        }
+
+
+def _is_loopback(peer: Any) -> bool:
+    try:
+        return ipaddress.ip_address(peer[0]).is_loopback
+    except (TypeError, ValueError, IndexError):
+        return False
+
+
+def _simple_response(status: int, reason: str, body: Dict[str, Any], extra: str = "") -> bytes:
+    payload = json.dumps(body).encode()
+    return (f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n{extra}\r\n").encode() + payload
+
+
+class StickyBalancer:
+    """TCP-level HTTP/WebSocket proxy that pins each browser to one worker
+
+    Only the head of the first request on a connection is parsed: a
+    sticky cookie names the worker, and browsers without one go to the
+    routable worker with the fewest open connections (round-robin among
+    ties) and get the cookie on the first response. Everything after that is piped as raw bytes,
+    so keep-alive and WebSocket upgrades pass through untouched. A
+    draining worker keeps the sessions already pinned to it but gets no
+    new ones.
+    """
+
+    def __init__(self, workers: List[Worker], cookie: str = "pdd_worker", admin=None):
+        self.workers = workers
+        self.cookie = cookie
+        self.admin = admin
+        self._cookie_pattern = re.compile(rf"(?:^|;)\s*{re.escape(cookie)}=(\d+)")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._turn = 0
+        self.counters = {"connections": 0, "rejected": 0, "repinned": 0}
+
+    async def start(self, host: str, port: int):
+        self._server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEAD_BYTES)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def choose(self, pinned: Optional[int]) -> Tuple[Optional[Worker], bool]:
+        """(worker, whether to set the cookie) for a new connection"""
+        if pinned is not None and 0 <= pinned < len(self.workers) and self.workers[pinned].healthy:
+            return self.workers[pinned], False
+        if pinned is not None:
+            # Its worker is gone or restarting: the session starts over elsewhere
+            self.counters["repinned"] += 1
+        candidates = [worker for worker in self.workers if worker.routable]
+        if not candidates:
+            return None, False
+        count = len(self.workers)
+        worker = min(candidates, key=lambda worker: (worker.connections, (worker.index - self._turn) % count))
+        self._turn = worker.index + 1
+        return worker, True
+
+    def _pinned(self, head: bytes) -> Optional[int]:
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"cookie":
+                match = self._cookie_pattern.search(value.decode("latin-1"))
+                if match:
+                    return int(match.group(1))
+        return None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.counters["connections"] += 1
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        request_line = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ")
+        method, target = (request_line + ["", ""])[:2]
+
+        if target.startswith("/_pdd/") and self.admin is not None:
+            if _is_loopback(writer.get_extra_info("peername")):
+                status, body = await self.admin(method, target)
+                writer.write(_simple_response(status, "OK" if status < 400 else "Error", body))
+            else:
+                writer.write(_simple_response(403, "Forbidden", {"error": "admin endpoints are loopback only"}))
+            await self._close(writer)
+            return
+
+        pinned = self._pinned(head)
+        for _ in range(len(self.workers)):
+            worker, set_cookie = self.choose(pinned)
+            if worker is None:
+                break
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection(
+                    "127.0.0.1", worker.port, limit=MAX_HEAD_BYTES)
+            except OSError:
+                logger.warning("workers: worker %d refused a connection", worker.index)
+                worker.healthy = False
+                pinned = None
+                continue
+            await self._proxy(worker, head, set_cookie, reader, writer, upstream_reader, upstream_writer)
+            return
+
+        self.counters["rejected"] += 1
+        writer.write(_simple_response(503, "Service Unavailable", {"error": "no chat worker is ready"},
+                                      "Retry-After: 2\r\n"))
+        await self._close(writer)
+
+    async def _proxy(self, worker: Worker, head: bytes, set_cookie: bool,
+                     reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                     upstream_reader: asyncio.StreamReader, upstream_writer: asyncio.StreamWriter):
+        worker.connections += 1
+        try:
+            upstream_writer.write(head)
+            if set_cookie:
+                try:
+                    response_head = await upstream_reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                status_line, _, rest = response_head.partition(b"\r\n")
+                cookie = f"Set-Cookie: {self.cookie}={worker.index}; Path=/; HttpOnly; SameSite=Lax\r\n"
+                writer.write(status_line + b"\r\n" + cookie.encode() + rest)
+            await asyncio.gather(self._pipe(reader, upstream_writer), self._pipe(upstream_reader, writer))
+        finally:
+            worker.connections -= 1
+            await self._close(upstream_writer)
+            await self._close(writer)
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                data = await reader.read(PIPE_CHUNK)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except OSError:
+            # The other side went away; closing this one ends the opposite pipe too
+            writer.close()
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+class WorkerPool:
+    """Supervises count chat workers and the balancer in front of them
+
+    Workers listen on base_port + index on the loopback interface. The
+    supervisor polls each worker's health route, restarts crashed or
+    hung workers, and on rolling_restart() (or when watched code
+    changes; config.json and .env are reloaded by the app itself)
+    replaces the workers one at a time: stop routing new
+    sessions to it, wait for its in-flight requests, restart it, and
+    wait until it is ready again before moving on.
+
+    Each worker gets WORKER_INDEX_ENV and WORKER_COUNT_ENV, which the
+    rate limiters and scheduler use to take their share of the
+    configured deployment-wide limits.
+    """
+
+    def __init__(self, command: List[str], settings: Optional[Dict[str, Any]] = None,
+                 host: str = "0.0.0.0", port: int = 8001):
+        self.settings = dict(DEFAULT_WORKER_SETTINGS)
+        self.settings.update(settings or {})
+        self.command = command
+        self.host = host
+        self.port = port
+        count = resolve_worker_count(self.settings)
+        self.workers = [Worker(index, self.settings["base_port"] + index) for index in range(count)]
+        self.balancer = StickyBalancer(self.workers, self.settings["sticky_cookie"], admin=self.admin)
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._stop_requested = False
+        self._restart_lock: Optional[asyncio.Lock] = None
+        self._mtimes: Dict[str, float] = {}
+
+    # Process management
+
+    async def spawn(self, worker: Worker):
+        log_dir = Path(self.settings["log_dir"])
+        log_dir.mkdir(parents=True, exist_ok=True)
+        env = dict(os.environ)
+        env.update({WORKER_INDEX_ENV: str(worker.index), WORKER_COUNT_ENV: str(len(self.workers))})
+        with open(log_dir / f"worker-{worker.index}.log", "ab") as log:
+            worker.process = await asyncio.create_subprocess_exec(
+                *[part.format(port=worker.port) for part in self.command],
+                stdout=log, stderr=asyncio.subprocess.STDOUT, env=env
+            )
+        worker.spawned_at = time.monotonic()
+        worker.healthy = False
+        worker.was_ready = False
+        worker.failed_checks = 0
+        worker.health = {}
+        logger.info("workers: worker %d started on port %d (pid %d)", worker.index, worker.port, worker.process.pid)
+
+    async def terminate(self, worker: Worker, timeout: float = 10.0):
+        worker.healthy = False
+        process = worker.process
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    # Health
+
+    async def check(self, worker: Worker) -> bool:
+        """GET the worker's health route; healthy means it answered 200"""
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", worker.port), 2.0)
+        except (OSError, asyncio.TimeoutError):
+            return self._failed(worker)
+        try:
+            writer.write(f"GET {self.settings['health_path']} HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                         f"Connection: close\r\n\r\n".encode())
+            response = await asyncio.wait_for(reader.read(), 5.0)
+        except (OSError, asyncio.TimeoutError):
+            return self._failed(worker)
+        finally:
+            writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        try:
+            worker.health = json.loads(body or b"{}")
+        except ValueError:
+            worker.health = {}
+        if not head.startswith((b"HTTP/1.1 200", b"HTTP/1.0 200")):
+            return self._failed(worker)
+        worker.failed_checks = 0
+        worker.healthy = worker.was_ready = True
+        return True
+
+    def _failed(self, worker: Worker) -> bool:
+        worker.failed_checks += 1
+        if not worker.was_ready or worker.failed_checks >= self.settings["max_failed_checks"]:
+            worker.healthy = False
+        return False
+
+    async def wait_ready(self, worker: Worker) -> bool:
+        deadline = time.monotonic() + self.settings["startup_timeout_seconds"]
+        while time.monotonic() < deadline:
+            if worker.process is not None and worker.process.returncode is not None:
+                return False
+            if await self.check(worker):
+                return True
+            await asyncio.sleep(0.5)
+        return False
+
+    # Restarts
+
+    async def drain(self, worker: Worker):
+        """Route no new sessions to worker and wait for its in-flight requests"""
+        worker.draining = True
+        deadline = time.monotonic() + self.settings["drain_timeout_seconds"]
+        while time.monotonic() < deadline:
+            if not await self.check(worker) and not worker.healthy:
+                return
+            if worker.in_flight == 0:
+                return
+            await asyncio.sleep(0.5)
+        logger.warning("workers: worker %d still had %d requests after %.0fs, restarting anyway",
+                       worker.index, worker.in_flight, self.settings["drain_timeout_seconds"])
+
+    async def restart(self, worker: Worker, drain: bool = True) -> bool:
+        worker.restarting = True
+        try:
+            if drain:
+                await self.drain(worker)
+            await self.terminate(worker)
+            worker.restarts += 1
+            await self.spawn(worker)
+            return await self.wait_ready(worker)
+        finally:
+            worker.draining = False
+            worker.restarting = False
+
+    async def rolling_restart(self) -> bool:
+        """Restart every worker in turn; False if one did not come back"""
+        if self._restart_lock.locked():
+            return True
+        async with self._restart_lock:
+            logger.info("workers: rolling restart of %d workers", len(self.workers))
+            for worker in self.workers:
+                if not await self.restart(worker):
+                    # Keep the rest serving rather than take them down too
+                    logger.error("workers: worker %d is not ready after restart; stopping the rolling restart",
+                                 worker.index)
+                    return False
+            self._mtimes = self._watched_mtimes()
+            return True
+
+    def _watched_mtimes(self) -> Dict[str, float]:
+        """Modification time per watched file; the newest .py file for a directory"""
+        mtimes = {}
+        for name in self.settings["reload_on_change"] or []:
+            path = Path(name)
+            try:
+                if path.is_dir():
+                    mtimes[name] = max((source.stat().st_mtime for source in path.rglob("*.py")), default=0.0)
+                else:
+                    mtimes[name] = path.stat().st_mtime
+            except OSError:
+                pass
+        return mtimes
+
+    async def supervise_once(self):
+        await asyncio.gather(*(self.check(worker) for worker in self.workers if not worker.restarting))
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.restarting:
+                continue
+            exited = worker.process is not None and worker.process.returncode is not None
+            hung = (not worker.healthy and not exited
+                    and (worker.was_ready or now - worker.spawned_at > self.settings["startup_timeout_seconds"]))
+            if exited or hung:
+                logger.warning("workers: worker %d %s, restarting", worker.index,
+                               f"exited with {worker.process.returncode}" if exited else "failed its health checks")
+                asyncio.ensure_future(self.restart(worker, drain=False))
+        mtimes = self._watched_mtimes()
+        if mtimes != self._mtimes and not self._restart_lock.locked():
+            logger.info("workers: %s changed", ", ".join(name for name in mtimes if mtimes[name] != self._mtimes.get(name)))
+            self._mtimes = mtimes
+            asyncio.ensure_future(self.rolling_restart())
+
+    # Control
+
+    async def admin(self, method: str, target: str) -> Tuple[int, Dict[str, Any]]:
+        path = target.split("?", 1)[0]
+        if path == "/_pdd/workers" and method == "GET":
+            return 200, self.status()
+        if path == "/_pdd/restart" and method == "POST":
+            asyncio.ensure_future(self.rolling_restart())
+            return 202, {"restarting": len(self.workers)}
+        return 404, {"error": f"unknown admin request {method} {path}"}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "port": self.port,
+            "workers": [worker.status() for worker in self.workers],
+            "balancer": dict(self.balancer.counters)
+        }
+
+    async def serve(self):
+        """Start the workers and the balancer, then supervise until stop()
+
+        ready is set once the balancer is listening, or when startup
+        fails (with the exception in error); workers spawned so far are
+        terminated either way.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        if self._stop_requested:
+            self._stopped.set()
+        self._restart_lock = asyncio.Lock()
+        self._mtimes = self._watched_mtimes()
+        try:
+            for worker in self.workers:
+                await self.spawn(worker)
+            ready = await asyncio.gather(*(self.wait_ready(worker) for worker in self.workers))
+            if not any(ready):
+                logger.error("workers: no worker became ready; see %s", self.settings["log_dir"])
+            if self._stopped.is_set():
+                # Given up on by wait_started()
+                return
+            await self.balancer.start(self.host, self.port)
+            self.ready.set()
+            while not self._stopped.is_set():
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), self.settings["health_interval_seconds"])
+                except asyncio.TimeoutError:
+                    await self.supervise_once()
+        except Exception as e:
+            if not self.ready.is_set():
+                self.error = e
+            raise
+        finally:
+            await self.balancer.stop()
+            await asyncio.gather(*(self.terminate(worker) for worker in self.workers))
+            self.ready.set()
+
+    def wait_started(self, timeout: Optional[float] = None):
+        """Block until serve() is accepting connections; WorkerPoolError if it failed or timed out"""
+        if timeout is None:
+            timeout = self.settings["startup_timeout_seconds"] + STARTUP_GRACE_SECONDS
+        if not self.ready.wait(timeout):
+            self.request_stop()
+            raise WorkerPoolError(f"worker pool did not start within {timeout:.0f}s; "
+                                  f"see {self.settings['log_dir']}")
+        if self.error is not None:
+            raise WorkerPoolError(f"worker pool failed to start: {self.error}") from self.error
+
+    def request_stop(self):
+        """Thread-safe stop; serve() returns once the workers have exited"""
+        self._stop_requested = True
+        if self.loop is not None and self._stopped is not None:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+
+    def request_rolling_restart(self):
+        """Thread-safe rolling restart (e.g. from a signal handler)"""
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.rolling_restart(), self.loop)
+
+    def ready_count(self) -> int:
+        return sum(1 for worker in self.workers if worker.healthy)
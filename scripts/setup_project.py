@@ -21,6 +21,8 @@ import argparse
 from pathlib import Path
 from typing import Optional
 
+from pdd_llm import update_text
+
 
 class ProjectSetup:
     """Automated project setup for PDD AI agent."""
@@ -132,21 +134,23 @@ class ProjectSetup:
         else:
             print("⚠️ OpenAI API key not provided - you'll need to add it manually to .env")
 
-        env_file.write_text(env_content, encoding="utf-8")
+        # Under the .env lock; a .env created meanwhile by another tool is kept
+        update_text(env_file, lambda current: env_content if current is None else current)
         print("✅ Environment file created")
 
     def update_openai_key(self, env_file: Path, openai_key: str) -> None:
         """Update OpenAI key in existing .env file."""
-        content = env_file.read_text(encoding="utf-8")
-
-        # Replace the OpenAI key line
-        lines = content.split('\n')
-        for i, line in enumerate(lines):
-            if line.startswith('OPENAI_API_KEY='):
-                lines[i] = f'OPENAI_API_KEY={openai_key}'
-                break
-
-        env_file.write_text('\n'.join(lines), encoding="utf-8")
+        def replace_key(content: Optional[str]) -> str:
+            # Replace the OpenAI key line
+            lines = (content or "").split('\n')
+            for i, line in enumerate(lines):
+                if line.startswith('OPENAI_API_KEY='):
+                    lines[i] = f'OPENAI_API_KEY={openai_key}'
+                    break
+            return '\n'.join(lines)
+
+        # Locked read-modify-write with an atomic replace, so concurrent tools do not lose updates
+        update_text(env_file, replace_key)
         print("✅ OpenAI API key updated")
 
     def initialize_git(self) -> None:
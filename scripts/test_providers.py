@@ -6,130 +6,74 @@ Test all LLM providers to ensure they work correctly
 import os
 import asyncio
 import json
-from pathlib import Path
 
-# Import all possible LLM clients
-try:
-    from openai import AsyncOpenAI
-    openai_available = True
-except ImportError:
-    openai_available = False
+from pdd_llm import MockLLMServer, create_adapter, get_config_loader, get_transport, startup_report
 
-try:
-    import anthropic
-    anthropic_available = True
-except ImportError:
-    anthropic_available = False
-
-try:
-    import google.generativeai as genai
-    gemini_available = True
-except ImportError:
-    gemini_available = False
+MOCK_MODELS = {
+    "openai": "gpt-4o-mini",
+    "deepseek": "deepseek-chat",
+    "azure": "gpt-4",
+    "anthropic": "claude-3-haiku-20240307",
+    "gemini": "gemini-1.5-flash"
+}
 
 class LLMTester:
     def __init__(self):
         self.results = {}
-        
-    async def test_openai(self, api_key, model="gpt-3.5-turbo"):
-        """Test OpenAI connection"""
-        if not openai_available:
-            return {"status": "error", "message": "OpenAI package not installed"}
-            
+        # One pooled transport for every provider test
+        self.transport = get_transport()
+
+    async def run_probe(self, provider, api_key, model, prompt, base_url=None, api_version=None):
+        """Send a short prompt through the shared provider adapter"""
         try:
-            client = AsyncOpenAI(api_key=api_key)
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": "Say 'OpenAI test successful'"}],
+            adapter = create_adapter(
+                provider,
+                api_key,
+                model,
+                base_url=base_url,
+                api_version=api_version,
+                transport=self.transport
+            )
+            response = await adapter.complete(
+                [{"role": "user", "content": prompt}],
                 max_tokens=10
             )
-            return {"status": "success", "response": response.choices[0].message.content}
+            return {"status": "success", "response": response}
         except Exception as e:
             return {"status": "error", "message": str(e)}
+        
+    async def test_openai(self, api_key, model="gpt-3.5-turbo"):
+        """Test OpenAI connection"""
+        return await self.run_probe("openai", api_key, model, "Say 'OpenAI test successful'")
     
     async def test_deepseek(self, api_key, model="deepseek-chat"):
         """Test DeepSeek connection"""
-        if not openai_available:
-            return {"status": "error", "message": "OpenAI package not installed (required for DeepSeek)"}
-            
-        try:
-            client = AsyncOpenAI(
-                api_key=api_key,
-                base_url="https://api.deepseek.com/v1"
-            )
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": "Say 'DeepSeek test successful'"}],
-                max_tokens=10
-            )
-            return {"status": "success", "response": response.choices[0].message.content}
-        except Exception as e:
-            return {"status": "error", "message": str(e)}
+        return await self.run_probe(
+            "deepseek", api_key, model, "Say 'DeepSeek test successful'",
+            base_url="https://api.deepseek.com/v1"
+        )
     
     async def test_anthropic(self, api_key, model="claude-3-haiku-20240307"):
         """Test Anthropic connection"""
-        if not anthropic_available:
-            return {"status": "error", "message": "Anthropic package not installed"}
-            
-        try:
-            client = anthropic.AsyncAnthropic(api_key=api_key)
-            response = await client.messages.create(
-                model=model,
-                max_tokens=10,
-                messages=[{"role": "user", "content": "Say 'Anthropic test successful'"}]
-            )
-            return {"status": "success", "response": response.content[0].text}
-        except Exception as e:
-            return {"status": "error", "message": str(e)}
+        return await self.run_probe("anthropic", api_key, model, "Say 'Anthropic test successful'")
     
     async def test_gemini(self, api_key, model="gemini-2.0-flash-exp"):
         """Test Gemini connection"""
-        if not gemini_available:
-            return {"status": "error", "message": "google-generativeai package not installed"}
-            
-        try:
-            genai.configure(api_key=api_key)
-            model_instance = genai.GenerativeModel(model)
-            
-            # Gemini doesn't have native async, so use executor
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                model_instance.generate_content, 
-                "Say 'Gemini test successful'"
-            )
-            return {"status": "success", "response": response.text}
-        except Exception as e:
-            return {"status": "error", "message": str(e)}
+        return await self.run_probe("gemini", api_key, model, "Say 'Gemini test successful'")
     
     async def test_azure(self, api_key, base_url, model="gpt-4", api_version="2024-02-15-preview"):
         """Test Azure OpenAI connection"""
-        if not openai_available:
-            return {"status": "error", "message": "OpenAI package not installed (required for Azure)"}
-            
-        try:
-            client = AsyncOpenAI(
-                api_key=api_key,
-                base_url=base_url,
-                api_version=api_version
-            )
-            response = await client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": "Say 'Azure test successful'"}],
-                max_tokens=10
-            )
-            return {"status": "success", "response": response.choices[0].message.content}
-        except Exception as e:
-            return {"status": "error", "message": str(e)}
+        return await self.run_probe(
+            "azure", api_key, model, "Say 'Azure test successful'",
+            base_url=base_url, api_version=api_version
+        )
     
     def load_config(self):
         """Load configuration from config.json"""
-        config_file = Path("config.json")
-        if not config_file.exists():
+        loader = get_config_loader("config.json")
+        if not loader.exists:
             return None
-            
-        with open(config_file, 'r') as f:
-            return json.load(f)
+        return loader.load()
     
     async def test_all_providers(self):
         """Test all configured providers"""
@@ -218,6 +162,33 @@ class LLMTester:
                 if result["status"] == "error":
                     print(f"   • {provider.title()}: {result['message']}")
     
+    async def test_mock_providers(self):
+        """Exercise every adapter, plain and streaming, against the offline mock server"""
+        print("🧪 Testing All Adapters Against The Mock Server")
+        print("=" * 50)
+
+        async with MockLLMServer({"port": 0, "seed": 0, "response_tokens": 12}) as server:
+            for provider, model in MOCK_MODELS.items():
+                try:
+                    adapter = create_adapter(
+                        provider,
+                        "mock-key",
+                        model,
+                        base_url=server.base_url_for(provider),
+                        transport=self.transport
+                    )
+                    messages = [{"role": "user", "content": f"Say '{provider} mock test successful'"}]
+                    response = await adapter.complete(messages, max_tokens=10)
+                    deltas = [delta async for delta in adapter.stream(messages, max_tokens=10)]
+                    result = {"status": "success", "response": f"{response} ({len(deltas)} stream chunks)"}
+                    print(f"✅ {provider.title()}: {result['response']}")
+                except Exception as e:
+                    result = {"status": "error", "message": str(e)}
+                    print(f"❌ {provider.title()}: {result['message']}")
+                self.results[provider] = result
+
+            print(f"\n📊 Mock server: {json.dumps(server.stats())}")
+
     async def test_current_provider(self):
         """Test only the currently configured provider"""
         config = self.load_config()
@@ -243,10 +214,18 @@ async def main():
     
     tester = LLMTester()
     
-    if len(sys.argv) > 1 and sys.argv[1] == "current":
-        await tester.test_current_provider()
-    else:
-        await tester.test_all_providers()
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] == "current":
+            await tester.test_current_provider()
+        elif len(sys.argv) > 1 and sys.argv[1] == "mock":
+            await tester.test_mock_providers()
+        else:
+            await tester.test_all_providers()
+    finally:
+        await tester.transport.aclose()
+        imports = startup_report()["imports_ms"]
+        if imports:
+            print("\n⏱️  SDK import times: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in imports.items()))
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -5,12 +5,14 @@ Collects all required variables and updates all configuration files automaticall
 """
 
 import os
-import json
 import re
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import getpass
 
+from pdd_chat import write_entrypoint
+from pdd_llm import update_config, write_text
+
 class VariableManager:
     def __init__(self):
         self.variables = {}
@@ -333,13 +335,13 @@ class VariableManager:
     def update_config_json(self):
         """Update config.json with collected variables"""
         print("\n📄 Updating config.json...")
-        
-        # Load existing config or create new
-        if self.config_file.exists():
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
-        else:
-            config = {}
+        # Applied to the current file under its lock, so other tools' concurrent changes are kept
+        update_config(self.apply_variables, str(self.config_file))
+        print(f"✅ config.json updated")
+
+    def apply_variables(self, config: Dict[str, Any]):
+        """Write the collected variables into the configuration (older layouts already migrated)"""
+        providers = config["providers"]
         
         # Determine default provider
         default_provider = None
@@ -355,69 +357,69 @@ class VariableManager:
             default_provider = "azure"
         
         if default_provider:
-            config["default_provider"] = default_provider
+            config["llm_provider"] = default_provider
         
         # Update LLM providers
         if "OPENAI_API_KEY" in self.variables:
-            config["openai"] = {
+            providers["openai"].update({
                 "api_key": self.variables["OPENAI_API_KEY"],
                 "model": self.variables.get("OPENAI_MODEL", "gpt-4o-mini")
-            }
+            })
         
         if "GOOGLE_API_KEY" in self.variables:
-            config["gemini"] = {
+            providers["gemini"].update({
                 "api_key": self.variables["GOOGLE_API_KEY"],
                 "model": self.variables.get("GEMINI_MODEL", "gemini-2.0-flash-exp")
-            }
+            })
         
         if "ANTHROPIC_API_KEY" in self.variables:
-            config["anthropic"] = {
+            providers["anthropic"].update({
                 "api_key": self.variables["ANTHROPIC_API_KEY"],
                 "model": self.variables.get("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")
-            }
+            })
         
         if "DEEPSEEK_API_KEY" in self.variables:
-            config["deepseek"] = {
+            providers["deepseek"].update({
                 "api_key": self.variables["DEEPSEEK_API_KEY"],
                 "model": self.variables.get("DEEPSEEK_MODEL", "deepseek-chat")
-            }
+            })
         
         if "AZURE_OPENAI_API_KEY" in self.variables:
-            config["azure"] = {
+            providers["azure"].update({
                 "api_key": self.variables["AZURE_OPENAI_API_KEY"],
-                "endpoint": self.variables.get("AZURE_OPENAI_ENDPOINT", ""),
-                "deployment": self.variables.get("AZURE_OPENAI_DEPLOYMENT", ""),
+                "base_url": self.variables.get("AZURE_OPENAI_ENDPOINT", ""),
+                "model": self.variables.get("AZURE_OPENAI_DEPLOYMENT", ""),
                 "api_version": "2024-02-15-preview"
-            }
+            })
         
         # Update OAuth clients
         oauth_clients = config.get("oauth_clients", {})
         
         if "GITHUB_CLIENT_ID" in self.variables:
-            oauth_clients["github"] = {
+            oauth_clients.setdefault("github", {}).update({
                 "client_id": self.variables["GITHUB_CLIENT_ID"],
                 "client_secret": self.variables.get("GITHUB_CLIENT_SECRET", ""),
                 "access_token": self.variables.get("GITHUB_TOKEN", "")
-            }
+            })
         
         if "XERO_CLIENT_ID" in self.variables:
-            oauth_clients["xero"] = {
+            oauth_clients.setdefault("xero", {}).update({
                 "client_id": self.variables["XERO_CLIENT_ID"],
                 "client_secret": self.variables.get("XERO_CLIENT_SECRET", ""),
                 "redirect_uri": self.variables.get("XERO_REDIRECT_URI", "http://localhost:8080/callback")
-            }
+            })
         
         if "GOOGLE_CLIENT_ID" in self.variables:
-            oauth_clients["google"] = {
+            oauth_clients.setdefault("google", {}).update({
                 "client_id": self.variables["GOOGLE_CLIENT_ID"],
                 "client_secret": self.variables.get("GOOGLE_CLIENT_SECRET", "")
-            }
+            })
         
         if "MICROSOFT_CLIENT_ID" in self.variables:
-            oauth_clients["microsoft"] = {
+            oauth_clients.setdefault("microsoft", {}).update({
                 "client_id": self.variables["MICROSOFT_CLIENT_ID"],
                 "client_secret": self.variables.get("MICROSOFT_CLIENT_SECRET", "")
-            }
+            })
         
         if oauth_clients:
             config["oauth_clients"] = oauth_clients
@@ -425,9 +427,9 @@ class VariableManager:
         # Update application settings
         app_settings = config.get("app_settings", {})
         if "CHAINLIT_PORT" in self.variables:
-            app_settings["chainlit_port"] = int(self.variables["CHAINLIT_PORT"])
+            config["session"]["port"] = int(self.variables["CHAINLIT_PORT"])
         if "DEBUG" in self.variables:
-            app_settings["debug"] = self.variables["DEBUG"].lower() == "true"
+            config["session"]["debug"] = self.variables["DEBUG"].lower() == "true"
         if "LOG_LEVEL" in self.variables:
             app_settings["log_level"] = self.variables["LOG_LEVEL"]
         if "DATABASE_URL" in self.variables:
@@ -437,12 +439,6 @@ class VariableManager:
         
         if app_settings:
             config["app_settings"] = app_settings
-        
-        # Save config
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=2)
-        
-        print(f"✅ config.json updated")
     
     def update_env_file(self):
         """Update .env file with collected variables"""
@@ -468,165 +464,17 @@ class VariableManager:
                 env_content.append(f"{key}={value}")
             env_content.append("")
         
-        with open(self.env_file, 'w') as f:
-            f.write('\n'.join(env_content))
+        write_text(self.env_file, '\n'.join(env_content))
         
         print(f"✅ .env file updated")
     
     def update_chainlit_app(self):
-        """Update chainlit_app.py with configuration"""
+        """Point chainlit_app.py at the chat app package, which reads config.json and .env at runtime"""
         print("\n📄 Updating chainlit_app.py...")
-        
-        chainlit_app = Path("chainlit_app.py")
-        if not chainlit_app.exists():
-            self.create_chainlit_app()
-            return
-        
-        # Read existing file
-        content = chainlit_app.read_text()
-        
-        # Update port configuration
-        if "CHAINLIT_PORT" in self.variables:
-            port = self.variables["CHAINLIT_PORT"]
-            # Update port in chainlit config
-            content = re.sub(
-                r'port\s*=\s*\d+',
-                f'port = {port}',
-                content
-            )
-        
-        # Write updated content
-        chainlit_app.write_text(content)
-        print(f"✅ chainlit_app.py updated")
-    
-    def create_chainlit_app(self):
-        """Create chainlit_app.py if it doesn't exist"""
-        print("📄 Creating chainlit_app.py...")
-        
-        port = self.variables.get("CHAINLIT_PORT", "8001")
-        debug = self.variables.get("DEBUG", "false").lower() == "true"
-        
-        content = f'''#!/usr/bin/env python3
-"""
-PDD Universal Chainlit Application
-Multi-LLM chat interface with automatic PHR recording
-"""
-
-import os
-import json
-import chainlit as cl
-from pathlib import Path
-from typing import Dict, Any
-
-# Load configuration
-def load_config():
-    config_file = Path("config.json")
-    if config_file.exists():
-        with open(config_file, 'r') as f:
-            return json.load(f)
-    return {{}}
-
-config = load_config()
-
-@cl.on_chat_start
-async def start():
-    """Initialize chat session"""
-    default_provider = config.get("default_provider", "openai")
-    
-    await cl.Message(
-        content=f"""🚀 **PDD Universal Chat Interface**
-
-**Current LLM Provider**: {default_provider.title()}
-
-**Available Commands**:
-- `/switch <provider>` - Switch LLM provider
-- `/config` - Show current configuration
-- `/help` - Show help information
-
-**Automatic PHR Recording**: ✅ Active
-Your prompts are automatically recorded as PHRs in `docs/prompts/`
-
-Start chatting to begin your PDD development session!
-""",
-        author="System"
-    ).send()
-
-@cl.on_message
-async def main(message: cl.Message):
-    """Handle incoming messages"""
-    content = message.content.strip()
-    
-    # Handle commands
-    if content.startswith('/'):
-        await handle_command(content)
-        return
-    
-    # Regular chat processing
-    response = await process_llm_request(content)
-    await cl.Message(content=response).send()
-
-async def handle_command(command: str):
-    """Handle chat commands"""
-    parts = command.split()
-    cmd = parts[0].lower()
-    
-    if cmd == "/config":
-        config_info = f"""📋 **Current Configuration**
-
-**Default Provider**: {{config.get("default_provider", "Not set")}}
-**Available Providers**: {{", ".join(config.keys()) if config else "None"}}
-**Chainlit Port**: {port}
-**Debug Mode**: {debug}
-"""
-        await cl.Message(content=config_info, author="System").send()
-    
-    elif cmd == "/help":
-        help_text = """🆘 **Help - PDD Universal Chat**
-
-**Commands**:
-- `/config` - Show configuration
-- `/switch <provider>` - Switch LLM provider
-- `/help` - This help message
-
-**PDD Methodology**:
-- **Architect**: Design and planning
-- **Red**: Test-driven development
-- **Green**: Implementation
-- **Refactor**: Code improvement
-
-**PHR System**:
-Your prompts are automatically saved as Prompt History Records (PHRs) in numbered files.
-"""
-        await cl.Message(content=help_text, author="System").send()
-    
-    else:
-        await cl.Message(content=f"❌ Unknown command: {{cmd}}", author="System").send()
-
-async def process_llm_request(prompt: str) -> str:
-    """Process request with configured LLM provider"""
-    default_provider = config.get("default_provider")
-    
-    if not default_provider:
-        return "❌ No LLM provider configured. Please run configuration setup."
-    
-    # This would integrate with actual LLM APIs
-    return f"🤖 **[{{default_provider.title()}}]** Response to: {{prompt}}\\n\\n⚠️ **Note**: LLM integration not yet implemented. This is a placeholder response."
-
-if __name__ == "__main__":
-    # Configuration for chainlit run
-    import chainlit as cl
-    cl.run(
-        port={port},
-        debug={str(debug).lower()},
-        headless=False,
-        watch=True
-    )
-'''
-        
-        with open("chainlit_app.py", 'w') as f:
-            f.write(content)
-        
-        print(f"✅ chainlit_app.py created")
+        if write_entrypoint():
+            print(f"✅ chainlit_app.py updated")
+        else:
+            print(f"✅ chainlit_app.py is up to date")
     
     def update_requirements_txt(self):
         """Update requirements.txt with all dependencies"""
@@ -683,6 +531,7 @@ if __name__ == "__main__":
 # Environment and configuration
 .env
 config.json
+.*.lock
 *.log
 
 # Python
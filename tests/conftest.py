@@ -0,0 +1,11 @@
+"""
+Test configuration
+The package is imported the way the chat app imports it: scripts.pdd_llm from the project root
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,72 @@
+"""
+Test doubles shared by the adapter, router and client tests
+"""
+
+import asyncio
+from typing import Any, List, Optional
+
+from scripts.pdd_llm.breaker import CircuitBreaker
+from scripts.pdd_llm.providers import ProviderAdapter
+from scripts.pdd_llm.ratelimit import ProviderRateLimiter
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FakeAdapter(ProviderAdapter):
+    """Adapter that answers from a script instead of calling a provider
+
+    Each call takes the next outcome (the last one repeats): a string is
+    the reply, streamed word by word, and an exception is raised. Calls
+    take delay seconds before answering.
+    """
+
+    uses_transport = False
+
+    def __init__(self, provider: str = "fake", outcomes: Optional[List[Any]] = None, delay: float = 0.0,
+                 breaker: Optional[CircuitBreaker] = None, rate_limits: Optional[dict] = None,
+                 model: str = "model"):
+        self.outcomes = list(outcomes or ["hello world"])
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+        super().__init__(
+            provider, "key", model,
+            rate_limiter=ProviderRateLimiter(provider, rate_limits),
+            breaker=breaker or CircuitBreaker(provider, {"probe": False})
+        )
+
+    def setup_client(self):
+        return None
+
+    def _next(self):
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        return outcome
+
+    async def _wait(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    async def _complete(self, messages, max_tokens, temperature):
+        outcome = self._next()
+        await self._wait()
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    async def _stream(self, messages, max_tokens, temperature):
+        outcome = self._next()
+        await self._wait()
+        if isinstance(outcome, BaseException):
+            raise outcome
+        for i, word in enumerate(outcome.split(" ")):
+            yield word if i == 0 else " " + word
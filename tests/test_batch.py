@@ -0,0 +1,98 @@
+"""
+Bulk prompt processing: online runs, resuming from the output, provider batch jobs
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import FakeAdapter, ServerError
+from scripts.pdd_llm.batch import AnthropicBatchAPI, BatchRunner
+from scripts.pdd_llm.client import UniversalLLMClient
+from scripts.pdd_llm.config import normalize_config
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    for name in ("LLM_PROVIDER", "API_KEY", "MODEL", "TEMPERATURE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    client = UniversalLLMClient(normalize_config({"cache": {"enabled": False}, "warmup": {"enabled": False}}))
+    client._client = FakeAdapter()
+    return client
+
+
+def write_prompts(path, ids):
+    path.write_text("".join(json.dumps({"id": item_id, "prompt": f"prompt {item_id}"}) + "\n" for item_id in ids))
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class FakeBatchAPI:
+    """Provider batch API whose jobs end on the first poll, answering every request"""
+
+    def __init__(self):
+        self.submitted = []
+
+    async def submit(self, items, max_tokens, temperature):
+        self.submitted.append([item_id for item_id, _ in items])
+        return f"job-{len(self.submitted)}"
+
+    async def poll(self, job_id):
+        return {f"item-{index}": (f"{job_id} answer {index}", None) for index in range(10)}
+
+
+def test_failed_prompts_are_recorded_and_retried_on_resume(client, tmp_path):
+    prompts, output = tmp_path / "prompts.jsonl", tmp_path / "out.jsonl"
+    write_prompts(prompts, ["a", "b", "c"])
+    client._client = FakeAdapter(outcomes=["one", ServerError("overloaded"), "three"])
+
+    report = asyncio.run(BatchRunner(client, {"mode": "online", "concurrency": 1}).run(prompts, output))
+    assert (report["succeeded"], report["failed"]) == (2, 1)
+    records = read_output(output)
+    assert [(r["id"], r["response"]) for r in records] == [("a", "one"), ("b", None), ("c", "three")]
+    assert records[1]["error"] == "overloaded"
+
+    # Done ids are skipped; only the failure is asked again
+    client._client = FakeAdapter(outcomes=["two"])
+    runner = BatchRunner(client, {"mode": "online", "retry_errors": True})
+    report = asyncio.run(runner.run(prompts, output))
+    assert (report["succeeded"], report["skipped"]) == (1, 2)
+    assert client._client.calls == 1
+    last = read_output(output)[-1]
+    assert (last["id"], last["response"], last["error"]) == ("b", "two", None)
+
+
+def test_submitted_jobs_are_polled_again_instead_of_resubmitted(client, tmp_path):
+    prompts, output = tmp_path / "prompts.jsonl", tmp_path / "out.jsonl"
+    write_prompts(prompts, ["a", "b"])
+    runner = BatchRunner(client, {"poll_interval_seconds": 0})
+    runner.checkpoint_path(output).write_text(
+        json.dumps({"jobs": [{"id": "job-0", "provider": client.provider, "ids": ["a"]}]}))
+    api = FakeBatchAPI()
+    runner.batch_api = lambda: api
+
+    asyncio.run(runner.run(prompts, output))
+    assert api.submitted == [["b"]]
+    assert {r["id"]: r["response"] for r in read_output(output)} == {"a": "job-0 answer 0", "b": "job-1 answer 0"}
+    assert not runner.checkpoint_path(output).exists()
+
+
+def test_anthropic_batch_reply_without_text_is_not_a_crash():
+    async def results(job_id):
+        async def entries():
+            for custom_id, content in (("item-0", []), ("item-1", [SimpleNamespace(type="text", text="hi")])):
+                message = SimpleNamespace(content=content)
+                yield SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="succeeded", message=message))
+        return entries()
+
+    async def retrieve(job_id):
+        return SimpleNamespace(processing_status="ended")
+
+    batches = SimpleNamespace(retrieve=retrieve, results=results)
+    adapter = SimpleNamespace(client=SimpleNamespace(messages=SimpleNamespace(batches=batches)))
+    assert asyncio.run(AnthropicBatchAPI(adapter).poll("job")) == {"item-0": ("", None), "item-1": ("hi", None)}
@@ -0,0 +1,154 @@
+"""
+Circuit breaker state transitions
+"""
+
+import asyncio
+
+import pytest
+
+from fakes import FakeAdapter
+from scripts.pdd_llm import breaker as breaker_module
+from scripts.pdd_llm.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, is_outage
+from scripts.pdd_llm.deadline import DeadlineExceeded
+from scripts.pdd_llm.ratelimit import RateLimitTimeout
+from scripts.pdd_llm.router import LLMRouter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(breaker_module, "time", clock)
+    return clock
+
+
+def make_breaker(**settings):
+    merged = {"failure_threshold": 3, "open_seconds": 10.0, "max_open_seconds": 25.0}
+    merged.update(settings)
+    return CircuitBreaker("test", merged)
+
+
+def test_opens_after_consecutive_outages(clock):
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.record(ServerError())
+    assert breaker.state == CLOSED
+    breaker.record(ServerError())
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    assert breaker.counters["rejected"] == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = make_breaker()
+    breaker.record(ServerError())
+    breaker.record(ServerError())
+    breaker.record_success()
+    breaker.record(ServerError())
+    assert breaker.state == CLOSED
+
+
+def test_client_errors_and_rate_limits_are_not_outages(clock):
+    breaker = make_breaker(failure_threshold=1)
+    breaker.record(BadRequest())
+    assert breaker.state == CLOSED
+    breaker.record(asyncio.TimeoutError())
+    assert breaker.state == OPEN
+
+
+def test_half_open_admits_a_single_probe(clock):
+    breaker = make_breaker(failure_threshold=1)
+    breaker.record(ConnectionError())
+    clock.now += 10.0
+    assert breaker.available()
+    assert breaker.allow() is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() is False
+
+
+def test_failed_probe_doubles_the_open_period_up_to_the_cap(clock):
+    breaker = make_breaker(failure_threshold=1)
+    breaker.record(ConnectionError())
+    for expected in (20.0, 25.0, 25.0):
+        clock.now += breaker.open_seconds
+        assert breaker.allow() is True
+        breaker.record(ConnectionError())
+        assert breaker.state == OPEN
+        assert breaker.open_seconds == expected
+
+
+def test_expired_deadline_releases_the_probe_without_an_outcome(clock):
+    breaker = make_breaker(failure_threshold=1)
+    breaker.record(ConnectionError())
+    clock.now += 10.0
+    assert breaker.allow() is True
+    breaker.record(DeadlineExceeded())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+
+
+def test_disabled_breaker_never_rejects(clock):
+    breaker = make_breaker(enabled=False, failure_threshold=1)
+    for _ in range(5):
+        breaker.record(ServerError())
+    assert breaker.state == CLOSED
+    assert breaker.allow() is False
+
+
+def test_own_limits_are_not_provider_outages():
+    assert is_outage(asyncio.TimeoutError())
+    assert not is_outage(DeadlineExceeded())
+    assert not is_outage(RateLimitTimeout("would queue 60s"))
+
+
+def test_rate_limiter_timeout_is_not_recorded_on_the_breaker():
+    breaker = CircuitBreaker("limited", {"failure_threshold": 2, "probe": False})
+    breaker.record_failure()
+    adapter = FakeAdapter("limited", breaker=breaker,
+                          rate_limits={"requests_per_minute": 1, "max_wait_seconds": 0.1})
+
+    async def run():
+        assert await adapter.complete([{"role": "user", "content": "hi"}]) == "hello world"
+        with pytest.raises(RateLimitTimeout):
+            await adapter.complete([{"role": "user", "content": "hi"}])
+
+    asyncio.run(run())
+    assert adapter.calls == 1
+    assert breaker.state == CLOSED and breaker.failures == 0
+    breaker.record_failure()
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(adapter.complete([{"role": "user", "content": "hi"}]))
+    assert breaker.state == CLOSED and breaker.failures == 1
+
+
+def test_router_attempt_timeout_counts_against_the_hung_backend():
+    hung = FakeAdapter("hung", delay=5.0,
+                       breaker=CircuitBreaker("hung", {"failure_threshold": 1, "probe": False}))
+    healthy = FakeAdapter("healthy", ["from the fallback"])
+    router = LLMRouter([hung, healthy], {"timeout_seconds": 0.05})
+
+    reply = asyncio.run(router.complete([{"role": "user", "content": "hi"}]))
+    assert reply == "from the fallback"
+    assert hung.cancelled == 1
+    assert hung.breaker.state == OPEN
+    assert healthy.breaker.failures == 0
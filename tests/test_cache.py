@@ -0,0 +1,145 @@
+"""
+Exact-match response cache: LRU memory tier, SQLite tier, TTL
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from fakes import FakeAdapter
+from scripts.pdd_llm import cache as cache_module
+from scripts.pdd_llm.cache import ResponseCache, make_cache_key
+from scripts.pdd_llm.client import UniversalLLMClient
+from scripts.pdd_llm.config import normalize_config
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def test_equivalent_prompts_share_a_key():
+    a = make_cache_key("openai", "gpt-4o", [{"role": "user", "content": "Hello\r\n"}], {"temperature": 0})
+    b = make_cache_key("openai", "gpt-4o", [{"role": "USER", "content": "  Hello"}], {"temperature": 0})
+    c = make_cache_key("openai", "gpt-4o", [{"role": "user", "content": "Hello"}], {"temperature": 1})
+    assert a == b
+    assert a != c
+
+
+def test_memory_tier_evicts_least_recently_used(clock):
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl_seconds=60, max_entries=10)
+    cache.set("k", "v")
+    clock.now += 59
+    assert cache.get("k") == "v"
+    clock.now += 2
+    assert cache.get("k") is None
+
+
+def test_sqlite_tier_survives_a_new_instance(clock, tmp_path):
+    db_path = str(tmp_path / "responses.db")
+    first = ResponseCache(db_path=db_path)
+    first.set("k", "v")
+    first.close()
+
+    second = ResponseCache(db_path=db_path)
+    assert second.get("k") == "v"
+    assert second.stats()["disk_hits"] == 1
+    # Promoted to the memory tier
+    assert second.get("k") == "v"
+    assert second.stats()["memory_hits"] == 1
+    second.close()
+
+
+def test_expired_sqlite_rows_are_deleted(clock, tmp_path):
+    db_path = str(tmp_path / "responses.db")
+    first = ResponseCache(ttl_seconds=60, db_path=db_path)
+    first.set("k", "v")
+    first.close()
+
+    clock.now += 61
+    second = ResponseCache(ttl_seconds=60, db_path=db_path)
+    assert second.get("k") is None
+    assert second.stats()["expired"] == 1
+    assert second.stats()["db_entries"] == 0
+    second.close()
+
+
+def test_sqlite_tier_prunes_least_recently_accessed_past_the_cap(clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(ResponseCache, "PRUNE_EVERY", 1)
+    cache = ResponseCache(max_entries=1, db_path=str(tmp_path / "responses.db"), max_db_entries=2)
+    cache.set("a", "A")
+    clock.now += 1
+    cache.set("b", "B")
+    clock.now += 1
+    cache.get("a")  # from SQLite, refreshing its last access
+    clock.now += 1
+    cache.set("c", "C")
+    assert cache.stats()["db_entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    cache.close()
+
+
+def test_async_access_runs_sqlite_on_the_cache_thread(tmp_path, monkeypatch):
+    cache = ResponseCache(db_path=str(tmp_path / "responses.db"))
+    threads = []
+    get = cache.get
+
+    def recording_get(key):
+        threads.append(threading.current_thread().name)
+        return get(key)
+
+    monkeypatch.setattr(cache, "get", recording_get)
+
+    async def run():
+        await cache.aset("k", "v")
+        return await cache.aget("k")
+
+    assert asyncio.run(run()) == "v"
+    assert threads and threads[0].startswith("response-cache")
+    cache.close()
+    # Closed: the memory tier still answers, without the thread
+    assert asyncio.run(cache.aget("k")) == "v"
+
+
+def test_a_broken_cache_database_does_not_fail_the_turn(tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    for name in ("LLM_PROVIDER", "API_KEY", "MODEL", "TEMPERATURE"):
+        monkeypatch.delenv(name, raising=False)
+    config = normalize_config({"generation": {"temperature": 0}, "warmup": {"enabled": False},
+                               "semantic_cache": {"enabled": False}})
+    client = UniversalLLMClient(config)
+    client._client = FakeAdapter(outcomes=["first", "second"])
+    client.cache.db.close()
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def run():
+        return [await client.chat_completion(messages), await client.chat_completion(messages)]
+
+    # The database errors are logged; the memory tier still serves the repeat
+    assert asyncio.run(run()) == ["first", "first"]
+    assert "response cache: lookup failed" in caplog.text
+    assert "response cache: write failed" in caplog.text
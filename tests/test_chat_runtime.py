@@ -0,0 +1,89 @@
+"""
+Chat app runtime: the client built from config.json and rebuilt when it changes
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from scripts.pdd_chat.runtime import ChatRuntime
+from scripts.pdd_llm.client import UniversalLLMClient
+from scripts.pdd_llm.config import normalize_config
+from scripts.pdd_llm.filestore import atomic_write
+
+# The layout VariableManager.apply_variables() writes; its .env has no API_KEY, MODEL or LLM_PROVIDER
+VARIABLE_MANAGER_CONFIG = {
+    "llm_provider": "gemini",
+    "providers": {
+        "gemini": {"api_key": "g-key", "model": "gemini-1.5-pro"},
+        "azure": {"api_key": "az-key", "base_url": "https://example.openai.azure.com/",
+                  "model": "gpt4-prod", "api_version": "2024-06-01"},
+    },
+    "cache": {"enabled": False},
+    "warmup": {"enabled": False},
+}
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch, tmp_path):
+    for name in ("LLM_PROVIDER", "API_KEY", "MODEL", "BASE_URL", "API_VERSION"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+
+
+def test_client_reads_the_provider_entry_of_config_json():
+    client = UniversalLLMClient(normalize_config(VARIABLE_MANAGER_CONFIG))
+    assert (client.provider, client.api_key, client.model) == ("gemini", "g-key", "gemini-1.5-pro")
+
+    config = normalize_config(dict(VARIABLE_MANAGER_CONFIG, llm_provider="azure"))
+    client = UniversalLLMClient(config)
+    assert client.base_url == "https://example.openai.azure.com/"
+    assert client.api_version == "2024-06-01"
+
+
+def test_environment_overrides_config_json(monkeypatch):
+    monkeypatch.setenv("MODEL", "gemini-1.5-flash")
+    monkeypatch.setenv("API_KEY", "env-key")
+    client = UniversalLLMClient(normalize_config(VARIABLE_MANAGER_CONFIG))
+    assert (client.provider, client.api_key, client.model) == ("gemini", "env-key", "gemini-1.5-flash")
+
+
+def test_config_edit_swaps_the_client_after_running_turns(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(VARIABLE_MANAGER_CONFIG), encoding="utf-8")
+
+    async def run():
+        runtime = ChatRuntime(str(path), str(tmp_path / ".env"))
+        closed = []
+        with runtime.turn() as first:
+            assert first.model == "gemini-1.5-pro"
+            first.aclose = lambda: closed.append(first) or asyncio.sleep(0)
+
+            edited = json.loads(json.dumps(VARIABLE_MANAGER_CONFIG))
+            edited["providers"]["gemini"]["model"] = "gemini-1.5-flash"
+            atomic_write(path, json.dumps(edited))
+            with runtime.turn() as second:
+                assert second is not first and second.model == "gemini-1.5-flash"
+            await asyncio.sleep(0)
+            # Still answering on the old client
+            assert not closed
+        await asyncio.sleep(0)
+        assert closed == [first]
+        assert runtime.reloads == 1 and not runtime.refresh()
+
+    asyncio.run(run())
+
+
+def test_invalid_edit_keeps_the_previous_client(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(VARIABLE_MANAGER_CONFIG), encoding="utf-8")
+
+    async def run():
+        runtime = ChatRuntime(str(path), str(tmp_path / ".env"))
+        client = runtime.client
+        atomic_write(path, "{half written")
+        assert not runtime.refresh()
+        assert runtime.client is client
+
+    asyncio.run(run())
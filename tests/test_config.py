@@ -0,0 +1,89 @@
+"""
+Shared config loader: legacy migration, validation and mtime-keyed caching
+"""
+
+import json
+
+import pytest
+
+from scripts.pdd_llm.config import (
+    CONFIG_SCHEMA_VERSION,
+    ConfigError,
+    ConfigLoader,
+    migrate_config,
+    normalize_config,
+)
+from scripts.pdd_llm.filestore import atomic_write
+
+LEGACY = {
+    "default_provider": "azure",
+    "azure": {"api_key": "key", "endpoint": "https://example.openai.azure.com/", "deployment": "gpt4-prod"},
+    "gemini": {"api_key": "g", "model": "gemini-1.5-flash"},
+    "app_settings": {"chainlit_port": 9000, "debug": True, "log_level": "DEBUG"},
+    "git_integration": {"username": "octocat"},
+}
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_migrates_the_variable_manager_layout():
+    config = migrate_config(LEGACY)
+    assert config["schema_version"] == CONFIG_SCHEMA_VERSION
+    assert config["llm_provider"] == "azure"
+    assert "default_provider" not in config and "azure" not in config and "gemini" not in config
+    assert config["providers"]["azure"] == {"api_key": "key", "base_url": "https://example.openai.azure.com/",
+                                            "model": "gpt4-prod"}
+    assert config["providers"]["gemini"]["model"] == "gemini-1.5-flash"
+    assert config["session"] == {"port": 9000, "debug": True}
+    assert config["app_settings"]["log_level"] == "DEBUG"
+    assert config["git_integration"] == {"username": "octocat"}
+    # The input is left alone
+    assert "default_provider" in LEGACY
+
+
+def test_current_layout_is_not_migrated_again():
+    config = {"schema_version": CONFIG_SCHEMA_VERSION, "llm_provider": "openai", "openai": {"api_key": "x"}}
+    assert migrate_config(config) == config
+
+
+def test_normalize_fills_every_section_with_defaults():
+    config = normalize_config({"llm_provider": "deepseek", "session": {"port": 8100}})
+    assert config["session"]["port"] == 8100
+    assert config["session"]["streaming"] is True
+    assert config["providers"]["deepseek"]["model"] == "deepseek-chat"
+    assert config["workers"]["count"] == 1
+
+
+def test_validation_reports_every_wrong_type():
+    with pytest.raises(ConfigError) as error:
+        normalize_config({"session": {"port": "8001", "debug": "yes"}, "providers": {"openai": "sk-..."}})
+    message = str(error.value)
+    assert "session.port should be number" in message
+    assert "session.debug should be bool" in message
+    assert "providers.openai should be dict" in message
+
+
+def test_loader_parses_once_per_change(tmp_path):
+    path = tmp_path / "config.json"
+    write_json(path, {"llm_provider": "openai"})
+    loader = ConfigLoader(str(path))
+    first = loader.load()
+    assert loader.load() is first
+    assert not loader.changed()
+
+    # Replaced by rename, as save_config() does: a new inode
+    atomic_write(path, json.dumps({"llm_provider": "gemini"}))
+    assert loader.changed()
+    second = loader.load()
+    assert second is not first
+    assert second["llm_provider"] == "gemini"
+
+
+def test_loader_reports_invalid_json_and_loads_defaults_for_a_missing_file(tmp_path):
+    path = tmp_path / "config.json"
+    assert ConfigLoader(str(path)).load()["llm_provider"] == "openai"
+    path.write_text("{not json", encoding="utf-8")
+    with pytest.raises(ConfigError):
+        ConfigLoader(str(path)).load()
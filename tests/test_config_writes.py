@@ -0,0 +1,157 @@
+"""
+Locked, atomic config.json and .env writes: compare-and-swap, three-way merge, file locks
+"""
+
+import json
+import os
+
+import pytest
+
+from conftest import ROOT
+from scripts.pdd_llm.config import (
+    CONFIG_SCHEMA_VERSION,
+    ConfigConflict,
+    ConfigError,
+    apply_edits,
+    checkout_config,
+    save_config,
+    update_config,
+)
+from scripts.pdd_llm.filestore import FileLockTimeout, file_lock, update_text
+
+LEGACY = {
+    "default_provider": "azure",
+    "azure": {"api_key": "key", "endpoint": "https://example.openai.azure.com/", "deployment": "gpt4-prod"},
+    "app_settings": {"chainlit_port": 9000},
+    "git_integration": {"username": "octocat"},
+}
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_save_is_a_compare_and_swap(tmp_path):
+    path = str(tmp_path / "config.json")
+    write_json(tmp_path / "config.json", {"llm_provider": "openai"})
+    mine, revision = checkout_config(path)
+    mine["session"]["port"] = 9100
+
+    update_config(lambda config: config.setdefault("git_integration", {}).update(access_token="t"), path)
+    with pytest.raises(ConfigConflict):
+        save_config(mine, path, revision)
+    assert "access_token" in json.loads((tmp_path / "config.json").read_text())["git_integration"]
+
+    _, current_revision = checkout_config(path)
+    new_revision = save_config(mine, path, current_revision)
+    assert checkout_config(path)[1] == new_revision
+
+
+def test_three_way_merge_keeps_both_writers_changes(tmp_path):
+    path = str(tmp_path / "config.json")
+    write_json(tmp_path / "config.json", LEGACY)
+    base, _ = checkout_config(path)
+    mine = json.loads(json.dumps(base))
+    mine["session"]["port"] = 9200
+    mine["providers"]["openai"]["api_key"] = "sk-new"
+
+    update_config(lambda config: config["git_integration"].update(access_token="t"), path)
+
+    current, revision = checkout_config(path)
+    apply_edits(current, base, mine)
+    save_config(current, path, revision)
+
+    saved = json.loads((tmp_path / "config.json").read_text())
+    assert saved["session"]["port"] == 9200
+    assert saved["providers"]["openai"]["api_key"] == "sk-new"
+    assert saved["git_integration"] == {"username": "octocat", "access_token": "t"}
+    assert saved["llm_provider"] == "azure"
+
+
+def test_update_rejects_an_invalid_result_without_writing(tmp_path):
+    path = tmp_path / "config.json"
+    write_json(path, {"llm_provider": "openai"})
+    before = path.read_text()
+    with pytest.raises(ConfigError):
+        update_config(lambda config: config["session"].update(port="eighty"), str(path))
+    assert path.read_text() == before
+
+
+def test_file_lock_excludes_a_second_writer(tmp_path):
+    path = tmp_path / ".env"
+    with file_lock(path):
+        with pytest.raises(FileLockTimeout):
+            with file_lock(path, timeout=0.1):
+                pass
+    with file_lock(path, timeout=0.1):
+        pass
+
+
+def test_atomic_write_keeps_permissions_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text("A=1\n", encoding="utf-8")
+    os.chmod(path, 0o640)
+    update_text(path, lambda current: current + "B=2\n")
+    assert path.read_text(encoding="utf-8") == "A=1\nB=2\n"
+    if os.name != "nt":
+        assert os.stat(path).st_mode & 0o777 == 0o640
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".env", ".env.lock"]
+
+
+def test_only_the_users_settings_are_written(tmp_path):
+    path = tmp_path / "config.json"
+    write_json(path, {"llm_provider": "gemini", "session": {"port": 9000}})
+    update_config(lambda config: config["providers"]["gemini"].update(api_key="g-key"), str(path))
+
+    saved = json.loads(path.read_text())
+    assert saved == {"schema_version": CONFIG_SCHEMA_VERSION, "llm_provider": "gemini",
+                     "session": {"port": 9000}, "providers": {"gemini": {"api_key": "g-key"}}}
+    # The defaults still apply on load
+    config, _ = checkout_config(str(path))
+    assert config["providers"]["gemini"]["model"] == "gemini-2.0-flash-exp"
+    assert config["session"]["streaming"] is True
+
+
+def test_removed_keys_are_removed_from_the_file(tmp_path):
+    path = tmp_path / "config.json"
+    write_json(path, {"providers": {"local": {"base_url": "http://localhost:11434/v1"},
+                                    "mistral": {"api_key": "m", "model": "mistral-small"}}})
+    config, revision = checkout_config(str(path))
+    del config["providers"]["mistral"]
+    config["providers"]["local"].pop("base_url")
+    save_config(config, str(path), revision)
+
+    saved = json.loads(path.read_text())
+    assert "mistral" not in saved["providers"]
+    assert "base_url" not in saved["providers"].get("local", {})
+
+
+def test_three_way_merge_applies_removals_and_keeps_the_other_writers_additions():
+    base = {"providers": {"openai": {"api_key": "a"}, "mistral": {"api_key": "m"}}, "session": {"port": 1}}
+    current = json.loads(json.dumps(base))
+    current["providers"]["deepseek"] = {"api_key": "d"}
+    current["session"]["port"] = 2
+    edited = json.loads(json.dumps(base))
+    del edited["providers"]["mistral"]
+
+    apply_edits(current, base, edited)
+    assert current == {"providers": {"openai": {"api_key": "a"}, "deepseek": {"api_key": "d"}},
+                       "session": {"port": 2}}
+
+
+def test_setup_gives_up_when_config_keeps_changing(monkeypatch, tmp_path, capsys):
+    monkeypatch.syspath_prepend(str(ROOT / "scripts"))
+    config_manager = pytest.importorskip("config_manager")
+    monkeypatch.chdir(tmp_path)
+    manager = config_manager.ConfigManager()
+    manager.config["llm_provider"] = "anthropic"
+    attempts = []
+
+    def always_conflicts(config, path, revision):
+        attempts.append(revision)
+        raise config_manager.ConfigConflict(path)
+
+    monkeypatch.setattr(config_manager, "save_config", always_conflicts)
+    assert manager.save_config() is False
+    assert len(attempts) == 1 + config_manager.MAX_SAVE_ATTEMPTS
+    assert "not saved" in capsys.readouterr().out
@@ -0,0 +1,133 @@
+"""
+Request deadlines: propagation, per-step enforcement on streams, and cancellation
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from fakes import FakeAdapter
+from scripts.pdd_llm.breaker import CLOSED
+from scripts.pdd_llm.client import UniversalLLMClient
+from scripts.pdd_llm.config import normalize_config
+from scripts.pdd_llm.deadline import (
+    DeadlineExceeded,
+    deadline_after,
+    deadline_scope,
+    remaining,
+    stream_with_deadline,
+    within_deadline,
+)
+from scripts.pdd_llm.memory import ConversationMemory
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class StallingAdapter(FakeAdapter):
+    """Streams one delta, then hangs"""
+
+    async def _stream(self, messages, max_tokens, temperature):
+        self.calls += 1
+        yield "first"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        yield " never"
+
+
+async def stalling(delay):
+    yield 1
+    await asyncio.sleep(delay)
+    yield 2
+
+
+def test_scope_nests_and_reaches_spawned_tasks():
+    async def run():
+        with deadline_scope(5.0):
+            with deadline_scope(60.0):
+                # The enclosing, earlier deadline wins
+                assert remaining() <= 5.0
+            return await asyncio.ensure_future(asyncio.sleep(0, remaining()))
+
+    assert 4.0 < asyncio.run(run()) <= 5.0
+    assert remaining() is None
+
+
+def test_within_deadline_cancels_the_awaitable():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        with deadline_scope(0.05):
+            await within_deadline(slow())
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert cancelled == [True]
+
+
+def test_stream_deadline_is_enforced_after_the_first_item():
+    async def run():
+        items = []
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            async for item in stream_with_deadline(stalling(10), deadline_after(0.1)):
+                items.append(item)
+        return items, time.monotonic() - started
+
+    items, elapsed = asyncio.run(run())
+    assert items == [1]
+    assert elapsed < 2.0
+
+
+def test_adapter_stream_stalling_midway_hits_the_deadline():
+    adapter = StallingAdapter()
+
+    async def run():
+        deltas = []
+        with deadline_scope(0.1):
+            with pytest.raises(DeadlineExceeded):
+                async for delta in adapter.stream(MESSAGES):
+                    deltas.append(delta)
+        return deltas
+
+    assert asyncio.run(run()) == ["first"]
+    assert adapter.cancelled == 1
+    # The caller's deadline says nothing about the provider
+    assert adapter.breaker.state == CLOSED and adapter.breaker.failures == 0
+
+
+def test_client_stream_timeout_covers_the_whole_reply(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    client = UniversalLLMClient(normalize_config({"cache": {"enabled": False}}))
+    client._client = StallingAdapter()
+
+    async def run():
+        deltas = []
+        with pytest.raises(DeadlineExceeded):
+            async for delta in client.stream_chat_completion(MESSAGES, timeout=0.1):
+                deltas.append(delta)
+        return deltas
+
+    assert asyncio.run(run()) == ["first"]
+    assert remaining() is None
+
+
+def test_failed_turn_is_rolled_back_from_memory():
+    memory = ConversationMemory("gpt-4o", "system", budget=1000)
+    memory.add("user", "first question")
+    memory.add("assistant", "first answer")
+    before = memory.prompt_tokens
+    memory.add("user", "question whose reply failed")
+    assert memory.pop() == {"role": "user", "content": "question whose reply failed"}
+    assert memory.prompt_tokens == before
+    assert [m["content"] for m in memory.messages()] == ["system", "first question", "first answer"]
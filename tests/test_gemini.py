@@ -0,0 +1,122 @@
+"""
+Gemini: native async calls, shared GenerativeModel instances, the bounded executor fallback
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.pdd_llm import providers as providers_module
+from scripts.pdd_llm.breaker import CircuitBreaker
+from scripts.pdd_llm.executor import BoundedExecutor
+from scripts.pdd_llm.providers import GeminiAdapter
+
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "hi"}]
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text]
+        self.usage_metadata = {"prompt_token_count": 3, "candidates_token_count": 1}
+
+
+class AsyncStream:
+    def __init__(self, words):
+        self.words = words
+        self.usage_metadata = None
+
+    async def __aiter__(self):
+        for word in self.words:
+            yield Response(word)
+
+
+class FakeModel:
+    """GenerativeModel with both the async and the blocking API"""
+
+    created = []
+
+    def __init__(self, model, system_instruction=None):
+        self.system_instruction = system_instruction
+        self.threads = []
+        FakeModel.created.append(self)
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False, **options):
+        self.threads.append(threading.current_thread().name)
+        return AsyncStream(["async", " reply"]) if stream else Response("async reply")
+
+    def generate_content(self, prompt, generation_config=None, stream=False, **options):
+        self.threads.append(threading.current_thread().name)
+        return iter([Response("sync"), Response(" reply")]) if stream else Response("sync reply")
+
+
+class FakeGeminiAdapter(GeminiAdapter):
+    def setup_client(self):
+        return SimpleNamespace(GenerativeModel=FakeModel)
+
+
+@pytest.fixture(autouse=True)
+def fresh_models(monkeypatch):
+    monkeypatch.setattr(providers_module, "_gemini_models", {})
+    FakeModel.created = []
+
+
+def adapter(base_url=None):
+    return FakeGeminiAdapter("gemini", "key", "gemini-1.5-pro", base_url=base_url,
+                             breaker=CircuitBreaker("gemini-test", {"probe": False}))
+
+
+def test_native_async_api_is_used_and_models_are_shared():
+    gemini = adapter()
+
+    async def run():
+        first = await gemini.complete(MESSAGES)
+        second = await gemini.complete(MESSAGES)
+        deltas = [delta async for delta in gemini.stream(MESSAGES)]
+        return first, second, deltas
+
+    assert asyncio.run(run()) == ("async reply", "async reply", ["async", " reply"])
+    # One model per system instruction, called on the loop's own thread
+    assert len(FakeModel.created) == 1
+    assert FakeModel.created[0].system_instruction == "be brief"
+    assert set(FakeModel.created[0].threads) == {"MainThread"}
+    assert gemini.prompt_cache.snapshot()["input_tokens"] == 6
+
+
+def test_rest_transport_runs_on_the_gemini_executor():
+    # A base_url selects the SDK's REST transport, which is blocking only
+    gemini = adapter(base_url="http://127.0.0.1:8787")
+
+    async def run():
+        return await gemini.complete(MESSAGES), [delta async for delta in gemini.stream(MESSAGES)]
+
+    assert asyncio.run(run()) == ("sync reply", ["sync", " reply"])
+    assert all(name.startswith("gemini") for name in FakeModel.created[0].threads)
+
+
+def test_executor_bounds_running_and_queued_calls():
+    executor = BoundedExecutor("bounded-test", max_workers=2, max_queued=1)
+    release = threading.Event()
+    peak = []
+
+    def blocking():
+        peak.append(executor.active)
+        release.wait(5)
+        return "done"
+
+    async def run():
+        calls = [asyncio.ensure_future(executor.run(blocking)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        # Two running, one queued for a thread, the rest waiting on the loop
+        waiting = executor.waiting
+        release.set()
+        return waiting, await asyncio.gather(*calls)
+
+    waiting, results = asyncio.run(run())
+    executor.shutdown()
+    assert waiting == 2
+    assert results == ["done"] * 5
+    assert max(peak) <= 2
+    assert executor.stats()["completed"] == 5
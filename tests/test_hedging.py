@@ -0,0 +1,89 @@
+"""
+Hedged requests: hedge delay, hedge budget, and the race between primary and hedge
+"""
+
+import asyncio
+
+from fakes import FakeAdapter, ServerError
+from scripts.pdd_llm.hedging import HedgePolicy, percentile
+from scripts.pdd_llm.router import LLMRouter
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def hedged_router(primary, secondary, **settings):
+    policy = HedgePolicy(dict({"enabled": True, "min_samples": 1, "min_delay_ms": 20,
+                               "max_hedge_fraction": 1.0}, **settings))
+    router = LLMRouter([primary, secondary], hedging=policy)
+    # Measured, primary first, so the hedge delay is known
+    router.backends[0].stats.record_success(0.001)
+    router.backends[1].stats.record_success(0.002)
+    return router
+
+
+def collect(stream):
+    async def run():
+        return "".join([delta async for delta in stream])
+    return asyncio.run(run())
+
+
+def test_delay_is_the_latency_percentile_once_warmed_up():
+    assert percentile([3, 1, 2, 4], 50) == 2
+    assert percentile([], 99) is None
+    policy = HedgePolicy({"min_samples": 3, "percentile": 95, "min_delay_ms": 100})
+    assert policy.delay_for([0.5, 0.6]) is None
+    assert policy.delay_for([0.5, 0.6, 0.7]) == 0.7
+    # Never sooner than min_delay_ms
+    assert policy.delay_for([0.01, 0.01, 0.01]) == 0.1
+
+
+def test_budget_caps_the_hedged_fraction():
+    policy = HedgePolicy({"max_hedge_fraction": 0.1})
+    for _ in range(20):
+        policy.begin()
+    assert [policy.try_acquire() for _ in range(3)] == [True, True, False]
+    assert policy.report()["budget_denied"] == 1
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    primary = FakeAdapter("primary", ["slow"], delay=1.0)
+    secondary = FakeAdapter("secondary", ["fast"])
+    router = hedged_router(primary, secondary)
+    assert asyncio.run(router.complete(MESSAGES)) == "fast"
+    assert primary.cancelled == 1
+    report = router.status()["hedging"]
+    assert (report["hedged"], report["hedge_wins"]) == (1, 1)
+
+
+def test_fast_primary_is_not_hedged():
+    primary = FakeAdapter("primary", ["primary"])
+    secondary = FakeAdapter("secondary")
+    router = hedged_router(primary, secondary, min_delay_ms=500)
+    assert asyncio.run(router.complete(MESSAGES)) == "primary"
+    assert secondary.calls == 0
+    assert router.status()["hedging"]["hedged"] == 0
+
+
+def test_out_of_budget_waits_for_the_primary():
+    primary = FakeAdapter("primary", ["primary"], delay=0.1)
+    secondary = FakeAdapter("secondary")
+    router = hedged_router(primary, secondary, max_hedge_fraction=0.0)
+    assert asyncio.run(router.complete(MESSAGES)) == "primary"
+    assert secondary.calls == 0
+    assert router.status()["hedging"]["budget_denied"] == 1
+
+
+def test_primary_failing_before_the_delay_fails_over():
+    primary = FakeAdapter("primary", [ServerError()])
+    secondary = FakeAdapter("secondary", ["fallback"])
+    router = hedged_router(primary, secondary, min_delay_ms=500)
+    assert asyncio.run(router.complete(MESSAGES)) == "fallback"
+    assert router.status()["hedging"]["hedged"] == 0
+
+
+def test_stream_is_hedged_until_the_first_delta():
+    primary = FakeAdapter("primary", ["slow stream"], delay=1.0)
+    secondary = FakeAdapter("secondary", ["hedged stream"])
+    router = hedged_router(primary, secondary)
+    assert collect(router.stream(MESSAGES)) == "hedged stream"
+    assert primary.cancelled == 1
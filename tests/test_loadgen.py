@@ -0,0 +1,60 @@
+"""
+Load generator: concurrent sessions, growing conversations, error accounting
+"""
+
+import asyncio
+
+import pytest
+
+from fakes import FakeAdapter, ServerError
+from scripts.pdd_llm.client import UniversalLLMClient
+from scripts.pdd_llm.config import normalize_config
+from scripts.pdd_llm.loadgen import LoadGenerator
+
+QUICK = {"sessions": 3, "turns": 2, "think_time_seconds": 0, "ramp_seconds": 0}
+
+
+class RecordingAdapter(FakeAdapter):
+    """Remembers the size of every conversation it was sent"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sizes = []
+
+    async def _complete(self, messages, max_tokens, temperature):
+        self.sizes.append(len(messages))
+        return await super()._complete(messages, max_tokens, temperature)
+
+    def _stream(self, messages, max_tokens, temperature):
+        self.sizes.append(len(messages))
+        return super()._stream(messages, max_tokens, temperature)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    for name in ("LLM_PROVIDER", "API_KEY", "MODEL", "TEMPERATURE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    return UniversalLLMClient(normalize_config({"cache": {"enabled": False}, "warmup": {"enabled": False},
+                                               "summarization": {"enabled": False}}))
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_sessions_run_concurrently_and_conversations_grow(client, streaming):
+    adapter = RecordingAdapter(outcomes=["an answer"])
+    client._client = adapter
+    report = asyncio.run(LoadGenerator(client, dict(QUICK, streaming=streaming), system_prompt="system").run())
+    assert report["turns"] == 6 and report["error_rate"] == 0.0
+    assert report["latency_ms"]["p50"] is not None
+    # system + question, then system + question + answer + question
+    assert sorted(adapter.sizes) == [2, 2, 2, 4, 4, 4]
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_failed_turns_are_counted_and_left_out_of_the_conversation(client, streaming):
+    adapter = RecordingAdapter(outcomes=[ServerError("overloaded")])
+    client._client = adapter
+    report = asyncio.run(LoadGenerator(client, dict(QUICK, sessions=1, streaming=streaming)).run())
+    assert report["error_rate"] == 1.0
+    assert report["errors"] == {"ServerError: overloaded": 2}
+    assert report["latency_ms"]["p50"] is None
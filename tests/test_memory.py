@@ -0,0 +1,70 @@
+"""
+Token-budgeted conversation memory: incremental counts, trimming, model budgets
+"""
+
+import pytest
+
+from scripts.pdd_llm import memory as memory_module
+from scripts.pdd_llm.memory import (
+    MESSAGE_OVERHEAD,
+    REPLY_PRIMING,
+    ConversationMemory,
+    context_window,
+    prompt_budget,
+)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """One token per word, with or without tiktoken installed"""
+    counted = []
+
+    def count(text, model=None):
+        counted.append(text)
+        return len(text.split())
+
+    monkeypatch.setattr(memory_module, "count_tokens", count)
+    return counted
+
+
+def tokens(text):
+    return len(text.split()) + MESSAGE_OVERHEAD
+
+
+def test_window_total_is_kept_incrementally(word_tokens):
+    memory = ConversationMemory("gpt-4o", "be brief", budget=1000)
+    memory.add("user", "one two three")
+    memory.add("assistant", "four five")
+    assert memory.prompt_tokens == tokens("be brief") + tokens("one two three") + tokens("four five") + REPLY_PRIMING
+    memory.messages()
+    memory.messages()
+    # Each message is counted once, when added, however often the prompt is built
+    assert word_tokens == ["be brief", "one two three", "four five"]
+
+
+def test_oldest_turns_are_trimmed_to_the_budget_starting_on_a_user_turn():
+    memory = ConversationMemory("gpt-4o", "system", budget=tokens("system") + 3 * tokens("a b") + REPLY_PRIMING)
+    for role, content in (("user", "q1 x"), ("assistant", "a1 x"), ("user", "q2 x"), ("assistant", "a2 x"),
+                          ("user", "q3 x")):
+        memory.add(role, content)
+    assert [m["content"] for m in memory.messages()] == ["system", "q2 x", "a2 x", "q3 x"]
+    assert memory.stats()["trimmed_turns"] == 2
+    assert memory.prompt_tokens <= memory.budget
+
+
+def test_the_latest_turn_is_kept_even_over_budget():
+    memory = ConversationMemory("gpt-4o", budget=5)
+    memory.add("user", "old")
+    memory.add("user", "a question far longer than the whole budget")
+    assert [m["content"] for m in memory.messages()] == ["a question far longer than the whole budget"]
+
+
+def test_budget_leaves_room_for_the_reply_in_the_models_window():
+    assert context_window("gpt-4o-mini") == 128000
+    # Longest prefix wins
+    assert context_window("gpt-4-turbo-preview") == 128000
+    assert context_window("gpt-4-0613") == 8192
+    assert context_window("unknown-model") == 8192
+    assert prompt_budget("gpt-4", 2000) == 6192
+    assert prompt_budget("claude-3-opus", 2000, max_prompt_tokens=8000) == 8000
+    assert prompt_budget("llama2", 5000) == 0
@@ -0,0 +1,72 @@
+"""
+Prometheus-style metrics: outcomes, histograms, exposition and the /metrics endpoint
+"""
+
+import asyncio
+import urllib.error
+import urllib.request
+
+import pytest
+
+from fakes import FakeAdapter, RateLimited, ServerError
+from scripts.pdd_llm.breaker import CircuitOpenError
+from scripts.pdd_llm.deadline import DeadlineExceeded
+from scripts.pdd_llm.metrics import CONTENT_TYPE, Histogram, LLMMetrics, outcome_of, start_metrics_server
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_outcomes_are_classified():
+    assert outcome_of(None) == "success"
+    assert outcome_of(CircuitOpenError("openai", 1.0)) == "circuit_open"
+    assert outcome_of(RateLimited()) == "rate_limited"
+    assert outcome_of(DeadlineExceeded()) == "deadline_exceeded"
+    assert outcome_of(asyncio.CancelledError()) == "cancelled"
+    assert outcome_of(ServerError()) == "error"
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("provider",), (0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "openai")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{provider="openai",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{provider="openai",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{provider="openai",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{provider="openai"} 4' in lines
+    assert 'latency_seconds_sum{provider="openai"} 4.25' in lines
+
+
+def test_request_timer_records_outcome_latency_and_abandoned_output():
+    metrics = LLMMetrics()
+    with metrics.track("openai", "gpt-4o") as timer:
+        timer.first_token()
+        timer.output("x" * 400)
+    with pytest.raises(asyncio.CancelledError):
+        with metrics.track("openai", "gpt-4o") as timer:
+            timer.output("x" * 40)
+            raise asyncio.CancelledError()
+    text = metrics.render()
+    assert 'llm_requests_total{provider="openai",model="gpt-4o",outcome="success"} 1' in text
+    assert 'llm_requests_total{provider="openai",model="gpt-4o",outcome="cancelled"} 1' in text
+    assert 'llm_abandoned_output_tokens_total{provider="openai",model="gpt-4o",outcome="cancelled"} 10' in text
+    assert 'llm_time_to_first_token_seconds_count{provider="openai",model="gpt-4o"} 1' in text
+
+
+def test_adapter_calls_are_counted_and_served_on_metrics():
+    adapter = FakeAdapter("metrics-test", ["hello"])
+    assert asyncio.run(adapter.complete(MESSAGES)) == "hello"
+
+    server = start_metrics_server(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            body = response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'llm_requests_total{provider="metrics-test",model="model",outcome="success"} 1' in body
+    assert "# TYPE llm_circuit_state gauge" in body
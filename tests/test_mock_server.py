@@ -0,0 +1,109 @@
+"""
+Offline mock provider server: wire formats, prompt caching, injected faults
+"""
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from scripts.pdd_llm.mock_server import LatencyModel, MockLLMServer
+
+FAST = {"port": 0, "seed": 0, "latency": {"distribution": "fixed", "ms": 0}, "tokens_per_second": 10000.0,
+        "response_tokens": 5}
+
+
+async def post(server, path, payload):
+    """(status, headers, body) of one request on a fresh connection"""
+    reader, writer = await asyncio.open_connection(server.settings["host"], server.port)
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: mock\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    head, _, rest = (await reader.read()).partition(b"\r\n\r\n")
+    writer.close()
+    lines = head.decode().split("\r\n")
+    headers = dict(line.lower().split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, rest
+
+
+def serve(settings, exchange):
+    async def run():
+        async with MockLLMServer(dict(FAST, **settings)) as server:
+            return await exchange(server), server.stats()
+    return asyncio.run(run())
+
+
+def test_latency_models():
+    rng = random.Random(0)
+    assert LatencyModel({"distribution": "fixed", "ms": 250}).sample(rng) == 0.25
+    assert LatencyModel({"distribution": "normal", "mean_ms": -500, "stddev_ms": 0}).sample(rng) == 0.0
+    assert 0.1 <= LatencyModel({"distribution": "uniform", "min_ms": 100, "max_ms": 200}).sample(rng) <= 0.2
+    with pytest.raises(ValueError):
+        LatencyModel({"distribution": "pareto"})
+
+
+def test_every_wire_format_is_answered():
+    chat = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 3}
+
+    async def exchange(server):
+        openai = json.loads((await post(server, "/v1/chat/completions", chat))[2])
+        anthropic = json.loads((await post(server, "/v1/messages", dict(chat, model="claude")))[2])
+        gemini = json.loads((await post(server, "/v1beta/models/gemini-pro:generateContent",
+                                        {"contents": [{"parts": [{"text": "hi"}]}]}))[2])
+        return openai, anthropic, gemini
+
+    (openai, anthropic, gemini), stats = serve({}, exchange)
+    assert openai["choices"][0]["message"]["content"].startswith("Mock reply")
+    assert openai["usage"]["completion_tokens"] == 3
+    assert anthropic["content"][0]["text"].startswith("Mock reply")
+    assert gemini["candidates"][0]["content"]["parts"][0]["text"].startswith("Mock reply")
+    assert stats["status_200"] == 3
+
+
+def test_marked_system_prompt_is_cached_on_the_second_request():
+    system = [{"type": "text", "text": "fixed system prompt " * 50, "cache_control": {"type": "ephemeral"}}]
+    request = {"model": "claude", "system": system, "messages": [{"role": "user", "content": "hi"}], "max_tokens": 5}
+
+    async def exchange(server):
+        first = json.loads((await post(server, "/v1/messages", request))[2])["usage"]
+        second = json.loads((await post(server, "/v1/messages", request))[2])["usage"]
+        return first, second
+
+    (first, second), _ = serve({}, exchange)
+    assert first["cache_read_input_tokens"] == 0 and first["cache_creation_input_tokens"] > 0
+    assert second["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+
+
+def test_injected_errors_and_rate_limits():
+    chat = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]}
+
+    async def exchange(server):
+        status, _, body = await post(server, "/v1/chat/completions", chat)
+        server.configure({"error_rate": 0.0, "rate_limit_rate": 1.0, "retry_after_seconds": 2})
+        limited = await post(server, "/v1/chat/completions", chat)
+        return status, json.loads(body), limited
+
+    (status, body, (limited_status, headers, _)), stats = serve({"error_rate": 1.0, "error_status": 503},
+                                                                exchange)
+    assert status == 503 and body["error"]["type"] == "server_error"
+    assert limited_status == 429 and headers["retry-after"] == "2"
+    assert (stats["status_503"], stats["status_429"]) == (1, 1)
+
+
+def test_openai_sdk_streams_from_the_mock():
+    pytest.importorskip("openai")
+    from scripts.pdd_llm.providers import create_adapter
+
+    async def exchange(server):
+        adapter = create_adapter("deepseek", "mock-key", "deepseek-chat", base_url=server.base_url_for("deepseek"))
+        try:
+            messages = [{"role": "user", "content": "hi"}]
+            return [delta async for delta in adapter.stream(messages, max_tokens=5)]
+        finally:
+            await adapter.client.close()
+
+    deltas, _ = serve({}, exchange)
+    assert len(deltas) == 5
+    assert "".join(deltas).startswith("Mock reply")
@@ -0,0 +1,63 @@
+"""
+Provider prompt-prefix caching: cache breakpoints and cached-token accounting
+"""
+
+from types import SimpleNamespace
+
+from scripts.pdd_llm.prompt_cache import (
+    PromptCacheStats,
+    anthropic_usage,
+    gemini_usage,
+    openai_usage,
+    stable_prefix,
+)
+from scripts.pdd_llm.providers import EPHEMERAL, anthropic_request
+
+MESSAGES = [
+    {"role": "system", "content": "fixed system prompt"},
+    {"role": "user", "content": "first"},
+    {"role": "assistant", "content": "reply"},
+    {"role": "user", "content": "second"},
+]
+
+
+def test_anthropic_request_marks_the_system_prompt_and_history():
+    params = anthropic_request(MESSAGES)
+    assert params["system"] == [{"type": "text", "text": "fixed system prompt", "cache_control": EPHEMERAL}]
+    assert params["messages"][-1]["content"] == [{"type": "text", "text": "second", "cache_control": EPHEMERAL}]
+    # The caller's messages are left alone
+    assert MESSAGES[-1]["content"] == "second"
+
+    params = anthropic_request(MESSAGES, cache_history=False)
+    assert params["messages"][-1]["content"] == "second"
+    params = anthropic_request(MESSAGES, cache=False)
+    assert "cache_control" not in params["system"][0]
+
+
+def test_usage_is_read_from_every_providers_format():
+    openai = SimpleNamespace(prompt_tokens=1200, completion_tokens=50,
+                             prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+    assert openai_usage(openai) == (1200, 1024, 0, 50)
+    deepseek = SimpleNamespace(prompt_tokens=900, completion_tokens=10, prompt_cache_hit_tokens=640)
+    assert openai_usage(deepseek) == (900, 640, 0, 10)
+    anthropic = {"input_tokens": 20, "cache_read_input_tokens": 1000, "cache_creation_input_tokens": 300,
+                 "output_tokens": 40}
+    assert anthropic_usage(anthropic) == (1320, 1000, 300, 40)
+    gemini = SimpleNamespace(prompt_token_count=5000, cached_content_token_count=4096, candidates_token_count=7)
+    assert gemini_usage(gemini) == (5000, 4096, 0, 7)
+    assert openai_usage(None) == anthropic_usage(None) == gemini_usage(None) == (0, 0, 0, 0)
+
+
+def test_stats_report_the_hit_ratio():
+    stats = PromptCacheStats("anthropic/claude")
+    stats.record((1000, 0, 1000, 10))
+    stats.record((1000, 1000, 0, 10))
+    # Calls that reported no usage are not counted
+    stats.record((0, 0, 0, 0))
+    assert stats.snapshot() == {"requests": 2, "input_tokens": 2000, "cached_tokens": 1000,
+                                "cache_write_tokens": 1000, "hit_ratio": 0.5}
+
+
+def test_stable_prefix_is_the_leading_system_message():
+    assert stable_prefix(MESSAGES) == ("fixed system prompt", MESSAGES[1:])
+    assert stable_prefix(MESSAGES[1:]) == (None, MESSAGES[1:])
@@ -0,0 +1,118 @@
+"""
+Per-provider rate limiting: token buckets, rate-limit headers, 429 retries
+"""
+
+import asyncio
+
+import pytest
+
+from fakes import FakeAdapter, RateLimited
+from scripts.pdd_llm import ratelimit as ratelimit_module
+from scripts.pdd_llm.ratelimit import (
+    ProviderRateLimiter,
+    RateLimitTimeout,
+    TokenBucket,
+    configure_rate_limits,
+    get_rate_limiter,
+    parse_reset,
+)
+from scripts.pdd_llm.workers import WORKER_COUNT_ENV
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1_700_000_000.0 + self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ratelimit_module, "time", clock)
+    return clock
+
+
+def test_reset_durations_in_every_provider_format():
+    assert parse_reset("1.5") == 1.5
+    assert parse_reset("6m0s") == 360.0
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("1h2m3s") == 3723.0
+    assert parse_reset("2023-11-14T22:13:30Z", now=1_700_000_000.0) == 10.0
+    assert parse_reset("soon") is None
+    assert parse_reset("") is None
+
+
+def test_bucket_refills_continuously(clock):
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1, clock.now) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.wait_time(1, clock.now) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.wait_time(1, clock.now) == 0
+    # Larger than the bucket: goes through once it is full
+    assert TokenBucket(10).wait_time(50, clock.now) == 0
+
+
+def test_workers_split_the_configured_quota(monkeypatch, clock):
+    monkeypatch.setenv(WORKER_COUNT_ENV, "4")
+    limiter = ProviderRateLimiter("openai", {"requests_per_minute": 100, "tokens_per_minute": 40000})
+    assert limiter.requests.capacity == 25
+    assert limiter.tokens.capacity == 10000
+
+
+def test_headers_sync_the_buckets_and_429_pauses(clock):
+    limiter = ProviderRateLimiter("openai")
+    limiter.observe(200, {"x-ratelimit-limit-requests": "100", "x-ratelimit-remaining-requests": "0",
+                          "x-ratelimit-reset-requests": "2s"})
+    # Learned from the headers, and empty until the provider's reset
+    assert limiter.requests.capacity == 100
+    assert limiter.requests.wait_time(1, clock.now) == pytest.approx(2.0)
+
+    limiter = ProviderRateLimiter("anthropic")
+    limiter.observe(429, {"Retry-After-Ms": "1500"})
+    assert limiter.requests.wait_time(1, clock.now) == pytest.approx(1.5)
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_queue_longer_than_max_wait_is_refused(clock):
+    limiter = ProviderRateLimiter("openai", {"requests_per_minute": 1, "max_wait_seconds": 10})
+    asyncio.run(limiter.acquire(1))
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(limiter.acquire(1))
+
+
+def test_unchanged_settings_keep_the_learned_limiter():
+    configure_rate_limits({"ratelimit-test": {"requests_per_minute": 10}})
+    limiter = get_rate_limiter("ratelimit-test")
+    configure_rate_limits({"ratelimit-test": {"requests_per_minute": 10}})
+    assert get_rate_limiter("ratelimit-test") is limiter
+    configure_rate_limits({"ratelimit-test": {"requests_per_minute": 20}})
+    assert get_rate_limiter("ratelimit-test") is not limiter
+
+
+def test_adapter_retries_429s_up_to_max_retries():
+    limits = {"max_retries": 2, "default_retry_after_seconds": 0.01}
+    adapter = FakeAdapter(outcomes=[RateLimited(), RateLimited(), "ok"], rate_limits=limits)
+    assert asyncio.run(adapter.complete([{"role": "user", "content": "hi"}])) == "ok"
+    assert adapter.calls == 3
+
+    adapter = FakeAdapter(outcomes=[RateLimited()], rate_limits=limits)
+    with pytest.raises(RateLimited):
+        asyncio.run(adapter.complete([{"role": "user", "content": "hi"}]))
+    assert adapter.calls == 3
+    assert adapter.rate_limiter.stats()["rate_limited"] == 2
+
+
+def test_sdk_clients_leave_retries_to_the_limiter_and_router():
+    pytest.importorskip("openai")
+    from scripts.pdd_llm.providers import create_adapter
+
+    for provider in ("openai", "deepseek", "azure"):
+        adapter = create_adapter(provider, "key", "model", base_url="https://example.com/")
+        assert adapter.client.max_retries == 0
@@ -0,0 +1,88 @@
+"""
+Latency-aware routing: ranking, failover and per-attempt timeouts
+"""
+
+import asyncio
+
+import pytest
+
+from fakes import FakeAdapter, ServerError
+from scripts.pdd_llm.breaker import CircuitBreaker
+from scripts.pdd_llm.deadline import DeadlineExceeded, deadline_scope
+from scripts.pdd_llm.router import LLMRouter
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def collect(stream):
+    async def run():
+        return "".join([delta async for delta in stream])
+    return asyncio.run(run())
+
+
+def test_fails_over_on_server_errors_in_order():
+    primary = FakeAdapter("primary", [ServerError()])
+    secondary = FakeAdapter("secondary", [ServerError()])
+    tertiary = FakeAdapter("tertiary", ["third time lucky"])
+    router = LLMRouter([primary, secondary, tertiary])
+    assert asyncio.run(router.complete(MESSAGES)) == "third time lucky"
+    assert (primary.calls, secondary.calls, tertiary.calls) == (1, 1, 1)
+    status = router.status()
+    assert status["primary/model"]["error_rate"] > 0
+    assert status["tertiary/model"]["error_rate"] == 0
+
+
+def test_client_errors_and_expired_deadlines_are_not_failed_over():
+    primary = FakeAdapter("primary", [BadRequest()])
+    secondary = FakeAdapter("secondary")
+    with pytest.raises(BadRequest):
+        asyncio.run(LLMRouter([primary, secondary]).complete(MESSAGES))
+    assert secondary.calls == 0
+
+    async def run():
+        with deadline_scope(0.05):
+            await LLMRouter([FakeAdapter("slow", delay=1.0), secondary]).complete(MESSAGES)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert secondary.calls == 0
+
+
+def test_faster_backend_is_preferred_once_measured():
+    slow = FakeAdapter("slow", ["slow"], delay=0.05)
+    fast = FakeAdapter("fast", ["fast"])
+    router = LLMRouter([slow, fast], {"alpha": 1.0})
+    router.backends[1].stats.record_success(0.001)
+    assert asyncio.run(router.complete(MESSAGES)) == "slow"
+    assert [backend.name for backend in router.ranked()] == ["fast/model", "slow/model"]
+    assert asyncio.run(router.complete(MESSAGES)) == "fast"
+
+
+def test_open_circuit_is_ranked_last():
+    primary = FakeAdapter("primary", breaker=CircuitBreaker("primary", {"failure_threshold": 1}))
+    primary.breaker.record_failure()
+    router = LLMRouter([primary, FakeAdapter("secondary")])
+    assert router.ranked()[0].name == "secondary/model"
+
+
+def test_stream_fails_over_before_the_first_delta():
+    primary = FakeAdapter("primary", [ServerError()])
+    secondary = FakeAdapter("secondary", ["streamed from the fallback"])
+    assert collect(LLMRouter([primary, secondary]).stream(MESSAGES)) == "streamed from the fallback"
+
+
+def test_sdk_timeout_follows_the_attempt_timeout_and_deadline():
+    adapter = FakeAdapter()
+    assert adapter.timeout_options() == {}
+    LLMRouter([adapter], {"timeout_seconds": 30.0})
+    assert adapter.timeout_options() == {"timeout": 30.0}
+
+    async def run():
+        with deadline_scope(5.0):
+            return adapter.timeout_options()["timeout"]
+
+    assert 4.0 < asyncio.run(run()) <= 5.0
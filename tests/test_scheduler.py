@@ -0,0 +1,123 @@
+"""
+Request scheduler: deficit round-robin between sessions, lane priority and aging
+"""
+
+import asyncio
+
+import pytest
+
+from scripts.pdd_llm import scheduler as scheduler_module
+from scripts.pdd_llm.scheduler import BACKGROUND, INTERACTIVE, RequestScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def single_worker(monkeypatch):
+    monkeypatch.delenv("PDD_WORKER_COUNT", raising=False)
+
+
+def grant_order(requests, settings=None, before_release=None):
+    """Queue requests (session, name, cost, lane) behind one held slot and release slots one at a time"""
+    async def run():
+        merged = {"max_concurrency": 1, "quantum_tokens": 100}
+        merged.update(settings or {})
+        scheduler = RequestScheduler(merged)
+        await scheduler.acquire("holder")
+        order = []
+
+        async def request(session, name, cost, lane):
+            await scheduler.acquire(session, lane, cost)
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(request(*spec)) for spec in requests]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queue_depth"][INTERACTIVE] + scheduler.stats()["queue_depth"][BACKGROUND] \
+            == len(requests)
+        if before_release is not None:
+            before_release()
+        for _ in requests:
+            scheduler.release()
+            for _ in range(3):
+                await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    return asyncio.run(run())
+
+
+def test_a_busy_session_does_not_starve_a_short_one():
+    order = grant_order([
+        ("a", "a1", 100, INTERACTIVE),
+        ("a", "a2", 100, INTERACTIVE),
+        ("a", "a3", 100, INTERACTIVE),
+        ("b", "b1", 100, INTERACTIVE),
+    ])
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_large_requests_wait_for_enough_deficit():
+    order = grant_order([
+        ("big", "big", 300, INTERACTIVE),
+        ("small", "s1", 100, INTERACTIVE),
+        ("small", "s2", 100, INTERACTIVE),
+        ("small", "s3", 100, INTERACTIVE),
+    ])
+    # The 300-token request builds up its deficit over three rounds while small ones go through
+    assert order == ["s1", "s2", "big", "s3"]
+
+
+def test_interactive_lane_goes_first():
+    order = grant_order([
+        ("batch", "bg", 1, BACKGROUND),
+        ("user", "chat", 1, INTERACTIVE),
+    ])
+    assert order == ["chat", "bg"]
+
+
+def test_aged_background_request_is_served_before_interactive(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module, "time", clock)
+
+    def age():
+        clock.now += 31.0
+
+    order = grant_order([
+        ("batch", "bg", 1, BACKGROUND),
+        ("user", "chat", 1, INTERACTIVE),
+    ], settings={"aging_seconds": 30.0}, before_release=age)
+    assert order == ["bg", "chat"]
+
+
+def test_cancelled_waiter_leaves_the_queue_and_frees_no_slot():
+    async def run():
+        scheduler = RequestScheduler({"max_concurrency": 1})
+        await scheduler.acquire("holder")
+        waiting = asyncio.ensure_future(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        stats = scheduler.stats()
+        assert stats["queue_depth"][INTERACTIVE] == 0
+        assert stats["cancelled"] == 1
+        scheduler.release()
+        assert scheduler.active == 0
+        await scheduler.acquire("b")
+        assert scheduler.active == 1
+
+    asyncio.run(run())
+
+
+def test_unknown_lane_is_rejected():
+    async def run():
+        with pytest.raises(ValueError):
+            await RequestScheduler().acquire("a", "nightly")
+
+    asyncio.run(run())
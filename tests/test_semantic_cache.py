@@ -0,0 +1,47 @@
+"""
+Semantic response cache: context isolation and LRU slot reuse
+"""
+
+import asyncio
+
+import pytest
+
+
+def test_semantic_cache_hits_only_within_the_same_context():
+    pytest.importorskip("numpy")
+    from scripts.pdd_llm.semantic_cache import HashingEmbedder, SemanticCache
+
+    async def run():
+        cache = SemanticCache(HashingEmbedder(256), threshold=0.9, max_entries=4)
+        messages = [{"role": "system", "content": "You are helpful"},
+                    {"role": "user", "content": "How do I reverse a list in Python?"}]
+        await cache.store("openai", "gpt-4o", messages, "Use reversed()")
+        assert await cache.lookup("openai", "gpt-4o", messages) == "Use reversed()"
+        other_context = [{"role": "system", "content": "You are terse"}, messages[1]]
+        assert await cache.lookup("openai", "gpt-4o", other_context) is None
+        assert await cache.lookup("openai", "gpt-4o-mini", messages) is None
+        unrelated = [messages[0], {"role": "user", "content": "Explain TLS certificate pinning"}]
+        assert await cache.lookup("openai", "gpt-4o", unrelated) is None
+
+    asyncio.run(run())
+
+
+def test_semantic_cache_replaces_least_recently_used_slot():
+    pytest.importorskip("numpy")
+    from scripts.pdd_llm.semantic_cache import HashingEmbedder, SemanticCache
+
+    async def run():
+        cache = SemanticCache(HashingEmbedder(256), threshold=0.99, max_entries=2)
+        prompts = ["first question about sorting", "second question about hashing",
+                   "third question about parsing"]
+        ask = [[{"role": "user", "content": prompt}] for prompt in prompts]
+        await cache.store("p", "m", ask[0], "one")
+        await cache.store("p", "m", ask[1], "two")
+        assert await cache.lookup("p", "m", ask[0]) == "one"
+        await cache.store("p", "m", ask[2], "three")
+        assert await cache.lookup("p", "m", ask[1]) is None
+        assert await cache.lookup("p", "m", ask[0]) == "one"
+        assert await cache.lookup("p", "m", ask[2]) == "three"
+        assert cache.stats()["evictions"] == 1
+
+    asyncio.run(run())
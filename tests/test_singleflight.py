@@ -0,0 +1,116 @@
+"""
+Single-flight coalescing: shared calls and streams, late joiners, cancellation
+"""
+
+import asyncio
+
+import pytest
+
+from scripts.pdd_llm.singleflight import SingleFlight
+
+
+class Upstream:
+    """Counts calls and cancellations of a slow upstream"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+        self.closed = 0
+
+    async def complete(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"answer {self.calls}"
+
+    async def stream(self):
+        self.calls += 1
+        try:
+            for word in ("one", " two", " three"):
+                await asyncio.sleep(self.delay)
+                yield word
+        finally:
+            self.closed += 1
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flights, upstream = SingleFlight(), Upstream()
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", upstream.complete) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["answer 1"] * 3
+    assert upstream.calls == 1
+    assert flights.stats() == {"upstream_calls": 1, "coalesced": 2, "in_flight": 0}
+
+    # Finished flights are forgotten: the next call goes upstream
+    assert asyncio.run(flights.do("k", upstream.complete)) == "answer 2"
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", failing) for _ in range(2)), return_exceptions=True)
+
+    assert [str(result) for result in asyncio.run(run())] == ["upstream failed"] * 2
+
+
+def test_upstream_survives_until_the_last_caller_leaves():
+    flights, upstream = SingleFlight(), Upstream(delay=0.1)
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("k", upstream.complete))
+        second = asyncio.ensure_future(flights.do("k", upstream.complete))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        answer = await second
+        assert upstream.cancelled == 0
+
+        third = asyncio.ensure_future(flights.do("k", upstream.complete))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await third
+        await asyncio.sleep(0)
+        return answer
+
+    assert asyncio.run(run()) == "answer 1"
+    assert upstream.cancelled == 1
+
+
+def test_stream_is_fanned_out_and_late_joiners_replay_it():
+    flights, upstream = SingleFlight(), Upstream(delay=0.02)
+
+    async def read(delay=0.0):
+        await asyncio.sleep(delay)
+        return "".join([delta async for delta in flights.stream("k", upstream.stream)])
+
+    async def run():
+        return await asyncio.gather(read(), read(0.03))
+
+    assert asyncio.run(run()) == ["one two three"] * 2
+    assert (upstream.calls, upstream.closed) == (1, 1)
+    assert flights.stats()["coalesced"] == 1
+
+
+def test_last_subscriber_leaving_closes_the_upstream_stream():
+    flights, upstream = SingleFlight(), Upstream(delay=0.02)
+
+    async def run():
+        stream = flights.stream("k", upstream.stream)
+        assert await stream.__anext__() == "one"
+        await stream.aclose()
+        # Closed before aclose returns, not whenever the task gets to it
+        assert upstream.closed == 1
+
+    asyncio.run(run())
+    assert flights.stats()["in_flight"] == 0
@@ -0,0 +1,25 @@
+"""
+Startup: provider SDKs and tokenizers load on first use, not on import
+"""
+
+import subprocess
+import sys
+
+from conftest import ROOT
+from scripts.pdd_llm.startup import IMPORT_TIMES, lazy_import
+
+HEAVY_MODULES = ("openai", "anthropic", "google.generativeai", "tiktoken")
+
+
+def test_importing_the_package_loads_no_sdk_or_tokenizer():
+    probe = ("import sys, scripts.pdd_llm; "
+             f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", probe], cwd=str(ROOT), capture_output=True, text=True,
+                            timeout=60, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_lazy_import_is_timed_once_and_tolerates_missing_modules():
+    assert lazy_import("json") is lazy_import("json")
+    assert "json" in IMPORT_TIMES
+    assert lazy_import("pdd_no_such_module") is None
@@ -0,0 +1,91 @@
+"""
+Streaming chat completions through UniversalLLMClient
+"""
+
+import asyncio
+
+import pytest
+
+from fakes import FakeAdapter, ServerError
+from scripts.pdd_llm.client import UniversalLLMClient
+from scripts.pdd_llm.config import normalize_config
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class BreakingAdapter(FakeAdapter):
+    """Streams two words, then fails"""
+
+    async def _stream(self, messages, max_tokens, temperature):
+        self.calls += 1
+        yield "partial"
+        yield " reply"
+        raise ServerError("connection reset")
+
+
+class ClosingAdapter(FakeAdapter):
+    """Streams a word every 10ms and records whether its provider stream was closed"""
+
+    closed = 0
+
+    async def _stream(self, messages, max_tokens, temperature):
+        try:
+            async for delta in super()._stream(messages, max_tokens, temperature):
+                yield delta
+                await asyncio.sleep(0.01)
+        finally:
+            self.closed += 1
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    for name in ("LLM_PROVIDER", "API_KEY", "MODEL", "TEMPERATURE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    config = normalize_config({"generation": {"temperature": 0}, "warmup": {"enabled": False},
+                               "semantic_cache": {"enabled": False}})
+    return UniversalLLMClient(config)
+
+
+def collect(stream):
+    async def run():
+        return [delta async for delta in stream]
+    return asyncio.run(run())
+
+
+def test_deltas_arrive_as_streamed_and_the_reply_is_cached(client):
+    client._client = FakeAdapter(outcomes=["one two three"])
+    assert collect(client.stream_chat_completion(MESSAGES)) == ["one", " two", " three"]
+    # The repeat comes from the response cache, in one piece
+    assert collect(client.stream_chat_completion(MESSAGES)) == ["one two three"]
+    assert client._client.calls == 1
+
+
+def test_a_broken_stream_raises_and_is_not_cached(client):
+    client._client = BreakingAdapter()
+
+    async def run():
+        deltas = []
+        with pytest.raises(ServerError):
+            async for delta in client.stream_chat_completion(MESSAGES):
+                deltas.append(delta)
+        return deltas
+
+    assert asyncio.run(run()) == ["partial", " reply"]
+    asyncio.run(run())
+    assert client._client.calls == 2
+
+
+def test_closing_the_consumer_closes_the_provider_stream(client):
+    client._client = ClosingAdapter(outcomes=["a long streamed reply"])
+
+    async def run():
+        stream = client.stream_chat_completion(MESSAGES)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(run()) == "a"
+    assert client._client.closed == 1
+    # Cut short, so nothing was cached
+    assert collect(client.stream_chat_completion(MESSAGES)) == ["a", " long", " streamed", " reply"]
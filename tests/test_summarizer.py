@@ -0,0 +1,91 @@
+"""
+Rolling conversation summary: folding older turns in the background
+"""
+
+import asyncio
+
+import pytest
+
+from fakes import FakeAdapter, ServerError
+from scripts.pdd_llm import memory as memory_module
+from scripts.pdd_llm.memory import ConversationMemory
+from scripts.pdd_llm.summarizer import ConversationSummarizer
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    monkeypatch.setattr(memory_module, "count_tokens", lambda text, model=None: len(text.split()))
+
+
+class RecordingSummarizer:
+    def __init__(self, summary="the summary"):
+        self.summary = summary
+        self.calls = []
+
+    async def summarize(self, previous, turns):
+        self.calls.append((previous, [turn["content"] for turn in turns]))
+        return self.summary
+
+
+def conversation(summarizer, turns=6, budget=40):
+    memory = ConversationMemory("gpt-4o", "system", budget=budget, summarizer=summarizer,
+                                trigger_ratio=0.5, keep_recent_turns=2)
+    for i in range(turns):
+        memory.add("user" if i % 2 == 0 else "assistant", f"turn {i}")
+    return memory
+
+
+def test_older_turns_are_folded_into_the_summary():
+    summarizer = RecordingSummarizer()
+    memory = conversation(summarizer)
+
+    async def run():
+        await memory.summarize_in_background()
+
+    asyncio.run(run())
+    assert summarizer.calls == [(None, ["turn 0", "turn 1", "turn 2", "turn 3"])]
+    contents = [m["content"] for m in memory.messages()]
+    assert contents == ["system", "Summary of the earlier conversation:\nthe summary", "turn 4", "turn 5"]
+    assert memory.stats()["summarized_turns"] == 4
+
+
+def test_small_conversations_are_not_summarized():
+    memory = conversation(RecordingSummarizer(), turns=6, budget=1000)
+
+    async def run():
+        return memory.summarize_in_background()
+
+    assert asyncio.run(run()) is None
+
+
+def test_turns_added_while_summarizing_are_kept():
+    summarizer = RecordingSummarizer()
+    memory = conversation(summarizer)
+
+    async def run():
+        task = memory.summarize_in_background()
+        memory.add("user", "turn 6")
+        await task
+
+    asyncio.run(run())
+    assert [m["content"] for m in memory.messages()][2:] == ["turn 4", "turn 5", "turn 6"]
+
+
+def test_failed_summary_keeps_the_full_turns():
+    summarizer = ConversationSummarizer(FakeAdapter(outcomes=[ServerError()]))
+    memory = conversation(summarizer)
+
+    async def run():
+        await memory.summarize_in_background()
+
+    asyncio.run(run())
+    assert memory.summary is None
+    assert len(memory.turns) == 6
+
+
+def test_summarizer_sends_the_previous_summary_and_new_turns():
+    adapter = FakeAdapter(outcomes=["updated summary"])
+    summarizer = ConversationSummarizer(adapter, max_summary_tokens=50)
+    turns = [{"role": "user", "content": "use sqlite"}, {"role": "assistant", "content": "agreed"}]
+    assert asyncio.run(summarizer.summarize("old summary", turns)) == "updated summary"
+    assert adapter.calls == 1
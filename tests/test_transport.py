@@ -0,0 +1,55 @@
+"""
+Shared HTTP transport: one pooled client per host, response listeners
+"""
+
+import asyncio
+
+import pytest
+
+from scripts.pdd_llm.mock_server import MockLLMServer
+from scripts.pdd_llm.transport import SharedTransport
+
+httpx = pytest.importorskip("httpx")
+
+
+def test_base_urls_are_pooled_per_host():
+    assert SharedTransport.host_key("https://api.openai.com/v1") == "https://api.openai.com:443"
+    assert SharedTransport.host_key("http://localhost:11434/v1") == "http://localhost:11434"
+    assert SharedTransport.host_key(None) == "default"
+
+    transport = SharedTransport({"max_connections_per_host": 3})
+
+    async def run():
+        openai = transport.client_for("https://api.openai.com/v1")
+        assert transport.client_for("https://api.openai.com/v1/chat") is openai
+        assert transport.client_for("https://api.anthropic.com") is not openai
+        await transport.aclose()
+        # A closed pool is replaced on next use
+        assert transport.client_for("https://api.openai.com/v1") is not openai
+        await transport.aclose()
+        return openai
+
+    client = asyncio.run(run())
+    assert client.is_closed
+    assert transport.stats()["hosts"] == []
+
+
+def test_listeners_see_every_response_from_their_host():
+    transport = SharedTransport()
+    seen = []
+
+    def listener(status, headers):
+        seen.append(status)
+
+    async def run():
+        async with MockLLMServer({"port": 0}) as server:
+            transport.add_response_listener(server.base_url, listener)
+            # Same host, same listener: called once per response
+            transport.add_response_listener(server.base_url + "/v1", listener)
+            client = transport.client_for(server.base_url + "/v1")
+            await client.get(server.base_url + "/mock/stats")
+            await client.get(server.base_url + "/missing")
+            await transport.aclose()
+
+    asyncio.run(run())
+    assert seen == [200, 404]
@@ -0,0 +1,88 @@
+"""
+Connection pre-warming: every adapter warmed, failures reported, readiness after warm-up
+"""
+
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import FakeAdapter
+from scripts.pdd_llm import warmup as warmup_module
+from scripts.pdd_llm.client import UniversalLLMClient
+from scripts.pdd_llm.config import normalize_config
+from scripts.pdd_llm.health import WorkerHealth
+from scripts.pdd_llm.router import LLMRouter
+from scripts.pdd_llm.warmup import client_adapters, install_warmup, warm_up
+
+
+class WarmingAdapter(FakeAdapter):
+    """Warm-up that takes delay seconds, or raises error"""
+
+    def __init__(self, provider, delay=0.0, error=None):
+        super().__init__(provider)
+        self.warm_delay = delay
+        self.error = error
+        self.warmed = 0
+
+    async def warm_up(self, connections=1, system=None):
+        await asyncio.sleep(self.warm_delay)
+        if self.error is not None:
+            raise self.error
+        self.warmed += 1
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    for name in ("LLM_PROVIDER", "API_KEY", "MODEL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    return UniversalLLMClient(normalize_config({"cache": {"enabled": False},
+                                               "summarization": {"enabled": False}}))
+
+
+def test_every_backend_is_warmed_and_failures_do_not_raise(client):
+    ok = WarmingAdapter("ok")
+    hanging = WarmingAdapter("hanging", delay=10)
+    broken = WarmingAdapter("broken", error=ConnectionError("refused"))
+    client._client = LLMRouter([ok, hanging, broken])
+    assert client_adapters(client) == [ok, hanging, broken]
+
+    report = asyncio.run(warm_up(client, {"timeout_seconds": 0.05}))
+    assert ok.warmed == 1
+    assert list(report["adapters_ms"]) == ["ok/model"]
+    assert report["errors"] == {"hanging/model": "TimeoutError", "broken/model": "refused"}
+
+
+def test_worker_is_ready_only_after_warm_up(client, monkeypatch):
+    health = WorkerHealth()
+    monkeypatch.setattr(warmup_module, "HEALTH", health)
+    adapter = WarmingAdapter("slow", delay=0.05)
+    client._client = adapter
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield {"state": True}
+
+    app = SimpleNamespace(router=SimpleNamespace(lifespan_context=lifespan))
+    install_warmup(app, client)
+
+    async def serve():
+        async with app.router.lifespan_context(app) as state:
+            await asyncio.sleep(0)
+            assert (health.warming, health.ready) == (True, False)
+            while not health.ready:
+                await asyncio.sleep(0.01)
+            return state
+
+    assert asyncio.run(serve()) == {"state": True}
+    assert adapter.warmed == 1
+    assert "slow/model" in health.warmup["adapters_ms"]
+
+
+def test_disabled_warm_up_is_ready_at_once(client, monkeypatch):
+    health = WorkerHealth()
+    monkeypatch.setattr(warmup_module, "HEALTH", health)
+    install_warmup(SimpleNamespace(router=SimpleNamespace()), client, settings={"enabled": False})
+    assert health.ready
@@ -0,0 +1,127 @@
+"""
+Multi-worker deployment: sticky balancer routing and pool startup failures
+"""
+
+import asyncio
+import socket
+import sys
+import threading
+
+import pytest
+
+from scripts.pdd_llm.workers import StickyBalancer, Worker, WorkerPool, WorkerPoolError
+
+
+def make_workers(count):
+    workers = [Worker(index, 9000 + index) for index in range(count)]
+    for worker in workers:
+        worker.healthy = True
+    return workers
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_new_sessions_go_to_the_least_loaded_worker_in_turn():
+    workers = make_workers(3)
+    balancer = StickyBalancer(workers)
+    workers[0].connections = 2
+    assert [balancer.choose(None)[0].index for _ in range(2)] == [1, 2]
+    workers[1].connections = workers[2].connections = 2
+    assert balancer.choose(None) == (workers[0], True)
+
+
+def test_pinned_sessions_stay_unless_their_worker_is_down():
+    workers = make_workers(2)
+    balancer = StickyBalancer(workers)
+    workers[1].draining = True
+    assert balancer.choose(1) == (workers[1], False)
+    assert balancer.choose(None) == (workers[0], True)
+
+    workers[1].healthy = False
+    assert balancer.choose(1) == (workers[0], True)
+    assert balancer.counters["repinned"] == 1
+    workers[0].healthy = False
+    assert balancer.choose(None) == (None, False)
+
+
+def test_balancer_sets_the_cookie_and_pins_the_next_connection():
+    async def upstream(name, reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Length: {len(name)}\r\nConnection: close\r\n\r\n{name}".encode())
+        await writer.drain()
+        writer.close()
+
+    async def get(port, cookie=""):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET / HTTP/1.1\r\nHost: x\r\n{cookie}\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    async def run():
+        workers = make_workers(2)
+        servers = []
+        for worker in workers:
+            worker.port = free_port()
+            servers.append(await asyncio.start_server(
+                lambda r, w, name=f"w{worker.index}": upstream(name, r, w), "127.0.0.1", worker.port))
+        balancer = StickyBalancer(workers, cookie="pdd_worker")
+        port = free_port()
+        await balancer.start("127.0.0.1", port)
+        try:
+            first = await get(port)
+            assert "Set-Cookie: pdd_worker=0;" in first and first.endswith("w0")
+            pinned = await get(port, "Cookie: theme=dark; pdd_worker=0\r\n")
+            assert "Set-Cookie" not in pinned and pinned.endswith("w0")
+            assert (await get(port)).endswith("w1")
+        finally:
+            await balancer.stop()
+            for server in servers:
+                server.close()
+
+    asyncio.run(run())
+
+
+def test_taken_balancer_port_fails_startup_and_stops_the_workers(tmp_path):
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        pool = WorkerPool([sys.executable, "-c", "import time; time.sleep(60)"],
+                          {"count": 2, "base_port": free_port(), "startup_timeout_seconds": 0.5,
+                           "log_dir": str(tmp_path), "reload_on_change": []},
+                          host="127.0.0.1", port=taken.getsockname()[1])
+        errors = []
+
+        def serve():
+            try:
+                asyncio.run(pool.serve())
+            except OSError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        with pytest.raises(WorkerPoolError, match="failed to start"):
+            pool.wait_started(timeout=30)
+        thread.join(timeout=30)
+
+    assert isinstance(pool.error, OSError) and errors == [pool.error]
+    assert all(worker.process.returncode is not None for worker in pool.workers)
+
+
+def test_wait_started_times_out_and_stops_the_pool(tmp_path):
+    pool = WorkerPool([sys.executable, "-c", "import time; time.sleep(60)"],
+                      {"count": 1, "base_port": free_port(), "startup_timeout_seconds": 2.0,
+                       "log_dir": str(tmp_path), "reload_on_change": []},
+                      host="127.0.0.1", port=free_port())
+    thread = threading.Thread(target=asyncio.run, args=(pool.serve(),))
+    thread.start()
+    with pytest.raises(WorkerPoolError, match="did not start within"):
+        pool.wait_started(timeout=0.2)
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+    assert pool.balancer._server is None
+    assert pool.workers[0].process.returncode is not None